@@ -10,12 +10,18 @@ This package defines three types:
 - FAUST integrates the other two, sets up the CFFI environment (defines the
   data types and API) and compiles the FAUST program.  This is the class you
   most likely want to use.
+- Graph (along with Series, Parallel, Split and Merge) connects several FAUST
+  objects into a processing graph.
+- VoicePool turns a FAUST synthesizer into a polyphonic instrument.
 """
 
 from . wrapper import FAUST
-from . python_ui import PythonUI, Param
+from . python_ui import PythonUI, Param, Display
 from . python_meta import PythonMeta
-from . python_dsp import PythonDSP
+from . python_dsp import PythonDSP, DisplayHistory, BlockStats, \
+    ComputeProfile
+from . graph import Graph, Series, Parallel, Split, Merge
+from . poly import VoicePool
 
 # TODO: see which meta-data is still relevant. pydoc definitely uses "author",
 # "credits" and "version" (and "date"), should the rest be removed?
@@ -28,4 +34,6 @@ __maintainer__ = "Marc Joliet"
 __email__ = "marcec@gmx.de"
 __status__ = "Prototype"
 
-__all__ = ["FAUST", "PythonUI", "PythonMeta", "PythonDSP", "Param", "wrapper"]
+__all__ = ["FAUST", "PythonUI", "PythonMeta", "PythonDSP", "Param", "Display",
+           "DisplayHistory", "BlockStats", "ComputeProfile", "Graph", "Series",
+           "Parallel", "Split", "Merge", "VoicePool", "wrapper"]
@@ -1,7 +1,15 @@
+import sys
+
+# "python -m FAUSTPy serve ..." starts the DSP server instead of the demo
+if len(sys.argv) > 1 and sys.argv[1] == "serve":
+    from FAUSTPy.server import main
+    sys.exit(main(sys.argv[2:]))
+
 import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 from FAUSTPy import *
+from FAUSTPy.analysis import frequency_responses
 
 #######################################################
 # set up command line arguments
@@ -53,7 +61,7 @@ out = dattorro.compute(audio)
 print(audio)
 print(out)
 
-spec = np.fft.fft(out)[:, :args.fs/2]
+spec = np.fft.rfft(out)
 
 fig = plt.figure()
 p = fig.add_subplot(
@@ -91,12 +99,11 @@ p = fig.add_subplot(
     xscale="log"
 )
 
-for q in Q:
-    dattorro.dsp.ui.p_Q = q
-    out = dattorro.compute(audio)
-    spec = np.fft.fft(out)[0, :args.fs/2]
+settings = [{"p_Q": q, "p_Center_Freq": cur_F, "p_Gain": cur_G} for q in Q]
+freqs, specs = frequency_responses(dattorro, settings, n_fft=args.fs)
 
-    p.plot(20*np.log10(np.absolute(spec.T)+1e-8),
+for q, spec in zip(Q, specs):
+    p.plot(20*np.log10(np.absolute(spec[0])+1e-8),
            label="Q={}".format(q))
 
 p.legend(loc="best")
@@ -122,12 +129,11 @@ p = fig.add_subplot(
     xscale="log"
 )
 
-for g in G:
-    dattorro.dsp.ui.p_Gain = g
-    out = dattorro.compute(audio)
-    spec = np.fft.fft(out)[0, :args.fs/2]
+settings = [{"p_Q": cur_Q, "p_Center_Freq": cur_F, "p_Gain": g} for g in G]
+freqs, specs = frequency_responses(dattorro, settings, n_fft=args.fs)
 
-    p.plot(20*np.log10(np.absolute(spec.T)+1e-8),
+for g, spec in zip(G, specs):
+    p.plot(20*np.log10(np.absolute(spec[0])+1e-8),
            label="G={:.3g} dB FS".format(20*np.log10(g+1e-8)))
 
 p.legend(loc="best")
@@ -154,12 +160,11 @@ p = fig.add_subplot(
     xscale="log"
 )
 
-for f in F:
-    dattorro.dsp.ui.p_Center_Freq = f
-    out = dattorro.compute(audio)
-    spec = np.fft.fft(out)[0, :args.fs/2]
+settings = [{"p_Q": cur_Q, "p_Center_Freq": f, "p_Gain": cur_G} for f in F]
+freqs, specs = frequency_responses(dattorro, settings, n_fft=args.fs)
 
-    p.plot(20*np.log10(np.absolute(spec.T)+1e-8),
+for f, spec in zip(F, specs):
+    p.plot(20*np.log10(np.absolute(spec[0])+1e-8),
            label="F={:.2f} Hz".format(f))
 
 p.legend(loc="best")
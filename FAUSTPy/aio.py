@@ -0,0 +1,170 @@
+"""
+An asyncio adapter for processing streams of audio with a FAUST DSP.
+
+AsyncDSP.stream() consumes raw interleaved frames in the dtype of the DSP from
+an asyncio.StreamReader or an async iterator of bytes, and yields the
+processed frames in the same format.  The input may arrive in chunks of any
+size: it is cut into blocks of block_size frames that are processed one after
+the other by the same DSP instance, so the DSP state is continuous across
+chunks.
+
+The blocks are computed in an executor, so the event loop is not blocked (and
+since the GIL is released while the DSP is computed, other threads keep
+running, too).  Reading, computing and yielding are connected by bounded
+queues, so if the consumer of the output falls behind, the input is not read
+any further until it catches up.
+
+Note that this module requires Python 3.7 or newer, which is why it is not
+imported by the FAUSTPy package itself.
+"""
+
+import asyncio
+from numpy import dtype, frombuffer
+from . python_dsp import PythonDSP
+
+# marks the end of a queue
+_END = object()
+
+
+class AsyncDSP(object):
+    """Process streams of raw frames with a PythonDSP without blocking the
+    event loop."""
+
+    def __init__(self, dsp, block_size=1024, max_queued=4, executor=None):
+        """Initialise an AsyncDSP object.
+
+        Parameters:
+        -----------
+
+        dsp : PythonDSP / FAUST
+            The DSP to process the stream with.  It must have inputs.
+        block_size : int (optional)
+            The number of frames that are computed at a time.
+        max_queued : int (optional)
+            The maximum number of blocks that are buffered between reading
+            and computing, and between computing and the consumer.
+        executor : concurrent.futures.Executor (optional)
+            The executor that computes the blocks.  Defaults to the default
+            executor of the event loop.
+        """
+
+        if block_size <= 0:
+            raise ValueError("The block size must be positive.")
+        if max_queued <= 0:
+            raise ValueError("The queue size must be positive.")
+
+        if not isinstance(dsp, PythonDSP):
+            # a FAUST object
+            dsp = dsp.dsp
+
+        if dsp.num_in == 0:
+            raise ValueError("Only DSPs with inputs can process streams.")
+
+        self.dsp = dsp
+        self.block_size = block_size
+        self.max_queued = max_queued
+        self.executor = executor
+
+        self.frame_size = dsp.num_in*dtype(dsp.dtype).itemsize
+
+    async def __read(self, source, blocks):
+
+        block_bytes = self.block_size*self.frame_size
+        buf = bytearray()
+
+        cancelled = False
+        try:
+            if hasattr(source, "read"):
+                # a StreamReader
+                while True:
+                    chunk = await source.read(block_bytes)
+                    if not chunk:
+                        break
+                    buf += chunk
+                    while len(buf) >= block_bytes:
+                        await blocks.put(bytes(buf[:block_bytes]))
+                        del buf[:block_bytes]
+            else:
+                async for chunk in source:
+                    buf += chunk
+                    while len(buf) >= block_bytes:
+                        await blocks.put(bytes(buf[:block_bytes]))
+                        del buf[:block_bytes]
+
+            if len(buf) % self.frame_size:
+                raise ValueError("The stream ended with an incomplete frame.")
+            if buf:
+                await blocks.put(bytes(buf))
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            # nobody reads the queue anymore after a cancellation, so putting
+            # the end marker could block forever
+            if not cancelled:
+                await blocks.put(_END)
+
+    def __compute(self, data):
+
+        frames = frombuffer(data, dtype=self.dsp.dtype)
+        frames = frames.reshape((-1, self.dsp.num_in))
+        return self.dsp.compute_interleaved(frames).tobytes()
+
+    async def __work(self, blocks, results):
+
+        loop = asyncio.get_running_loop()
+
+        cancelled = False
+        try:
+            while True:
+                data = await blocks.get()
+                if data is _END:
+                    break
+                out = await loop.run_in_executor(self.executor,
+                                                 self.__compute, data)
+                await results.put(out)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                await results.put(_END)
+
+    async def stream(self, source):
+        """
+        Process a stream of raw interleaved frames.
+
+        Parameters:
+        -----------
+
+        source : asyncio.StreamReader / async iterable of bytes
+            The input frames.
+
+        Returns:
+        --------
+
+        An async generator that yields the output frames as bytes, one block
+        at a time.
+        """
+
+        blocks = asyncio.Queue(self.max_queued)
+        results = asyncio.Queue(self.max_queued)
+
+        reader = asyncio.ensure_future(self.__read(source, blocks))
+        worker = asyncio.ensure_future(self.__work(blocks, results))
+
+        try:
+            while True:
+                out = await results.get()
+                if out is _END:
+                    break
+                yield out
+
+            # re-raise any errors
+            await worker
+            await reader
+        finally:
+            # also reached if the consumer stops early (e.g., via aclose())
+            reader.cancel()
+            worker.cancel()
+            await asyncio.gather(reader, worker, return_exceptions=True)
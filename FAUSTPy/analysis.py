@@ -0,0 +1,150 @@
+"""
+Functions for measuring impulse and frequency responses of FAUST DSPs.
+
+The responses for a list of parameter settings are computed in one call.  Each
+setting is rendered by its own instance of the compiled DSP (see
+FAUST.new_dsp()), so that the settings do not share any state and can be
+computed by a pool of threads; since the GIL is released while the DSP is
+computed, this scales with the number of CPU cores.  The impulse responses are
+truncated once their tail has decayed, which keeps both the rendering and the
+FFTs short for typical filters.
+"""
+
+from multiprocessing.pool import ThreadPool
+from numpy import zeros, concatenate, fft
+from . python_ui import iter_params
+
+
+def _render_impulse(dsp, setting, length, threshold, block_size):
+
+    params = dict(iter_params(dsp.ui)) if hasattr(dsp, "ui") else {}
+    for path, value in setting.items():
+        if path not in params:
+            raise ValueError("{} is not a parameter.".format(path))
+        params[path].zone = value
+
+    dsp.collect_stats()
+
+    # the impulse only occupies the first block, the rest is silence
+    if dsp.num_in > 0:
+        impulse = zeros((dsp.num_in, block_size), dtype=dsp.dtype)
+        impulse[:, 0] = 1
+        silence = zeros((dsp.num_in, block_size), dtype=dsp.dtype)
+
+    blocks = []
+    peak = 0.0
+    pos = 0
+    while pos < length:
+        count = min(block_size, length - pos)
+        if dsp.num_in > 0:
+            audio = impulse if pos == 0 else silence
+            blocks.append(dsp.compute(audio[:, :count]))
+        else:
+            blocks.append(dsp.compute(count))
+        pos += count
+
+        # stop once the tail has decayed relative to the peak so far; the
+        # peak is measured in C while the output is computed
+        block_peak = dsp.stats.peak.max()
+        peak = max(peak, block_peak)
+        if peak > 0 and block_peak <= threshold*peak:
+            break
+
+    dsp.collect_stats(False)
+
+    return concatenate(blocks, axis=1)
+
+
+def impulse_responses(faust, settings, length=None, threshold=1e-6,
+                      block_size=1024, num_threads=None):
+    """
+    Compute the impulse responses of a DSP for several parameter settings.
+
+    Parameters:
+    -----------
+
+    faust : FAUST
+        The FAUST object whose compiled DSP is measured.  Its own instance is
+        not modified.
+    settings : list of dicts
+        The parameter settings, each of which maps parameter paths (as
+        returned by FAUSTPy.python_ui.iter_params(), e.g., "p_Q") to values.
+        Parameters that are not in a setting keep their default value.
+    length : int (optional)
+        The maximum length of the impulse responses.  Defaults to one second.
+    threshold : float (optional)
+        An impulse response is truncated after the first block whose peak is
+        below threshold times the peak of the impulse response so far.  Pass
+        0 to disable truncation.
+    block_size : int (optional)
+        The number of samples computed at a time, which is also the
+        granularity of the truncation.
+    num_threads : int (optional)
+        The number of threads to use.  Defaults to the number of CPUs.
+
+    Returns:
+    --------
+
+    responses : list of numpy.ndarray
+        The impulse responses as arrays of shape (num_out, n), where n can
+        differ between the settings.
+    """
+
+    if block_size <= 0:
+        raise ValueError("The block size must be positive.")
+
+    settings = list(settings)
+    dsps = [faust.new_dsp() for s in settings]
+    if length is None:
+        length = faust.dsp.fs
+
+    def render(i):
+        return _render_impulse(dsps[i], settings[i], length, threshold,
+                               block_size)
+
+    pool = ThreadPool(num_threads)
+    try:
+        return pool.map(render, range(len(settings)))
+    finally:
+        pool.close()
+
+
+def frequency_responses(faust, settings, n_fft=None, **kwargs):
+    """
+    Compute the frequency responses of a DSP for several parameter settings.
+
+    Parameters:
+    -----------
+
+    faust : FAUST
+        The FAUST object whose compiled DSP is measured.
+    settings : list of dicts
+        The parameter settings (see impulse_responses()).
+    n_fft : int (optional)
+        The FFT length.  Defaults to the smallest power of two that fits the
+        longest impulse response.
+    kwargs
+        Further arguments for impulse_responses().
+
+    Returns:
+    --------
+
+    freqs : numpy.ndarray
+        The frequencies of the FFT bins in Hz.
+    responses : numpy.ndarray
+        The complex frequency responses with shape
+        (len(settings), num_out, n_fft//2 + 1).
+    """
+
+    irs = impulse_responses(faust, settings, **kwargs)
+
+    if n_fft is None:
+        n = max([ir.shape[1] for ir in irs] + [1])
+        n_fft = 1 << (n - 1).bit_length()
+
+    responses = zeros((len(irs), faust.dsp.num_out, n_fft//2 + 1),
+                      dtype=complex)
+    for i, ir in enumerate(irs):
+        responses[i] = fft.rfft(ir, n_fft)
+
+    return fft.rfftfreq(n_fft, 1.0/faust.dsp.fs), responses
@@ -0,0 +1,163 @@
+"""
+Automatic tuning of the block size of PythonDSP.compute().
+
+Very small blocks are dominated by the overhead of calling into the DSP from
+Python, while very large ones evict the delay lines and outputs of the DSP
+from the cache.  tune_block_size() measures how long a DSP takes to process
+a signal in blocks of several sizes and returns the fastest one, which can
+then be assigned to PythonDSP.block_size so that compute() splits its input
+internally (see also the block_size argument of FAUST).
+
+Since the best block size depends on the DSP and on the machine, the results
+are cached per DSP (see FAUST.hash) and machine in a JSON file, so that each
+DSP is only measured once.
+"""
+
+import json
+import os
+import platform
+import tempfile
+from numpy import random
+from . benchmark import best_time
+
+# the block sizes that are measured by default
+BLOCK_SIZES = [32, 64, 128, 256, 512, 1024, 2048, 4096, 8192]
+
+# the cache of tuned block sizes
+CACHE_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or
+    os.path.join(os.path.expanduser("~"), ".cache"),
+    "FAUSTPy", "block_sizes.json"
+)
+
+
+def machine_id():
+    """Return a string that identifies this machine and its CPU."""
+
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.partition(":")[2].strip()
+                    break
+    except (IOError, OSError):
+        pass
+
+    return "{} {} {}".format(platform.node(), platform.machine(), cpu)
+
+
+def load_cache(cache_file=None):
+    """Return the cached block sizes, keyed by machine_id() and DSP."""
+
+    try:
+        with open(cache_file or CACHE_FILE) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def save_cache(cache, cache_file=None):
+    """Write the cached block sizes (atomically, in case of concurrent
+    writers)."""
+
+    cache_file = cache_file or CACHE_FILE
+    cache_dir = os.path.dirname(cache_file) or "."
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+
+    fd, tmp_name = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.rename(tmp_name, cache_file)
+
+
+def measure_block_sizes(faust, block_sizes=BLOCK_SIZES, length=None,
+                        min_time=0.05):
+    """
+    Measure the time it takes to compute a signal in blocks of several sizes.
+
+    Parameters:
+    -----------
+
+    faust : FAUST
+        The DSP to measure.  A new instance is created, so the state of
+        faust.dsp is not changed.
+    block_sizes : list of int (optional)
+        The block sizes to measure.
+    length : int (optional)
+        The number of frames of the test signal.  Defaults to four times the
+        largest block size.
+    min_time : float (optional)
+        The minimum duration of each measurement in seconds.
+
+    Returns:
+    --------
+
+    times : dict
+        The time per frame in seconds for each block size.
+    """
+
+    if not block_sizes or min(block_sizes) <= 0:
+        raise ValueError("The block sizes must be positive.")
+
+    dsp = faust.new_dsp()
+    length = length or 4*max(block_sizes)
+
+    if dsp.num_in > 0:
+        # low-level noise, so that the DSP neither sees silence nor clips
+        audio = (1e-3*random.randn(dsp.num_in, length)).astype(dsp.dtype)
+    else:
+        audio = length
+    out = dsp.compute(audio)
+
+    times = {}
+    for block_size in block_sizes:
+        dsp.block_size = block_size
+        t = best_time(lambda: dsp.compute(audio, out=out), min_time=min_time)
+        times[block_size] = t/length
+
+    return times
+
+
+def tune_block_size(faust, block_sizes=BLOCK_SIZES, length=None,
+                    min_time=0.05, cache_file=None):
+    """
+    Return the fastest block size for a DSP on this machine.
+
+    The result is taken from the cache if this DSP was already tuned on this
+    machine; otherwise, the block sizes are measured with
+    measure_block_sizes() and the fastest one is added to the cache.
+
+    Parameters:
+    -----------
+
+    faust : FAUST
+        The DSP to tune.
+    cache_file : str (optional)
+        The path to the cache.  Defaults to CACHE_FILE.
+
+    See measure_block_sizes() for the other parameters.
+
+    Returns:
+    --------
+
+    block_size : int
+        The fastest block size.
+    """
+
+    machine = machine_id()
+    cache = load_cache(cache_file)
+    block_size = cache.get(machine, {}).get(faust.hash)
+    if block_size is not None:
+        return block_size
+
+    times = measure_block_sizes(faust, block_sizes, length, min_time)
+    block_size = min(times, key=times.get)
+
+    # reload the cache in case another process has tuned a DSP meanwhile
+    cache = load_cache(cache_file)
+    cache.setdefault(machine, {})[faust.hash] = block_size
+    save_cache(cache, cache_file)
+
+    return block_size
@@ -0,0 +1,255 @@
+"""
+A benchmark suite for FAUSTPy.
+
+It measures the time it takes to
+
+- translate a FAUST DSP to C (i.e., to run the FAUST compiler),
+- parse the C declarations and compile the C code with the CFFI (as recorded
+  in FAUST.timings),
+- initialise a DSP instance,
+- build the UI of a DSP instance, and
+- process audio with PythonDSP.compute() and PythonDSP.compute2(), which is
+  reported per sample for several block sizes.
+
+Each DSP is measured with all values of FAUSTFLOAT and with several channel
+counts, where a channel count of N means N copies of the DSP fused in parallel
+(see the "fusion" argument of FAUST).  Optionally, the DSPs are also compiled
+with the parallel code generators of FAUST (see the "parallel" argument of
+FAUST), so that parallel and scalar code can be compared.  Run it with
+
+    PYTHONPATH=. python -m FAUSTPy.benchmark -o results.json
+
+in the source directory; pass --help for the available options.  The results
+are written as JSON, so that the output of different versions can be compared
+to catch regressions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import timeit
+from numpy import zeros
+from . import wrapper
+from . wrapper import FAUST, FAUSTFLOATS
+from . python_dsp import PythonDSP
+from . python_ui import PythonUI
+
+# the DSPs that come with FAUSTPy
+BUNDLED_DSPS = ["dattorro_notch_cut_regalia.dsp", "test_synth.dsp"]
+
+# the parallel code generators that can be benchmarked; "sch" code needs the
+# scheduler runtime of FAUST, which is neither shipped nor linked here
+PARALLEL_MODES = ["omp"]
+
+
+def best_time(func, min_time=0.2, repeat=3):
+    """
+    Return the best time per call of func out of several repetitions.
+
+    The number of calls per repetition is chosen such that each repetition
+    takes at least min_time seconds.
+    """
+
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        t = timer.timeit(number)
+        if t >= min_time:
+            break
+        number *= 2 if t <= 0 else max(2, int(1.2*min_time/t))
+
+    return min([t] + timer.repeat(repeat - 1, number))/number
+
+
+def bench_dsp(dsp_fname, faust_float, num_copies, fs, block_sizes, min_time,
+              parallel=None, num_threads=None):
+    """
+    Benchmark one DSP with one FAUSTFLOAT, number of copies and parallel code
+    generator (None for scalar code).
+
+    Returns:
+    --------
+
+    result : dict
+        The measured times in seconds (and nanoseconds per sample for the
+        compute functions).
+    """
+
+    stages = [dsp_fname]*num_copies
+    result = {
+        "dsp": os.path.basename(dsp_fname),
+        "faust_float": faust_float,
+        "copies": num_copies,
+        "parallel": parallel,
+    }
+
+    # compile into a fresh directory, so that the CFFI cache is not used
+    tmpdir = tempfile.mkdtemp()
+    try:
+        faust = FAUST(stages if num_copies > 1 else dsp_fname, fs,
+                      faust_float, fusion="parallel", parallel=parallel,
+                      num_threads=num_threads, tmpdir=tmpdir)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    dsp = faust.dsp
+
+    # the one-off stages are taken from the construction timings (None if a
+    # stage was skipped, e.g., because the library was already loaded by this
+    # process), while instance initialisation and UI construction are cheap
+    # enough to repeat
+    timings = dict((s.stage, s.seconds) for s in faust.timings)
+    result["translate_s"] = timings.get("faust")
+    result["cdef_s"] = timings.get("cdef")
+    result["compile_s"] = timings.get("verify")
+    result["init_s"] = best_time(
+        lambda: PythonDSP(faust.C, faust.ffi, fs), min_time=min_time
+    )
+
+    def build_ui():
+        ui = PythonUI(faust.ffi, dsp)
+        faust.C.buildUserInterfacemydsp(dsp.dsp, ui.ui)
+
+    result["ui_s"] = best_time(build_ui, min_time=min_time)
+
+    result["num_in"] = dsp.num_in
+    result["num_out"] = dsp.num_out
+    result["num_threads"] = faust.num_threads
+    result["compute"] = []
+    for block_size in block_sizes:
+        if dsp.num_in > 0:
+            audio = zeros((dsp.num_in, block_size), dtype=dsp.dtype)
+            t = best_time(lambda: dsp.compute(audio), min_time=min_time)
+            t2 = best_time(lambda: dsp.compute2(audio), min_time=min_time)
+        else:
+            t = best_time(lambda: dsp.compute(block_size), min_time=min_time)
+            t2 = None   # compute2() only works for effects
+
+        result["compute"].append({
+            "block_size": block_size,
+            "compute_ns": 1e9*t/block_size,
+            "compute2_ns": 1e9*t2/block_size if t2 is not None else None,
+        })
+
+    return result
+
+
+def run(dsps=BUNDLED_DSPS, faust_floats=sorted(FAUSTFLOATS), copies=[1, 4],
+        block_sizes=[16, 64, 256, 1024, 4096], fs=48000, min_time=0.2,
+        parallel=[], num_threads=None):
+    """
+    Run the benchmark suite.
+
+    Every DSP is benchmarked with scalar code and with each of the parallel
+    code generators in parallel (see PARALLEL_MODES), where num_threads is
+    the number of OpenMP threads.
+
+    Returns:
+    --------
+
+    results : dict
+        A description of the platform and a list of the results of
+        bench_dsp().
+    """
+
+    unknown = set(parallel) - set(PARALLEL_MODES)
+    if unknown:
+        raise ValueError("Unsupported parallel modes: {}".format(
+            ", ".join(sorted(unknown))))
+
+    results = []
+    for dsp_fname in dsps:
+        for faust_float in faust_floats:
+            for num_copies in copies:
+                for mode in [None] + list(parallel):
+                    results.append(bench_dsp(
+                        dsp_fname, faust_float, num_copies, fs, block_sizes,
+                        min_time, mode, num_threads if mode == "omp" else None
+                    ))
+
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "fs": fs,
+        "results": results,
+    }
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="python -m FAUSTPy.benchmark",
+        description="Benchmark the FAUSTPy compile, init and compute paths."
+    )
+    parser.add_argument('dsps', nargs="*", default=BUNDLED_DSPS,
+                        help="The FAUST DSP files "
+                             "(default: the bundled DSPs).")
+    parser.add_argument('-f', '--faustfloat',
+                        dest="faust_floats",
+                        action="append",
+                        choices=sorted(FAUSTFLOATS),
+                        help="The values of FAUSTFLOAT (default: all).")
+    parser.add_argument('-b', '--block-sizes',
+                        dest="block_sizes",
+                        default=[16, 64, 256, 1024, 4096],
+                        type=lambda s: [int(x) for x in s.split(",")],
+                        help="Comma-separated block sizes.")
+    parser.add_argument('-c', '--copies',
+                        dest="copies",
+                        default=[1, 4],
+                        type=lambda s: [int(x) for x in s.split(",")],
+                        help="Comma-separated numbers of parallel copies of "
+                             "each DSP, to vary the number of channels.")
+    parser.add_argument('-P', '--parallel',
+                        dest="parallel",
+                        action="append",
+                        default=[],
+                        choices=PARALLEL_MODES,
+                        help="Also benchmark the given parallel code "
+                             "generator of FAUST.")
+    parser.add_argument('-j', '--threads',
+                        dest="num_threads",
+                        default=None,
+                        type=int,
+                        help="The number of OpenMP threads.")
+    parser.add_argument('-p', '--path',
+                        dest="faust_path",
+                        default="",
+                        help="The path to the FAUST compiler.")
+    parser.add_argument('-s', '--fs',
+                        dest="fs",
+                        default=48000,
+                        type=int,
+                        help="The sampling frequency")
+    parser.add_argument('-t', '--min-time',
+                        dest="min_time",
+                        default=0.2,
+                        type=float,
+                        help="The minimum duration of each measurement.")
+    parser.add_argument('-o', '--output',
+                        dest="output",
+                        default="-",
+                        help="The JSON output file (default: stdout).")
+    args = parser.parse_args(argv)
+
+    wrapper.FAUST_PATH = args.faust_path
+
+    results = run(args.dsps, args.faust_floats or sorted(FAUSTFLOATS),
+                  args.copies, args.block_sizes, args.fs, args.min_time,
+                  args.parallel, args.num_threads)
+
+    if args.output == "-":
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
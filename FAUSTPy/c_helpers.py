@@ -0,0 +1,310 @@
+"""
+C helper functions that are compiled together with every FAUST DSP.
+
+The FAUST C backend only provides the bare DSP API, so anything that should
+run in the same pass as computemydsp() (and hence without going back to
+Python) is implemented here.  CDEFS contains the declarations that are passed
+to cffi.FFI.cdef() and SOURCE the definitions that are appended to the FAUST C
+code passed to cffi.FFI.verify().
+"""
+
+CDEFS = """
+#define FAUSTPY_STATS 1
+#define FAUSTPY_FTZ 2
+#define FAUSTPY_UNDERFLOW 4
+#define FAUSTPY_PROFILE 8
+
+int faustpy_compute(mydsp* dsp, int count, FAUSTFLOAT** inputs, FAUSTFLOAT** outputs, int num_out, const int* out_rates, int flags, int num_threads, double* peak, double* sum, double* sumsq, long long* nonfinite, double* dsp_time);
+int faustpy_render_score(mydsp* dsp, int count, FAUSTFLOAT** inputs, FAUSTFLOAT** outputs, int num_in, int num_out, int block_size, int num_events, const int* times, FAUSTFLOAT** zones, const FAUSTFLOAT* values, const int* out_rates, int flags, int num_threads, double* peak, double* sum, double* sumsq, long long* nonfinite, double* dsp_time);
+void faustpy_compute_voices(mydsp** voices, int num_voices, const int* active, FAUSTFLOAT** gates, int* retrigger, int count, FAUSTFLOAT** scratch, FAUSTFLOAT** outputs, int num_out, double* peaks);
+int faustpy_openmp(void);
+"""
+
+SOURCE = """
+#include <math.h>
+#include <fenv.h>
+#include <time.h>
+
+#if defined(__SSE__) || defined(__x86_64__)
+#include <xmmintrin.h>
+#endif
+
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+#define FAUSTPY_STATS 1
+#define FAUSTPY_FTZ 2
+#define FAUSTPY_UNDERFLOW 4
+#define FAUSTPY_PROFILE 8
+
+// Return the time of a monotonic clock in seconds.
+static double faustpy_clock(void)
+{
+    struct timespec ts;
+
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (double)ts.tv_sec + 1e-9*(double)ts.tv_nsec;
+}
+
+// Enable flush-to-zero and denormals-are-zero mode and return the previous
+// FPU control state.  Note that this only affects SSE (x86) and NEON
+// (AArch64) arithmetic; the x87 unit, which is used for "long double", has no
+// such mode.
+static unsigned long faustpy_ftz_enable(void)
+{
+#if defined(__SSE__) || defined(__x86_64__)
+    const unsigned int csr = _mm_getcsr();
+    _mm_setcsr(csr | 0x8040);  // FTZ (bit 15) and DAZ (bit 6)
+    return csr;
+#elif defined(__aarch64__)
+    unsigned long fpcr;
+    __asm__ __volatile__("mrs %0, fpcr" : "=r"(fpcr));
+    __asm__ __volatile__("msr fpcr, %0" : : "r"(fpcr | (1UL << 24)));  // FZ
+    return fpcr;
+#else
+    return 0;
+#endif
+}
+
+// Restore the FPU control state returned by faustpy_ftz_enable().
+static void faustpy_ftz_restore(unsigned long state)
+{
+#if defined(__SSE__) || defined(__x86_64__)
+    _mm_setcsr((unsigned int)state);
+#elif defined(__aarch64__)
+    __asm__ __volatile__("msr fpcr, %0" : : "r"(state));
+#else
+    (void)state;
+#endif
+}
+
+// Accumulate per-channel statistics of the output while it is still in the
+// cache.  Non-finite samples are counted, but excluded from the peak, sum and
+// sum of squares.  Each output channel holds count*out_rates[c] samples.
+static void faustpy_stats(int count, FAUSTFLOAT** outputs, int num_out,
+                          const int* out_rates, double* peak, double* sum,
+                          double* sumsq, long long* nonfinite)
+{
+    int c, i;
+
+    for (c = 0; c < num_out; c++) {
+        const FAUSTFLOAT* out = outputs[c];
+        const int len = count*out_rates[c];
+        double p = peak[c], s = sum[c], s2 = sumsq[c];
+        long long nf = 0;
+
+        for (i = 0; i < len; i++) {
+            const double x = (double)out[i];
+
+            if (isfinite(out[i])) {
+                const double a = fabs(x);
+                p = a > p ? a : p;
+                s += x;
+                s2 += x*x;
+            } else {
+                nf++;
+            }
+        }
+
+        peak[c] = p;
+        sum[c] = s;
+        sumsq[c] = s2;
+        nonfinite[c] += nf;
+    }
+}
+
+// Call computemydsp() with optional flush-to-zero mode and statistics.  If
+// FAUSTPY_UNDERFLOW is set, the return value is 1 if the computation produced
+// subnormal results (which were flushed to zero in FTZ mode) and 0 otherwise,
+// and the (sticky) FE_UNDERFLOW flag of the caller is preserved.  If
+// FAUSTPY_PROFILE is set, the time spent in computemydsp() is added to
+// *dsp_time.  If num_threads is positive, the parallel regions of OpenMP code
+// (-omp) use that many threads, whichever thread calls this; the setting of
+// the calling thread is restored afterwards.
+int faustpy_compute(mydsp* dsp, int count, FAUSTFLOAT** inputs,
+                    FAUSTFLOAT** outputs, int num_out, const int* out_rates,
+                    int flags, int num_threads, double* peak, double* sum,
+                    double* sumsq, long long* nonfinite, double* dsp_time)
+{
+    unsigned long fpu_state = 0;
+    fexcept_t underflow_flag;
+    int underflow = 0;
+    double t0 = 0;
+#ifdef _OPENMP
+    int prev_threads = 0;
+
+    if (num_threads > 0) {
+        prev_threads = omp_get_max_threads();
+        omp_set_num_threads(num_threads);
+    }
+#else
+    (void)num_threads;
+#endif
+
+    if (flags & FAUSTPY_UNDERFLOW) {
+        fegetexceptflag(&underflow_flag, FE_UNDERFLOW);
+        feclearexcept(FE_UNDERFLOW);
+    }
+    if (flags & FAUSTPY_FTZ) {
+        fpu_state = faustpy_ftz_enable();
+    }
+
+    if (flags & FAUSTPY_PROFILE) {
+        t0 = faustpy_clock();
+    }
+
+    computemydsp(dsp, count, inputs, outputs);
+
+    if (flags & FAUSTPY_PROFILE) {
+        *dsp_time += faustpy_clock() - t0;
+    }
+
+    // test for underflow first, since restoring the control state also
+    // restores the (sticky) exception flags
+    if (flags & FAUSTPY_UNDERFLOW) {
+        underflow = fetestexcept(FE_UNDERFLOW) != 0;
+    }
+    if (flags & FAUSTPY_FTZ) {
+        faustpy_ftz_restore(fpu_state);
+    }
+    if (flags & FAUSTPY_UNDERFLOW) {
+        fesetexceptflag(&underflow_flag, FE_UNDERFLOW);
+    }
+
+#ifdef _OPENMP
+    if (num_threads > 0) {
+        omp_set_num_threads(prev_threads);
+    }
+#endif
+
+    if (flags & FAUSTPY_STATS) {
+        faustpy_stats(count, outputs, num_out, out_rates, peak, sum, sumsq,
+                      nonfinite);
+    }
+
+    return underflow;
+}
+
+// Render count frames while writing parameter values at given frames: the
+// events (times[k], zones[k], values[k]) are sorted by time, and all events up
+// to and including the current frame are applied before the DSP is computed
+// up to the next event time, in blocks of at most block_size frames (no limit
+// if it is 0).  All channels must have a rate of 1.  The flags and the
+// remaining arguments are passed to faustpy_compute(), and the number of
+// blocks that produced subnormal results is returned.
+int faustpy_render_score(mydsp* dsp, int count, FAUSTFLOAT** inputs,
+                         FAUSTFLOAT** outputs, int num_in, int num_out,
+                         int block_size, int num_events, const int* times,
+                         FAUSTFLOAT** zones, const FAUSTFLOAT* values,
+                         const int* out_rates, int flags, int num_threads,
+                         double* peak, double* sum, double* sumsq,
+                         long long* nonfinite, double* dsp_time)
+{
+    FAUSTFLOAT* in[num_in > 0 ? num_in : 1];
+    FAUSTFLOAT* out[num_out > 0 ? num_out : 1];
+    int start = 0, k = 0, underflows = 0;
+    int c;
+
+    while (start < count) {
+        int stop;
+
+        while (k < num_events && times[k] <= start) {
+            *zones[k] = values[k];
+            k++;
+        }
+
+        stop = k < num_events ? times[k] : count;
+        if (block_size > 0 && stop - start > block_size) {
+            stop = start + block_size;
+        }
+
+        for (c = 0; c < num_in; c++) {
+            in[c] = inputs[c] + start;
+        }
+        for (c = 0; c < num_out; c++) {
+            out[c] = outputs[c] + start;
+        }
+
+        if (flags || num_threads > 0) {
+            underflows += faustpy_compute(dsp, stop - start, in, out, num_out,
+                                          out_rates, flags, num_threads, peak,
+                                          sum, sumsq, nonfinite, dsp_time);
+        } else {
+            computemydsp(dsp, stop - start, in, out);
+        }
+
+        start = stop;
+    }
+
+    return underflows;
+}
+
+// Compute several voices of a synthesizer (i.e., instances of a DSP without
+// inputs) and mix them into outputs.  Inactive voices are skipped, and the
+// peak of each computed voice is stored in peaks so that the caller can
+// detect voices that have become silent.  If retrigger[v] is set, the gate of
+// voice v is held at 0 for the first sample and set to 1 afterwards, so that
+// a stolen voice restarts its envelope.
+void faustpy_compute_voices(mydsp** voices, int num_voices, const int* active,
+                            FAUSTFLOAT** gates, int* retrigger, int count,
+                            FAUSTFLOAT** scratch, FAUSTFLOAT** outputs,
+                            int num_out, double* peaks)
+{
+    int v, c, i;
+
+    for (c = 0; c < num_out; c++) {
+        for (i = 0; i < count; i++) {
+            outputs[c][i] = 0;
+        }
+    }
+
+    for (v = 0; v < num_voices; v++) {
+        double p = 0;
+
+        if (!active[v]) {
+            continue;
+        }
+
+        if (retrigger[v] && gates[v] && count > 0 && num_out > 0) {
+            FAUSTFLOAT* shifted[num_out];
+
+            *gates[v] = 0;
+            computemydsp(voices[v], 1, NULL, scratch);
+
+            for (c = 0; c < num_out; c++) {
+                shifted[c] = scratch[c] + 1;
+            }
+            *gates[v] = 1;
+            computemydsp(voices[v], count - 1, NULL, shifted);
+
+            retrigger[v] = 0;
+        } else {
+            computemydsp(voices[v], count, NULL, scratch);
+        }
+
+        for (c = 0; c < num_out; c++) {
+            const FAUSTFLOAT* x = scratch[c];
+            FAUSTFLOAT* out = outputs[c];
+
+            for (i = 0; i < count; i++) {
+                const double a = fabs((double)x[i]);
+                out[i] += x[i];
+                p = a > p ? a : p;
+            }
+        }
+
+        peaks[v] = p;
+    }
+}
+
+// Return whether the DSP was compiled with OpenMP.
+int faustpy_openmp(void)
+{
+#ifdef _OPENMP
+    return 1;
+#else
+    return 0;
+#endif
+}
+"""
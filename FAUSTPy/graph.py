@@ -0,0 +1,361 @@
+"""
+Classes for connecting several FAUST DSPs into a processing graph.
+
+A graph is built from the following nodes, which mirror the FAUST composition
+operators:
+
+- DSPNode wraps a single PythonDSP (FAUST and PythonDSP objects are wrapped
+  automatically),
+- Series connects nodes in series (":"),
+- Parallel puts nodes in parallel (","),
+- Split fans the outputs of one node out to the inputs of another ("<:"), and
+- Merge mixes the outputs of one node down to the inputs of another (":>").
+
+A Graph object plans the intermediate buffers of a node once, so that they
+are taken from a small pool of preallocated blocks that are reused by stages
+that are not active at the same time, and then processes audio in blocks with
+one call to Graph.compute().
+"""
+
+from numpy import ndarray, atleast_2d
+from . python_dsp import PythonDSP
+
+
+def as_node(obj):
+    """Return obj as a graph node, wrapping FAUST and PythonDSP objects."""
+
+    if isinstance(obj, Node):
+        return obj
+    if not isinstance(obj, PythonDSP):
+        # a FAUST object
+        obj = obj.dsp
+    return DSPNode(obj)
+
+
+class BufferPool(object):
+    """A pool of preallocated channel buffers of a fixed block size.
+
+    Buffers are acquired and released while a graph is planned, so that
+    buffers whose lifetimes do not overlap are shared.
+    """
+
+    def __init__(self, block_size, dtype):
+        """Initialise a BufferPool object.
+
+        Parameters:
+        -----------
+
+        block_size : int
+            The length of each buffer.
+        dtype : numpy.dtype
+            The dtype of the buffers.
+        """
+
+        self.block_size = block_size
+        self.dtype = dtype
+        self.buffers = []
+        self.__free = []
+
+    def acquire(self, num_chan):
+        """Return a list of num_chan buffers that are not in use."""
+
+        bufs = []
+        for i in range(num_chan):
+            if self.__free:
+                bufs.append(self.__free.pop())
+            else:
+                buf = ndarray(self.block_size, dtype=self.dtype)
+                self.buffers.append(buf)
+                bufs.append(buf)
+        return bufs
+
+    def release(self, bufs):
+        """Return buffers obtained from acquire() to the pool."""
+
+        self.__free.extend(reversed(bufs))
+
+
+class Node(object):
+    """The base class of all graph nodes.
+
+    Every node has num_in inputs and num_out outputs.  Subclasses implement
+    plan(), which acquires intermediate buffers from a BufferPool, and
+
+        run(count, inputs, outputs)
+
+    which processes count frames given lists of input and output channels.
+    """
+
+    num_in = 0
+    num_out = 0
+
+    def dsps(self):
+        """Return a list of all PythonDSP objects in this node."""
+
+        return [d for n in self.nodes for d in n.dsps()]
+
+    def plan(self, pool):
+
+        for n in self.nodes:
+            n.plan(pool)
+
+
+class DSPNode(Node):
+    """A graph node that wraps a single PythonDSP."""
+
+    def __init__(self, dsp):
+
+        if len(set(dsp.input_rates + dsp.output_rates)) > 1:
+            raise ValueError("Multirate DSPs are not supported in graphs.")
+
+        self.dsp = dsp
+        self.num_in = dsp.num_in
+        self.num_out = dsp.num_out
+        self.nodes = []
+
+    def dsps(self):
+
+        return [self.dsp]
+
+    def run(self, count, inputs, outputs):
+
+        self.dsp.compute(inputs if self.num_in else count, out=outputs)
+
+
+class Series(Node):
+    """Connect nodes in series, like the FAUST ":" operator.
+
+    The number of outputs of each node must match the number of inputs of the
+    next node.
+    """
+
+    def __init__(self, *nodes):
+
+        if len(nodes) < 1:
+            raise ValueError("Series needs at least one node.")
+
+        self.nodes = [as_node(n) for n in nodes]
+
+        for a, b in zip(self.nodes[:-1], self.nodes[1:]):
+            if a.num_out != b.num_in:
+                raise ValueError(
+                    "Cannot connect {} outputs to {} inputs.".format(
+                        a.num_out, b.num_in)
+                )
+
+        self.num_in = self.nodes[0].num_in
+        self.num_out = self.nodes[-1].num_out
+
+    def plan(self, pool):
+
+        # Node k runs while its inputs (the outputs of node k-1) and its
+        # outputs are live, so any buffers beyond these are free to be reused
+        # by node k (and nodes further down the chain).
+        self.__bufs = []
+        held = None
+        for node in self.nodes[:-1]:
+            out = pool.acquire(node.num_out)
+            node.plan(pool)
+            if held is not None:
+                pool.release(held)
+            held = out
+            self.__bufs.append(out)
+
+        self.nodes[-1].plan(pool)
+        if held is not None:
+            pool.release(held)
+
+    def run(self, count, inputs, outputs):
+
+        for node, bufs in zip(self.nodes[:-1], self.__bufs):
+            bufs = [b[:count] for b in bufs]
+            node.run(count, inputs, bufs)
+            inputs = bufs
+
+        self.nodes[-1].run(count, inputs, outputs)
+
+
+class Parallel(Node):
+    """Put nodes in parallel, like the FAUST "," operator.
+
+    The inputs and outputs of the nodes are concatenated in order.
+    """
+
+    def __init__(self, *nodes):
+
+        self.nodes = [as_node(n) for n in nodes]
+        self.num_in = sum(n.num_in for n in self.nodes)
+        self.num_out = sum(n.num_out for n in self.nodes)
+
+    def run(self, count, inputs, outputs):
+
+        i = o = 0
+        for node in self.nodes:
+            node.run(count, inputs[i:i+node.num_in],
+                     outputs[o:o+node.num_out])
+            i += node.num_in
+            o += node.num_out
+
+
+class Split(Node):
+    """Fan the outputs of a node out to another node, like FAUST's "<:".
+
+    The number of inputs of the second node must be a multiple of the number
+    of outputs of the first node.  Input j of the second node is connected to
+    output (j modulo a.num_out) of the first node without copying.
+    """
+
+    def __init__(self, a, b):
+
+        a, b = as_node(a), as_node(b)
+        if a.num_out == 0 or b.num_in % a.num_out:
+            raise ValueError(
+                "Cannot split {} outputs to {} inputs.".format(a.num_out,
+                                                               b.num_in)
+            )
+
+        self.nodes = [a, b]
+        self.num_in = a.num_in
+        self.num_out = b.num_out
+
+    def plan(self, pool):
+
+        a, b = self.nodes
+        self.__bufs = pool.acquire(a.num_out)
+        a.plan(pool)
+        b.plan(pool)
+        pool.release(self.__bufs)
+
+    def run(self, count, inputs, outputs):
+
+        a, b = self.nodes
+        bufs = [buf[:count] for buf in self.__bufs]
+        a.run(count, inputs, bufs)
+        b.run(count, [bufs[j % a.num_out] for j in range(b.num_in)],
+              outputs)
+
+
+class Merge(Node):
+    """Mix the outputs of a node down to another node, like FAUST's ":>".
+
+    The number of outputs of the first node must be a multiple of the number
+    of inputs of the second node.  Input j of the second node is the sum of
+    the outputs j, j+b.num_in, j+2*b.num_in, ... of the first node.  The sum
+    is computed in place.
+    """
+
+    def __init__(self, a, b):
+
+        a, b = as_node(a), as_node(b)
+        if b.num_in == 0 or a.num_out % b.num_in:
+            raise ValueError(
+                "Cannot merge {} outputs to {} inputs.".format(a.num_out,
+                                                               b.num_in)
+            )
+
+        self.nodes = [a, b]
+        self.num_in = a.num_in
+        self.num_out = b.num_out
+
+    def plan(self, pool):
+
+        a, b = self.nodes
+        self.__bufs = pool.acquire(a.num_out)
+        a.plan(pool)
+        b.plan(pool)
+        pool.release(self.__bufs)
+
+    def run(self, count, inputs, outputs):
+
+        a, b = self.nodes
+        bufs = [buf[:count] for buf in self.__bufs]
+        a.run(count, inputs, bufs)
+
+        n = b.num_in
+        for j in range(n, a.num_out):
+            bufs[j % n] += bufs[j]
+
+        b.run(count, bufs[:n], outputs)
+
+
+class Graph(object):
+    """Process audio with a graph of FAUST DSPs.
+
+    All intermediate buffers are allocated once, when the graph is created,
+    and the whole graph is processed in blocks of at most block_size samples.
+    """
+
+    def __init__(self, node, block_size=1024):
+        """Initialise a Graph object.
+
+        Parameters:
+        -----------
+
+        node : Node / FAUST / PythonDSP
+            The root node of the graph.
+        block_size : int (optional)
+            The maximum number of samples that are processed at a time, which
+            is also the length of the intermediate buffers.
+        """
+
+        if block_size <= 0:
+            raise ValueError("The block size must be positive.")
+
+        self.node = as_node(node)
+
+        dtypes = set(d.dtype for d in self.node.dsps())
+        if len(dtypes) != 1:
+            raise ValueError("All DSPs must use the same FAUSTFLOAT.")
+
+        self.dtype = dtypes.pop()
+        self.block_size = block_size
+        self.pool = BufferPool(block_size, self.dtype)
+        self.node.plan(self.pool)
+
+    num_in = property(fget=lambda x: x.node.num_in,
+                      doc="The number of input channels.")
+
+    num_out = property(fget=lambda x: x.node.num_out,
+                       doc="The number of output channels.")
+
+    def compute(self, audio, out=None):
+        """
+        Process audio with the graph.
+
+        Parameters:
+        -----------
+
+        audio : numpy.ndarray / int
+            The audio signal to process, or the number of samples to produce
+            if the graph has no inputs.
+        out : numpy.ndarray (optional)
+            Write the output into this 2-D array instead of allocating a new
+            one.
+
+        Returns:
+        --------
+
+        out : numpy.ndarray
+            The output of the graph.
+        """
+
+        if self.num_in > 0:
+            audio = atleast_2d(audio)
+            if audio.shape[0] < self.num_in:
+                raise ValueError(
+                    "audio must have at least {} channels".format(self.num_in)
+                )
+            count = audio.shape[1]
+        else:
+            count = audio
+
+        if out is None:
+            out = ndarray((self.num_out, count), dtype=self.dtype)
+
+        for start in range(0, count, self.block_size):
+            stop = min(start + self.block_size, count)
+            inputs = [audio[i, start:stop] for i in range(self.num_in)]
+            outputs = [out[i, start:stop] for i in range(self.num_out)]
+            self.node.run(stop - start, inputs, outputs)
+
+        return out
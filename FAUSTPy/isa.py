@@ -0,0 +1,149 @@
+"""
+Instruction set variants of compiled FAUST DSPs.
+
+By default, FAUST compiles the C code of a DSP with -march=native, so the
+compiled library only runs on CPUs with the same instruction set extensions as
+the one it was compiled on.  Instead, a DSP can be compiled into several
+variants for different instruction sets (see the "isa" argument of FAUST),
+e.g., on a build host whose CFFI cache is then shipped to other machines.  At
+load time, the best variant that the CPU supports is chosen, based on the
+features listed by NumPy or in /proc/cpuinfo.
+
+The variants of each architecture are listed in ISA_VARIANTS, from best to
+worst, as (name, compiler flags, required CPU features), where the features
+are named as in the "flags" of /proc/cpuinfo.
+"""
+
+import platform
+from collections import namedtuple
+
+ISAVariant = namedtuple("ISAVariant", ["name", "flags", "features"])
+
+# the features of the x86-64 micro-architecture levels of the psABI, which
+# the compiler may use with the corresponding -march option ("pni" is SSE3,
+# "abm" includes LZCNT and "xsave" stands in for OSXSAVE, which Linux does not
+# list, but without which it hides the AVX features)
+_X86_64_V2 = frozenset(("cx16", "lahf_lm", "popcnt", "pni", "sse4_1",
+                        "sse4_2", "ssse3"))
+_X86_64_V3 = _X86_64_V2 | frozenset(("avx", "avx2", "bmi1", "bmi2", "f16c",
+                                     "fma", "abm", "movbe", "xsave"))
+_X86_64_V4 = _X86_64_V3 | frozenset(("avx512f", "avx512bw", "avx512cd",
+                                     "avx512dq", "avx512vl"))
+
+ISA_VARIANTS = {
+    "x86_64": [
+        ISAVariant("avx512", ["-march=x86-64-v4"], _X86_64_V4),
+        ISAVariant("avx2", ["-march=x86-64-v3"], _X86_64_V3),
+        ISAVariant("sse4", ["-march=x86-64-v2"], _X86_64_V2),
+        ISAVariant("baseline", ["-march=x86-64"], frozenset()),
+    ],
+    "aarch64": [
+        ISAVariant("baseline", ["-march=armv8-a"], frozenset()),
+    ],
+}
+
+# the architecture names of platform.machine() that differ from the above
+_MACHINES = {"amd64": "x86_64", "x64": "x86_64", "arm64": "aarch64"}
+
+# the NumPy feature names that differ from those in /proc/cpuinfo
+_NUMPY_FEATURES = {"SSE3": "pni", "SSE41": "sse4_1", "SSE42": "sse4_2",
+                   "FMA3": "fma", "BMI": "bmi1", "LAHF": "lahf_lm",
+                   "LZCNT": "abm"}
+
+
+def machine():
+    """Return the architecture of this machine as named in ISA_VARIANTS."""
+
+    m = platform.machine().lower()
+    return _MACHINES.get(m, m)
+
+
+def cpu_features():
+    """
+    Return the set of instruction set extensions supported by the CPU.
+
+    The features are read from /proc/cpuinfo and, where that is not
+    available, taken from NumPy's CPU dispatcher.
+    """
+
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith(("flags", "Features")):
+                    return frozenset(line.partition(":")[2].split())
+    except (IOError, OSError):
+        pass
+
+    try:
+        try:
+            from numpy._core._multiarray_umath import __cpu_features__
+        except ImportError:
+            from numpy.core._multiarray_umath import __cpu_features__
+    except ImportError:
+        return frozenset()
+
+    features = set(_NUMPY_FEATURES.get(name, name.lower())
+                   for name, supported in __cpu_features__.items()
+                   if supported)
+
+    # NumPy only reports AVX if the OS supports it, i.e., with OSXSAVE
+    if "avx" in features:
+        features.add("xsave")
+
+    return frozenset(features)
+
+
+def get_variants(names="auto", arch=None):
+    """
+    Return the ISAVariants with the given names, from best to worst.
+
+    Parameters:
+    -----------
+
+    names : string / list of strings (optional)
+        The name of a variant, a list of names, or "auto" for all variants of
+        the architecture.
+    arch : string (optional)
+        The architecture.  Defaults to that of this machine.
+    """
+
+    arch = arch or machine()
+    variants = ISA_VARIANTS.get(arch)
+    if variants is None:
+        raise ValueError("No ISA variants for {}.".format(arch))
+
+    if names == "auto":
+        return list(variants)
+
+    if not isinstance(names, (list, tuple)):
+        names = [names]
+
+    unknown = set(names) - set(v.name for v in variants)
+    if unknown:
+        raise ValueError("Unknown ISA variants: {}".format(
+            ", ".join(sorted(unknown))))
+
+    return [v for v in variants if v.name in names]
+
+
+def best_variant(variants, features=None):
+    """
+    Return the first variant whose features the CPU supports, or None.
+
+    Parameters:
+    -----------
+
+    variants : list of ISAVariant
+        The variants, from best to worst.
+    features : set of strings (optional)
+        The CPU features.  Defaults to cpu_features().
+    """
+
+    if features is None:
+        features = cpu_features()
+
+    for v in variants:
+        if v.features <= features:
+            return v
+
+    return None
@@ -0,0 +1,208 @@
+"""
+Live recompilation of a FAUST DSP file with hot-swapping.
+
+A LiveDSP watches a .dsp file and recompiles it in a background thread
+whenever it changes.  The current version keeps processing audio while the
+new one compiles; once it is ready, it replaces the current version at the
+start of the next call to compute() (i.e., at a block boundary).  The values
+of all parameters that exist in both versions are copied by path, so that
+tweaking the code does not reset the controls, and the outputs of the old
+and new versions can be crossfaded to avoid clicks.
+
+If the new code does not compile, the current version is kept and the error
+is available as LiveDSP.error until the next successful compilation.
+"""
+
+import os
+import threading
+from timeit import default_timer
+from numpy import arange, minimum
+from . wrapper import FAUST
+from . python_ui import iter_params, Param
+
+
+class LiveDSP(object):
+    """A FAUST DSP that is recompiled and swapped in when its file changes."""
+
+    def __init__(self, dsp_file, fs, crossfade=0, poll_interval=0.25,
+                 **kwargs):
+        """Initialise a LiveDSP object.
+
+        The DSP is compiled once synchronously, so that compute() can be used
+        right away.  Call start() (or use the LiveDSP as a context manager) to
+        start watching the file.
+
+        Parameters:
+        -----------
+
+        dsp_file : str
+            The path to the FAUST DSP file.
+        fs : int
+            The sampling rate.
+        crossfade : int (optional)
+            The length of the crossfade from the old to the new version in
+            samples.  By default, the versions are switched without one.
+        poll_interval : float (optional)
+            The time between checks for changes of the file in seconds.
+
+        Any other keyword arguments are passed to FAUST.
+        """
+
+        if crossfade < 0:
+            raise ValueError("The crossfade length must not be negative.")
+        if poll_interval <= 0:
+            raise ValueError("The poll interval must be positive.")
+
+        self.dsp_file = dsp_file
+        self.fs = fs
+        self.crossfade = crossfade
+        self.poll_interval = poll_interval
+        self.kwargs = kwargs
+
+        self.version = 0
+        self.error = None
+        self.compile_time = 0.0
+
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None
+        self.__pending = None
+        self.__old = None
+        self.__fade_pos = 0
+
+        self.__mtime = self.__stat()
+        self.__faust = FAUST(dsp_file, fs, **kwargs)
+
+    faust = property(fget=lambda x: x.__faust,
+                     doc="The FAUST object of the current version.")
+
+    dsp = property(fget=lambda x: x.__faust.dsp,
+                   doc="The PythonDSP of the current version.")
+
+    def __stat(self):
+
+        st = os.stat(self.dsp_file)
+        return (st.st_mtime, st.st_size)
+
+    def start(self):
+        """Start watching the DSP file in a background thread."""
+
+        if self.__thread is not None:
+            return
+
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__watch)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def stop(self):
+        """Stop watching the DSP file."""
+
+        if self.__thread is None:
+            return
+
+        self.__stop.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def __enter__(self):
+
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+
+        self.stop()
+
+    def __watch(self):
+
+        while not self.__stop.wait(self.poll_interval):
+            try:
+                mtime = self.__stat()
+            except OSError:
+                # the file may be replaced (e.g., by an editor) right now
+                continue
+
+            if mtime != self.__mtime:
+                self.__mtime = mtime
+                self.reload()
+
+    def reload(self):
+        """
+        Recompile the DSP file now.
+
+        This is called by the watcher thread, but may also be called
+        directly.  On success, the new version is swapped in by the next
+        compute() call and True is returned; on failure, the error is stored
+        in the error attribute and False is returned.
+        """
+
+        t0 = default_timer()
+        try:
+            faust = FAUST(self.dsp_file, self.fs, **self.kwargs)
+        except Exception as e:
+            self.error = e
+            return False
+        self.compile_time = default_timer() - t0
+
+        with self.__lock:
+            self.__pending = faust
+            self.error = None
+
+        return True
+
+    def __swap(self):
+
+        with self.__lock:
+            new, self.__pending = self.__pending, None
+
+        old = self.__faust
+
+        # carry over the parameter values by path
+        values = dict((path, p.zone) for path, p in iter_params(old.dsp.ui)
+                      if type(p) is Param)
+        for path, p in iter_params(new.dsp.ui):
+            if type(p) is Param and path in values:
+                p.zone = values[path]
+
+        # only crossfade if the outputs are compatible
+        if self.crossfade > 0 and \
+                old.dsp.num_in == new.dsp.num_in and \
+                old.dsp.output_rates == new.dsp.output_rates and \
+                len(set(new.dsp.output_rates)) <= 1:
+            self.__old = old.dsp
+            self.__fade_pos = 0
+        else:
+            self.__old = None
+
+        self.__faust = new
+        self.version += 1
+
+    def compute(self, audio):
+        """
+        Process a block with the current version of the DSP.
+
+        If a new version is ready, it is swapped in first.  The arguments are
+        those of PythonDSP.compute(), except that "out" is not supported.
+        """
+
+        if self.__pending is not None:
+            self.__swap()
+
+        out = self.__faust.dsp.compute(audio)
+
+        old = self.__old
+        if old is not None:
+            old_out = old.compute(audio)
+
+            # a linear ramp from the old to the new output
+            n = out.shape[1]
+            ramp = minimum((self.__fade_pos + arange(1, n + 1)) /
+                           float(self.crossfade), 1).astype(out.dtype)
+            out = old_out + ramp*(out - old_out)
+
+            self.__fade_pos += n
+            if self.__fade_pos >= self.crossfade:
+                self.__old = None
+
+        return out
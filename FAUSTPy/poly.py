@@ -0,0 +1,222 @@
+"""
+A polyphonic voice engine for FAUST synthesizers.
+
+A VoicePool creates several instances (voices) of a synthesizer DSP, i.e., a
+DSP without inputs, from one compiled library.  Note events are mapped to the
+frequency, gate and gain parameters of the voices, and all active voices are
+computed and mixed by a single call into C per block.
+"""
+
+from numpy import ndarray, zeros, int32, float64
+from . python_ui import iter_params
+
+
+def midi_to_freq(note):
+    """Convert a MIDI note number to a frequency in Hz."""
+
+    return 440.0 * 2**((note - 69) / 12.0)
+
+
+class VoicePool(object):
+    """A pool of synthesizer voices with voice stealing.
+
+    Voices are allocated by note_on() and released by note_off(), which sets
+    their gate parameter to 0.  A released voice keeps being computed until
+    its output falls below release_threshold, after which it is skipped until
+    it is allocated again.  If all voices are in use, note_on() steals a
+    released voice if there is one, otherwise the oldest voice.
+    """
+
+    def __init__(self, faust, num_voices, freq="freq", gate="gate",
+                 gain="gain", release_threshold=1e-4):
+        """Initialise a VoicePool object.
+
+        Parameters:
+        -----------
+
+        faust : FAUST
+            The FAUST object whose compiled DSP is used for the voices.  The
+            DSP must not have any inputs.
+        num_voices : int
+            The number of voices.
+        freq, gate, gain : str (optional)
+            The labels of the parameters that note_on() and note_off() set.
+            Parameters that the DSP does not have are ignored.
+        release_threshold : float (optional)
+            The peak level below which a released voice is considered silent.
+        """
+
+        if num_voices <= 0:
+            raise ValueError("The number of voices must be positive.")
+
+        self.voices = [faust.new_dsp() for i in range(num_voices)]
+
+        dsp = self.voices[0]
+        if dsp.num_in > 0:
+            raise ValueError("Only DSPs without inputs can be used as voices.")
+
+        self.__ffi = ffi = faust.ffi
+        self.__C = faust.C
+        self.num_out = dsp.num_out
+        self.dtype = dsp.dtype
+        self.release_threshold = release_threshold
+
+        self.__freq = [self.__find_param(v, freq) for v in self.voices]
+        self.__gate = [self.__find_param(v, gate) for v in self.voices]
+        self.__gain = [self.__find_param(v, gain) for v in self.voices]
+
+        # per-voice state that is shared with the C helper
+        self.__active = zeros(num_voices, dtype=int32)
+        self.__retrigger = zeros(num_voices, dtype=int32)
+        self.__peaks = zeros(num_voices, dtype=float64)
+        self.__voices_p = ffi.new("mydsp*[]", [v.dsp for v in self.voices])
+        self.__gates_p = ffi.new(
+            "FAUSTFLOAT*[]",
+            [g._zone if g else ffi.NULL for g in self.__gate]
+        )
+        self.__active_p = ffi.cast("int*", self.__active.ctypes.data)
+        self.__retrigger_p = ffi.cast("int*", self.__retrigger.ctypes.data)
+        self.__peaks_p = ffi.cast("double*", self.__peaks.ctypes.data)
+
+        # the note that each voice plays, whether it was released, and the
+        # order in which the voices were allocated
+        self.__notes = [None]*num_voices
+        self.__released = zeros(num_voices, dtype=bool)
+        self.__age = [0]*num_voices
+        self.__clock = 0
+
+        self.__scratch = None
+        self.__scratch_p = ffi.new("FAUSTFLOAT*[]", self.num_out)
+        self.__output_p = ffi.new("FAUSTFLOAT*[]", self.num_out)
+
+    @staticmethod
+    def __find_param(dsp, label):
+
+        ui = getattr(dsp, "ui", None)
+        if ui is None or label is None:
+            return None
+        for path, p in iter_params(ui):
+            if path.rpartition(".")[2] == "p_" + label:
+                return p
+        return None
+
+    num_active = property(fget=lambda x: int(x.__active.sum()),
+                          doc="The number of voices that are computed.")
+
+    def __allocate(self):
+
+        active = self.__active
+
+        # prefer free voices, then released voices, then the oldest voice
+        free = [v for v in range(len(self.voices)) if not active[v]]
+        if free:
+            return free[0], False
+
+        released = list(self.__released.nonzero()[0])
+        candidates = released or range(len(self.voices))
+        return min(candidates, key=lambda v: self.__age[v]), True
+
+    def note_on(self, note, velocity=1.0):
+        """
+        Start a note.
+
+        Parameters:
+        -----------
+
+        note : int
+            The MIDI note number, which is converted to a frequency.
+        velocity : float (optional)
+            The value of the gain parameter.
+
+        Returns:
+        --------
+
+        voice : int
+            The index of the voice that plays the note.
+        """
+
+        v, stolen = self.__allocate()
+
+        if self.__freq[v]:
+            self.__freq[v].zone = midi_to_freq(note)
+        if self.__gain[v]:
+            self.__gain[v].zone = velocity
+        if self.__gate[v]:
+            if stolen and not self.__released[v]:
+                # let the C helper close the gate for one sample
+                self.__retrigger[v] = 1
+            else:
+                self.__gate[v].zone = 1
+
+        self.__clock += 1
+        self.__notes[v] = note
+        self.__released[v] = False
+        self.__age[v] = self.__clock
+        self.__active[v] = 1
+
+        return v
+
+    def note_off(self, note):
+        """Release all voices that play the given MIDI note."""
+
+        for v, n in enumerate(self.__notes):
+            if n == note and not self.__released[v]:
+                if self.__gate[v]:
+                    self.__gate[v].zone = 0
+                self.__retrigger[v] = 0
+                self.__released[v] = True
+
+    def all_notes_off(self):
+        """Release all voices."""
+
+        for note in set(self.__notes):
+            if note is not None:
+                self.note_off(note)
+
+    def compute(self, count):
+        """
+        Compute and mix all active voices.
+
+        Parameters:
+        -----------
+
+        count : int
+            The number of samples to produce.
+
+        Returns:
+        --------
+
+        out : numpy.ndarray
+            The mix of all voices.
+        """
+
+        ffi = self.__ffi
+        output = ndarray((self.num_out, count), dtype=self.dtype)
+
+        scratch = self.__scratch
+        if scratch is None or scratch.shape[1] < count:
+            scratch = self.__scratch = ndarray((self.num_out, count),
+                                               dtype=self.dtype)
+            for c in range(self.num_out):
+                self.__scratch_p[c] = ffi.cast('FAUSTFLOAT *',
+                                               scratch[c].ctypes.data)
+
+        for c in range(self.num_out):
+            self.__output_p[c] = ffi.cast('FAUSTFLOAT *',
+                                          output[c].ctypes.data)
+
+        self.__C.faustpy_compute_voices(
+            self.__voices_p, len(self.voices), self.__active_p,
+            self.__gates_p, self.__retrigger_p, count, self.__scratch_p,
+            self.__output_p, self.num_out, self.__peaks_p
+        )
+
+        # deactivate released voices that have become silent
+        if count > 0:
+            silent = self.__released & (self.__active != 0) & \
+                (self.__peaks < self.release_threshold)
+            for v in silent.nonzero()[0]:
+                self.__active[v] = 0
+                self.__notes[v] = None
+
+        return output
@@ -0,0 +1,200 @@
+"""
+A pool of reusable instances of a compiled FAUST DSP.
+
+Creating a PythonDSP is comparatively expensive: besides allocating and
+initialising the DSP, its UI and meta-data are built through a number of CFFI
+callbacks.  An InstancePool keeps pre-initialised instances per sampling rate
+and hands them out with checkout().  When an instance is returned, it is reset
+with PythonDSP.reset(), which reinitialises its state and restores the
+parameter defaults without rebuilding the UI.
+"""
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from timeit import default_timer
+
+
+class PoolStats(object):
+    """Usage statistics of an InstancePool.
+
+    A checkout is a hit if a free instance was available (possibly after
+    waiting for one) and a miss if a new instance had to be created.  Wait
+    times are in seconds.
+    """
+
+    def __init__(self):
+
+        self.reset()
+
+    def reset(self):
+        """Reset all counters to zero."""
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    checkouts = property(fget=lambda x: x.hits + x.misses,
+                         doc="The total number of checkouts.")
+
+    hit_rate = property(
+        fget=lambda x: x.hits/float(x.checkouts) if x.checkouts else 0.0,
+        doc="The fraction of checkouts that reused an instance."
+    )
+
+
+class InstancePool(object):
+    """A thread-safe pool of instances of a compiled FAUST DSP.
+
+    Instances are created on demand (up to max_size per sampling rate) and
+    otherwise reused.  If max_size instances of a sampling rate are checked
+    out, further checkouts wait until one is returned.
+    """
+
+    def __init__(self, faust, size=4, max_size=None, fs=None):
+        """Initialise an InstancePool object.
+
+        Parameters:
+        -----------
+
+        faust : FAUST
+            The FAUST object whose compiled DSP is instantiated.
+        size : int (optional)
+            The number of instances to create up front.
+        max_size : int (optional)
+            The maximum number of instances per sampling rate.  Defaults to
+            size.
+        fs : int (optional)
+            The sampling rate of the instances that are created up front.
+            Defaults to the sampling rate of faust.
+        """
+
+        if max_size is None:
+            max_size = size
+        if max_size <= 0 or size < 0 or size > max_size:
+            raise ValueError("Invalid pool size.")
+
+        self.faust = faust
+        self.max_size = max_size
+        self.fs = fs or faust.dsp.fs
+        self.stats = PoolStats()
+
+        self.__cond = threading.Condition()
+        self.__free = defaultdict(list)
+        self.__count = defaultdict(int)
+
+        self.__free[self.fs] = [faust.new_dsp(self.fs) for i in range(size)]
+        self.__count[self.fs] = size
+
+    def size(self, fs=None):
+        """Return the number of instances for a sampling rate."""
+
+        with self.__cond:
+            return self.__count[fs or self.fs]
+
+    def available(self, fs=None):
+        """Return the number of free instances for a sampling rate."""
+
+        with self.__cond:
+            return len(self.__free[fs or self.fs])
+
+    def acquire(self, fs=None, timeout=None):
+        """
+        Take an instance out of the pool.
+
+        Prefer the checkout() context manager, which returns the instance
+        automatically.
+
+        Parameters:
+        -----------
+
+        fs : int (optional)
+            The sampling rate of the instance.  Defaults to the sampling rate
+            of the pool.
+        timeout : float (optional)
+            The maximum time to wait for a free instance, in seconds.  Waits
+            forever by default.
+
+        Returns:
+        --------
+
+        dsp : PythonDSP
+            The instance, in its initial state.
+        """
+
+        fs = fs or self.fs
+        stats = self.stats
+
+        with self.__cond:
+            free = self.__free[fs]
+            if free:
+                stats.hits += 1
+                return free.pop()
+
+            if self.__count[fs] < self.max_size:
+                # reserve the slot, but create the instance without the lock
+                self.__count[fs] += 1
+                stats.misses += 1
+            else:
+                t0 = default_timer()
+                deadline = None if timeout is None else t0 + timeout
+                while not free:
+                    remaining = None if deadline is None \
+                        else deadline - default_timer()
+                    if remaining is not None and remaining <= 0:
+                        raise RuntimeError("No instance available.")
+                    self.__cond.wait(remaining)
+
+                t = default_timer() - t0
+                stats.hits += 1
+                stats.waits += 1
+                stats.wait_time += t
+                stats.max_wait_time = max(stats.max_wait_time, t)
+                return free.pop()
+
+        try:
+            return self.faust.new_dsp(fs)
+        except Exception:
+            with self.__cond:
+                self.__count[fs] -= 1
+            raise
+
+    def release(self, dsp):
+        """
+        Reset an instance and return it to the pool.
+
+        Besides its state and parameters (see PythonDSP.reset()), the options
+        of the instance are restored to those of a new instance, so that they
+        do not carry over to the next checkout.
+        """
+
+        dsp.reset()
+
+        dsp.collect_stats(False)
+        dsp.enable_profiling(False)
+        dsp.flush_denormals = False
+        dsp.detect_denormals = False
+        dsp.denormal_blocks = 0
+        dsp.record_displays(0)
+        dsp.staging_size = type(dsp).staging_size
+        dsp.block_size = getattr(self.faust, "block_size", None)
+        dsp.num_threads = self.faust.num_threads
+
+        with self.__cond:
+            self.__free[dsp.fs].append(dsp)
+            self.__cond.notify_all()
+
+    @contextmanager
+    def checkout(self, fs=None, timeout=None):
+        """
+        A context manager that checks out an instance (see acquire()) and
+        returns it to the pool at the end of the block.
+        """
+
+        dsp = self.acquire(fs, timeout)
+        try:
+            yield dsp
+        finally:
+            self.release(dsp)
@@ -1,4 +1,206 @@
-from numpy import atleast_2d, ndarray, float32, float64, float128
+from timeit import default_timer
+from numpy import array, asarray, atleast_2d, frombuffer, ndarray, zeros, \
+    concatenate, sqrt, maximum, float32, float64, float128, int64, intc, \
+    uintp, argsort, floor, rint, where
+from . python_ui import iter_params, Param, Display
+
+
+class BlockStats(object):
+    """Per-channel statistics of the output of a PythonDSP.
+
+    The statistics are computed by the C helper that calls computemydsp(), so
+    they do not require another pass over the output.  Non-finite samples
+    (NaN and +/-inf) are counted separately and excluded from the other
+    statistics.
+    """
+
+    def __init__(self, ffi, num_channels, rates=None):
+        """Initialise a BlockStats object.
+
+        Parameters:
+        -----------
+
+        ffi : cffi.FFI
+            The CFFI instance that holds all the data type declarations.
+        num_channels : int
+            The number of (output) channels.
+        rates : sequence of int (optional)
+            The rate of each channel.  Defaults to 1 for all channels.
+        """
+
+        self.peak = zeros(num_channels)
+        self.nonfinite = zeros(num_channels, dtype=int64)
+        self.count = zeros(num_channels, dtype=int64)
+        self.rates = array(rates if rates is not None else [1]*num_channels,
+                           dtype=int64)
+        self._sum = zeros(num_channels)
+        self._sumsq = zeros(num_channels)
+
+        # pointers that are passed to the C helper
+        self._peak_p = ffi.cast("double*", self.peak.ctypes.data)
+        self._nonfinite_p = ffi.cast("long long*", self.nonfinite.ctypes.data)
+        self._sum_p = ffi.cast("double*", self._sum.ctypes.data)
+        self._sumsq_p = ffi.cast("double*", self._sumsq.ctypes.data)
+
+    def reset(self):
+        """Reset all statistics to zero."""
+
+        self.peak[:] = 0
+        self.nonfinite[:] = 0
+        self._sum[:] = 0
+        self._sumsq[:] = 0
+        self.count[:] = 0
+
+    def __finite_count(self):
+
+        return maximum(self.count - self.nonfinite, 1)
+
+    rms = property(fget=lambda x: sqrt(x._sumsq/x.__finite_count()),
+                   doc="The RMS value of each channel.")
+
+    dc = property(fget=lambda x: x._sum/x.__finite_count(),
+                  doc="The mean (DC offset) of each channel.")
+
+
+class ComputeProfile(object):
+    """Timing counters of the compute functions of a PythonDSP.
+
+    The time spent in computemydsp() is measured in C, so dsp_time does not
+    include any Python or CFFI overhead, while total_time covers the whole
+    call to compute(), compute_interleaved() or render_score().  All times are
+    in seconds.
+    """
+
+    def __init__(self, ffi, fs):
+        """Initialise a ComputeProfile object.
+
+        Parameters:
+        -----------
+
+        ffi : cffi.FFI
+            The CFFI instance that holds all the data type declarations.
+        fs : int
+            The sampling rate of the DSP, from which the realtime factor is
+            derived.
+        """
+
+        self.fs = fs
+        self._dsp_time = zeros(1)
+        self._dsp_time_p = ffi.cast("double*", self._dsp_time.ctypes.data)
+        self.reset()
+
+    def reset(self):
+        """Reset all counters to zero."""
+
+        self.calls = 0
+        self.samples = 0
+        self.total_time = 0.0
+        self.max_total_time = 0.0
+        self.max_dsp_time = 0.0
+        self._dsp_time[0] = 0
+
+    dsp_time = property(fget=lambda x: float(x._dsp_time[0]),
+                        doc="The cumulative time spent in computemydsp().")
+
+    overhead = property(fget=lambda x: x.total_time - x.dsp_time,
+                        doc="The cumulative time spent outside of "
+                            "computemydsp().")
+
+    realtime_factor = property(
+        fget=lambda x: x.samples/float(x.fs)/x.total_time
+        if x.total_time > 0 else float("inf"),
+        doc="The duration of the processed audio divided by total_time, i.e.,"
+            " how many times faster than real time the DSP runs."
+    )
+
+    def _start(self):
+
+        self.__t0 = default_timer()
+        self.__dsp_t0 = self._dsp_time[0]
+
+    def _stop(self):
+
+        t = default_timer() - self.__t0
+        self.calls += 1
+        self.total_time += t
+        self.max_total_time = max(self.max_total_time, t)
+        self.max_dsp_time = max(self.max_dsp_time,
+                                self._dsp_time[0] - self.__dsp_t0)
+
+
+class DisplayHistory(object):
+    """A ring buffer that records the values of passive UI widgets.
+
+    The buffer is allocated once, and every call to record() copies the current
+    values of all recorded Display objects into the next row, overwriting the
+    oldest row once the buffer is full.
+    """
+
+    def __init__(self, displays, length, dtype):
+        """Initialise a DisplayHistory object.
+
+        Parameters:
+        -----------
+
+        displays : list of (str, Display) tuples
+            The paths and Display objects to record (see iter_params()).
+        length : int
+            The number of rows (i.e., sub-blocks) the buffer can hold.
+        dtype : numpy.dtype
+            The dtype of the buffer, which should correspond to FAUSTFLOAT.
+        """
+
+        if length <= 0:
+            raise ValueError("The history length must be positive.")
+
+        self.paths = [path for path, d in displays]
+        self.__zones = [d._zone for path, d in displays]
+        self.__data = zeros((length, len(self.__zones)), dtype=dtype)
+        self.__positions = zeros(length, dtype=int64)
+        self.__next = 0
+        self.__len = 0
+
+    def __len__(self):
+
+        return self.__len
+
+    def record(self, position):
+        """Record the current widget values.
+
+        Parameters:
+        -----------
+
+        position : int
+            The sample index (counting from the start of recording) at which
+            the values were read.
+        """
+
+        row = self.__data[self.__next]
+        for i, zone in enumerate(self.__zones):
+            row[i] = zone[0]
+        self.__positions[self.__next] = position
+
+        self.__next = (self.__next + 1) % self.__data.shape[0]
+        self.__len = min(self.__len + 1, self.__data.shape[0])
+
+    def clear(self):
+        """Discard all recorded values."""
+
+        self.__next = 0
+        self.__len = 0
+
+    def __ordered(self, a):
+
+        if self.__len < a.shape[0]:
+            return a[:self.__len].copy()
+        return concatenate((a[self.__next:], a[:self.__next]))
+
+    values = property(fget=lambda x: x.__ordered(x.__data),
+                      doc="The recorded values in chronological order, one "
+                          "row per sub-block and one column per path.")
+
+    positions = property(fget=lambda x: x.__ordered(x.__positions),
+                         doc="The sample index of each row in values.")
 
 
 class PythonDSP(object):
@@ -53,6 +255,28 @@ class PythonDSP(object):
         self.__input_p = self.__ffi.new("FAUSTFLOAT*[]", self.num_in)
         self.__output_p = self.__ffi.new("FAUSTFLOAT*[]", self.num_out)
 
+        # Query the rate of each channel, i.e., the number of samples per
+        # frame.  Multirate DSPs (e.g., up- or downsamplers) have channels
+        # with different rates, which compute() takes into account when it
+        # validates and allocates buffers.
+        self.__in_rates = tuple(C.getInputRatemydsp(self.__dsp, i)
+                                for i in range(self.num_in))
+        self.__out_rates = tuple(C.getOutputRatemydsp(self.__dsp, i)
+                                 for i in range(self.num_out))
+        self.__out_rates_p = self.__ffi.new("int[]", self.__out_rates)
+
+        # statistics, denormal handling, profiling and passive widget
+        # recording are disabled by default; the flags are passed to
+        # faustpy_compute()
+        self.__flags = 0
+        self.__num_threads = 0
+        self.__stats = None
+        self.__profile = None
+        self.__underflows = 0
+        self.__history = None
+        self.__history_block = 0
+        self.__history_pos = 0
+
     dsp = property(fget=lambda x: x.__dsp,
                    doc="The DSP struct that calls back to its parent object.")
 
@@ -71,7 +295,339 @@ class PythonDSP(object):
     num_out = property(fget=lambda s: s.__C.getNumOutputsmydsp(s.__dsp),
                        doc="The number of output channels.")
 
-    def compute(self, audio):
+    input_rates = property(fget=lambda x: x.__in_rates,
+                           doc="The rate of each input channel.")
+
+    output_rates = property(fget=lambda x: x.__out_rates,
+                            doc="The rate of each output channel.")
+
+    display_history = property(
+        fget=lambda x: x.__history,
+        doc="The DisplayHistory filled by compute(), or None if disabled."
+    )
+
+    stats = property(
+        fget=lambda x: x.__stats,
+        doc="The BlockStats of the last compute() call, or None if disabled."
+    )
+
+    def reset(self):
+        """
+        Reset the DSP to its initial state without recreating it.
+
+        The state of the DSP is reinitialised with instanceInitmydsp() and all
+        parameters are set to their default values, but the UI, meta-data and
+        buffers are kept.
+        """
+
+        self.__C.instanceInitmydsp(self.__dsp, self.fs)
+
+        ui = getattr(self, "ui", None)
+        if ui is not None:
+            for path, p in iter_params(ui):
+                if type(p) is Param:
+                    p._zone[0] = p.default
+
+    def collect_stats(self, enable=True):
+        """
+        Enable or disable the computation of output statistics.
+
+        When enabled, every call to compute() resets the stats attribute and
+        fills it with the per-channel peak, RMS and DC values and the number
+        of non-finite samples of the output it returns.
+
+        Parameters:
+        -----------
+
+        enable : bool (optional)
+            Whether to collect statistics.
+        """
+
+        if enable:
+            self.__stats = BlockStats(self.__ffi, self.num_out,
+                                      self.__out_rates)
+        else:
+            self.__stats = None
+        self.__set_flag(self.__C.FAUSTPY_STATS, enable)
+
+    profile = property(
+        fget=lambda x: x.__profile,
+        doc="The ComputeProfile of this DSP, or None if disabled."
+    )
+
+    def enable_profiling(self, enable=True):
+        """
+        Enable or disable the timing of the compute functions.
+
+        When enabled, the profile attribute holds a ComputeProfile that counts
+        the calls and processed samples of compute(), compute_interleaved()
+        and render_score() and measures the time spent in computemydsp()
+        versus the whole call.  The counters accumulate until they are reset
+        with profile.reset().  When disabled, the only overhead is a check
+        of the profile attribute per call.
+
+        Parameters:
+        -----------
+
+        enable : bool (optional)
+            Whether to profile.
+        """
+
+        if enable:
+            self.__profile = ComputeProfile(self.__ffi, self.fs)
+        else:
+            self.__profile = None
+        self.__set_flag(self.__C.FAUSTPY_PROFILE, enable)
+
+    def __set_flag(self, flag, enable):
+
+        if enable:
+            self.__flags |= flag
+        else:
+            self.__flags &= ~flag
+
+    flush_denormals = property(
+        fget=lambda x: bool(x.__flags & x.__C.FAUSTPY_FTZ),
+        fset=lambda x, v: x.__set_flag(x.__C.FAUSTPY_FTZ, v),
+        doc="""Whether compute() runs in flush-to-zero/denormals-are-zero mode.
+
+        The FPU control state is set before and restored after every call to
+        computemydsp(), so it does not leak into other code.  This only
+        affects SSE (x86) and NEON (AArch64) arithmetic; a "long double" DSP
+        is computed by the x87 unit, which has no such mode, so only
+        detect_denormals is effective there."""
+    )
+
+    detect_denormals = property(
+        fget=lambda x: bool(x.__flags & x.__C.FAUSTPY_UNDERFLOW),
+        fset=lambda x, v: x.__set_flag(x.__C.FAUSTPY_UNDERFLOW, v),
+        doc="""Whether compute() counts blocks that produce subnormal numbers.
+
+        The count is available via the denormal_blocks attribute."""
+    )
+
+    def __reset_underflows(self, value):
+
+        self.__underflows = value
+
+    denormal_blocks = property(
+        fget=lambda x: x.__underflows,
+        fset=__reset_underflows,
+        doc="The number of computemydsp() calls that produced (or, with "
+            "flush_denormals, flushed) subnormal numbers.  Assign 0 to reset."
+    )
+
+    def record_displays(self, length, block_size=64):
+        """
+        Record the values of passive UI widgets (bargraphs and displays)
+        during compute().
+
+        When enabled, compute() processes its input in sub-blocks of at most
+        block_size samples and records the values of all Display objects in
+        the UI after every sub-block into a preallocated ring buffer, which is
+        available via the display_history attribute.
+
+        Parameters:
+        -----------
+
+        length : int
+            The number of sub-blocks to keep.  A value of 0 disables
+            recording.
+        block_size : int (optional)
+            The maximum number of samples between two recordings.
+        """
+
+        if length == 0:
+            self.__history = None
+            return
+
+        if block_size <= 0:
+            raise ValueError("The block size must be positive.")
+
+        ui = getattr(self, "ui", None)
+        displays = [(path, obj) for path, obj in
+                    (iter_params(ui) if ui is not None else ())
+                    if type(obj) is Display]
+
+        self.__history = DisplayHistory(displays, length, self.__dtype)
+        self.__history_block = block_size
+        self.__history_pos = 0
+
+    def __set_num_threads(self, num_threads):
+
+        if num_threads is not None:
+            if num_threads <= 0:
+                raise ValueError("The number of threads must be positive.")
+            if not self.__C.faustpy_openmp():
+                raise ValueError("The DSP was not compiled with OpenMP.")
+        self.__num_threads = num_threads or 0
+
+    num_threads = property(
+        fget=lambda x: x.__num_threads or None,
+        fset=__set_num_threads,
+        doc="""The number of threads of an OpenMP DSP, or None for the default
+        of the OpenMP runtime (e.g., from OMP_NUM_THREADS).
+
+        It is set for every call to computemydsp(), so it applies regardless
+        of the thread that calls compute()."""
+    )
+
+    def __call_dsp(self, count, inputs, outputs):
+
+        flags = self.__flags
+        num_threads = self.__num_threads
+
+        if not flags and not num_threads:
+            self.__C.computemydsp(self.__dsp, count, inputs, outputs)
+            return
+
+        self.__underflows += self.__C.faustpy_compute(
+            self.__dsp, count, inputs, outputs, self.num_out,
+            self.__out_rates_p, flags, num_threads, *self.__helper_args(count)
+        )
+
+    def __helper_args(self, count):
+
+        # the statistics and profiling arguments of faustpy_compute() for
+        # count frames
+        NULL = self.__ffi.NULL
+        profile = self.__profile
+        if profile is None:
+            dsp_time_p = NULL
+        else:
+            dsp_time_p = profile._dsp_time_p
+            profile.samples += count
+
+        stats = self.__stats
+        if stats is None:
+            return NULL, NULL, NULL, NULL, dsp_time_p
+
+        stats.count += count*stats.rates
+        return (stats._peak_p, stats._sum_p, stats._sumsq_p,
+                stats._nonfinite_p, dsp_time_p)
+
+    def __is_direct(self, x):
+
+        # whether a channel can be passed to the DSP without staging
+        return x.dtype == self.__dtype and \
+            (x.strides[0] == x.itemsize or x.shape[0] <= 1)
+
+    def __staging(self, attr, num_chan, rate):
+
+        # get a staging buffer, which is only (re-)allocated if necessary
+        shape = (num_chan, self.staging_size*rate)
+        buf = getattr(self, attr, None)
+        if buf is None or buf.shape != shape:
+            buf = ndarray(shape, dtype=self.__dtype)
+            setattr(self, attr, buf)
+        return buf
+
+    def __compute(self, count, inputs, outputs, reset_stats=True):
+
+        ffi = self.__ffi
+        history = self.__history
+        input_p, output_p = self.__input_p, self.__output_p
+        in_rates, out_rates = self.__in_rates, self.__out_rates
+
+        if self.__stats is not None and reset_stats:
+            self.__stats.reset()
+
+        in_direct = [self.__is_direct(x) for x in inputs]
+        out_direct = [self.__is_direct(x) for x in outputs]
+
+        # the block size is only limited if necessary, otherwise the DSP is
+        # called exactly once
+        block = max(count, 1)
+        if self.block_size:
+            block = min(block, self.block_size)
+        if history is not None:
+            block = min(block, self.__history_block)
+        if not all(in_direct) or not all(out_direct):
+            block = min(block, self.staging_size)
+
+        # Channels that are not contiguous or whose dtype differs from
+        # FAUSTFLOAT are converted block by block into (and out of) reused
+        # staging buffers, all others are passed to the DSP directly.
+        in_base = []
+        if not all(in_direct):
+            stage_in = self.__staging("_PythonDSP__stage_in", len(inputs),
+                                      max(in_rates))
+        for i, x in enumerate(inputs):
+            if in_direct[i]:
+                in_base.append(ffi.cast('FAUSTFLOAT *', x.ctypes.data))
+            else:
+                in_base.append(None)
+                input_p[i] = ffi.cast('FAUSTFLOAT *', stage_in[i].ctypes.data)
+
+        out_base = []
+        if not all(out_direct):
+            stage_out = self.__staging("_PythonDSP__stage_out", len(outputs),
+                                       max(out_rates))
+        for i, x in enumerate(outputs):
+            if out_direct[i]:
+                out_base.append(ffi.cast('FAUSTFLOAT *', x.ctypes.data))
+            else:
+                out_base.append(None)
+                output_p[i] = ffi.cast('FAUSTFLOAT *',
+                                       stage_out[i].ctypes.data)
+
+        # if all channels of a 2-D array are staged (e.g., interleaved data)
+        # and have the same rate, they are (de-)interleaved with a single
+        # strided copy per block; note that a 2-D output array may be passed
+        # to a multirate DSP
+        in_2d = type(inputs) is ndarray and not any(in_direct) and \
+            len(set(in_rates)) <= 1
+        out_2d = type(outputs) is ndarray and not any(out_direct) and \
+            len(set(out_rates)) <= 1
+        in_r = in_rates[0] if in_rates else 1
+        out_r = out_rates[0] if out_rates else 1
+
+        start = 0
+        while True:
+            n = min(block, count - start)
+            stop = start + n
+
+            if in_2d:
+                stage_in[:, :n*in_r] = inputs[:, start*in_r:stop*in_r]
+            else:
+                for i, x in enumerate(inputs):
+                    r = in_rates[i]
+                    if in_base[i] is None:
+                        stage_in[i, :n*r] = x[start*r:stop*r]
+                    else:
+                        input_p[i] = in_base[i] + start*r
+            if not out_2d:
+                for i in range(len(outputs)):
+                    if out_base[i] is not None:
+                        output_p[i] = out_base[i] + start*out_rates[i]
+
+            self.__call_dsp(n, input_p, output_p)
+
+            if out_2d:
+                outputs[:, start*out_r:stop*out_r] = stage_out[:, :n*out_r]
+            else:
+                for i, x in enumerate(outputs):
+                    r = out_rates[i]
+                    if out_base[i] is None:
+                        x[start*r:stop*r] = stage_out[i, :n*r]
+
+            if history is not None and n > 0:
+                self.__history_pos += n
+                history.record(self.__history_pos)
+
+            start = stop
+            if start >= count:
+                break
+
+    # the maximum number of samples that are converted at a time when input
+    # or output channels need to be staged
+    staging_size = 4096
+
+    # the maximum number of frames computemydsp() processes at a time (no
+    # limit if None), see also FAUSTPy.autotune
+    block_size = None
+
+    def compute(self, audio, out_dtype=None, out=None):
         """
         Process an ndarray with the FAUST DSP.
 
@@ -80,9 +636,13 @@ class PythonDSP(object):
 
         The first argument depends on the type of DSP (synthesizer or effect):
 
-        audio : numpy.ndarray
+        audio : numpy.ndarray / sequence
             If the DSP is an effect (i.e., it processes input data and produces
-            output), the first argument is an audio signal to process.
+            output), the first argument is an audio signal to process.  It may
+            be of any floating point dtype.  Instead of a 2-D array, you may
+            also pass a sequence of 1-D channels (e.g., arrays or other objects
+            that support the buffer protocol), which avoids having to stack
+            separate buffers.
 
         or
 
@@ -91,60 +651,403 @@ class PythonDSP(object):
             output), the first argument is the number of output samples to
             produce
 
+        out_dtype : numpy.dtype (optional)
+            The dtype of the output.  Defaults to the dtype of the DSP.
+        out : numpy.ndarray / sequence (optional)
+            Write the output into this 2-D array or sequence of writeable 1-D
+            channels instead of allocating a new array.  Its dtype overrides
+            out_dtype.
+
         Returns:
         --------
 
-        out : numpy.ndarray
-            The output of the DSP.
+        out : numpy.ndarray / sequence
+            The output of the DSP (out, if it was passed).  If the output
+            channels of the DSP have different rates (see output_rates), this
+            is a list of 1-D arrays.
 
         Notes:
         ------
 
         This function uses the buffer protocol to avoid copying the input data.
+        Input (and output) data whose dtype differs from the dtype of the DSP
+        or whose channels are not contiguous in memory (e.g., a Fortran-ordered
+        array) is converted in blocks of at most staging_size samples into a
+        reused buffer, so it is never copied as a whole.
+
+        For multirate DSPs, "count" refers to frames: a channel with rate r
+        holds r samples per frame (see input_rates and output_rates).
         """
 
+        profile = self.__profile
+        if profile is not None:
+            profile._start()
+
         if self.num_in > 0:
-            # returns a view, so very little overhead
-            audio = atleast_2d(audio)
-
-            # Verify that audio.dtype == self.dtype, because a) Python
-            # SEGFAULTs when audio.dtype < self.dtype and b) the computation is
-            # garbage when audio.dtype > self.dtype.
-            if audio.dtype != self.__dtype:
-                raise ValueError("audio.dtype must be {}".format(self.__dtype))
-
-            count = audio.shape[1]  # number of samples
-            num_in = self.num_in    # number of input channels
-
-            # set up the input pointers
-            for i in range(num_in):
-                self.__input_p[i] = self.__ffi.cast('FAUSTFLOAT *',
-                                                    audio[i].ctypes.data)
+            if isinstance(audio, (list, tuple)):
+                audio = self.__as_channels(audio)
+            else:
+                # returns a view, so very little overhead
+                audio = atleast_2d(audio)
+            count, inputs = self.__get_inputs(audio)
         else:
             # special case for synthesizers: the input argument is the number
             # of samples
-            count = audio
+            count, inputs = audio, ()
 
-        num_out = self.num_out   # number of output channels
+        if out is None:
+            output = self.__new_output(count, out_dtype or self.__dtype)
+        else:
+            output = self.__get_outputs(out, count)
 
-        # initialise the output array
-        output = ndarray((num_out, count), dtype=self.__dtype)
+        # call the DSP
+        self.__compute(count, inputs, output)
 
-        # set up the output pointers
-        for i in range(num_out):
-            self.__output_p[i] = self.__ffi.cast('FAUSTFLOAT *',
-                                                 output[i].ctypes.data)
+        if profile is not None:
+            profile._stop()
 
-        # call the DSP
-        self.__C.computemydsp(self.__dsp, count, self.__input_p,
-                              self.__output_p)
+        return output if out is None else out
+
+    def __new_output(self, count, dtype):
+
+        # initialise the output array; if the output channels have different
+        # rates, they cannot be stored in a 2-D array
+        rates = self.__out_rates
+        if len(set(rates)) <= 1:
+            rate = rates[0] if rates else 1
+            return ndarray((self.num_out, count*rate), dtype=dtype)
+        return [ndarray(count*r, dtype=dtype) for r in rates]
+
+    def __as_channels(self, buffers, writeable=False):
+
+        channels = []
+        for b in buffers:
+            if isinstance(b, ndarray):
+                c = b
+            elif memoryview(b).format in ("B", "b", "c"):
+                # raw bytes are interpreted as FAUSTFLOAT samples
+                c = frombuffer(b, dtype=self.__dtype)
+            else:
+                c = asarray(b)
+
+            if c.ndim != 1:
+                raise ValueError("Channels must be one-dimensional.")
+            if writeable and not c.flags.writeable:
+                raise ValueError("Output channels must be writeable.")
+            channels.append(c)
+
+        return channels
+
+    def __get_outputs(self, out, count):
+
+        if isinstance(out, ndarray):
+            outputs = atleast_2d(out)
+            if not outputs.flags.writeable:
+                raise ValueError("out must be writeable.")
+        else:
+            outputs = self.__as_channels(out, writeable=True)
+
+        if len(outputs) < self.num_out:
+            raise ValueError(
+                "out must have at least {} channels".format(self.num_out)
+            )
+        outputs = outputs[:self.num_out]
+
+        if any(c.dtype.kind != "f" for c in outputs):
+            raise ValueError("out.dtype must be a floating point type")
+        if any(c.shape[0] < count*r
+               for c, r in zip(outputs, self.__out_rates)):
+            raise ValueError(
+                "out must have room for at least {} frames".format(count)
+            )
+
+        return outputs
+
+    def __get_inputs(self, audio):
+
+        if not isinstance(audio, ndarray):
+            # a list of separate channels
+            if len(audio) < self.num_in:
+                raise ValueError(
+                    "audio must have at least {} channels".format(self.num_in)
+                )
+            audio = audio[:self.num_in]
+
+            if any(c.dtype.kind != "f" for c in audio):
+                raise ValueError("audio.dtype must be a floating point type")
+
+            # every channel must hold the same number of frames
+            frames = set(divmod(c.shape[0], r)
+                         for c, r in zip(audio, self.__in_rates))
+            if len(frames) > 1 or frames.pop()[1] != 0:
+                raise ValueError("All channels must have the same length "
+                                 "(times their rate).")
+
+            return audio[0].shape[0]//self.__in_rates[0], audio
+
+        # Other floating point types are converted to FAUSTFLOAT, but anything
+        # else is most likely an error.
+        if audio.dtype.kind != "f":
+            raise ValueError("audio.dtype must be a floating point type")
+
+        if audio.shape[0] < self.num_in:
+            raise ValueError(
+                "audio must have at least {} channels".format(self.num_in)
+            )
+
+        rate = self.__uniform_rate(self.__in_rates)
+        if audio.shape[1] % rate:
+            raise ValueError(
+                "The length of audio must be a multiple of {}".format(rate)
+            )
+
+        # return the number of frames and the input channels
+        return audio.shape[1]//rate, audio[:self.num_in]
+
+    def __uniform_rate(self, rates):
+
+        if len(set(rates)) > 1:
+            raise ValueError("The channels of the DSP have different rates, "
+                             "pass a list of channels instead.")
+        return rates[0] if rates else 1
+
+    def compute_interleaved(self, audio, out_dtype=None):
+        """
+        Process interleaved audio with the FAUST DSP.
+
+        This is like compute(), except that the input and output arrays are
+        interleaved, i.e., of shape (samples, channels), which is the layout
+        that most audio file libraries and sound card APIs use.
+
+        Parameters:
+        -----------
+
+        audio : numpy.ndarray / int
+            The interleaved audio signal to process, or the number of output
+            samples to produce in case of a synthesizer.
+        out_dtype : numpy.dtype (optional)
+            The dtype of the output.  Defaults to the dtype of the DSP.
+
+        Returns:
+        --------
+
+        out : numpy.ndarray
+            The interleaved output of the DSP.
+
+        Notes:
+        ------
+
+        The channels are de-interleaved into and re-interleaved out of
+        staging buffers of staging_size samples, which are small enough to
+        stay in the cache.
+        """
+
+        profile = self.__profile
+        if profile is not None:
+            profile._start()
+
+        if self.num_in > 0:
+            audio = asarray(audio)
+            if audio.ndim == 1:
+                audio = audio.reshape((-1, 1))
+            count, inputs = self.__get_inputs(audio.T)
+        else:
+            count, inputs = audio, ()
+
+        rate = self.__uniform_rate(self.__out_rates)
+        output = ndarray((count*rate, self.num_out),
+                         dtype=out_dtype or self.__dtype)
+
+        self.__compute(count, inputs, output.T)
+
+        if profile is not None:
+            profile._stop()
+
+        return output
+
+    def render_score(self, events, duration, audio=None, out_dtype=None):
+        """
+        Render audio while changing parameters at given sample positions.
+
+        The events are sorted by time and the DSP is computed in segments
+        between consecutive event times, so that every parameter change takes
+        effect at exactly the requested sample.  The parameters are resolved
+        and their values limited and quantised before rendering, so that
+        applying an event only means writing to its zone.  Unless channels
+        are staged (see compute()), have different rates or passive widgets
+        are recorded, the whole score is rendered in a single C call.
+
+        Parameters:
+        -----------
+
+        events : iterable of (int, str, float) tuples
+            The events as (time, path, value), where time is the sample (or
+            frame) index (a whole number) and path is the path of a parameter relative to the
+            "ui" attribute, as returned by FAUSTPy.python_ui.iter_params()
+            (e.g., "p_gate" or "b_reverb.p_decay").  Events at the same time
+            are applied in the order given; events at or after duration are
+            ignored.
+        duration : int
+            The number of samples (or frames) to render.
+        audio : numpy.ndarray (optional)
+            The input signal, which is required if the DSP has inputs.  It
+            must hold at least duration samples.
+        out_dtype : numpy.dtype (optional)
+            The dtype of the output.  Defaults to the dtype of the DSP.
+
+        Returns:
+        --------
+
+        out : numpy.ndarray
+            The output of the DSP.
+        """
+
+        profile = self.__profile
+        if profile is not None:
+            profile._start()
+
+        if self.num_in > 0:
+            if audio is None:
+                raise ValueError("The DSP has inputs, so audio is required.")
+            count, inputs = self.__get_inputs(atleast_2d(audio))
+            if count < duration:
+                raise ValueError("audio must hold at least duration samples.")
+        else:
+            inputs = ()
+
+        schedule = self.__schedule(events, duration)
+
+        output = self.__new_output(duration, out_dtype or self.__dtype)
+        in_rates, out_rates = self.__in_rates, self.__out_rates
+
+        # unless channels are staged, have different rates or passive widgets
+        # are recorded, the score is rendered in C
+        if self.__history is None and \
+                set(in_rates + out_rates) <= set([1]) and \
+                all(self.__is_direct(x) for x in inputs) and \
+                all(self.__is_direct(x) for x in output):
+            self.__render_events(duration, inputs, output, schedule)
+        else:
+            self.__render_segments(duration, inputs, output, schedule)
+
+        if profile is not None:
+            profile._stop()
 
         return output
 
-    # TODO: Run some more serious tests to check whether compute2() is worth
-    # keeping, because with the bundled DSP the run-time is about 83 us for
-    # 2x64 samples versus about 90 us for compute(), so only about 7 us
-    # difference.
+    def __schedule(self, events, duration):
+
+        # Return the events before duration sorted by time (keeping the given
+        # order of events at the same time) as arrays of times, parameter
+        # indices and quantised values, and the zones of the parameters.  The
+        # events are converted with a few array operations instead of one by
+        # one, since a score may hold hundreds of thousands of them.
+        events = list(events)
+        if set(map(len, events)) - set([3]):
+            raise ValueError("Events must be (time, path, value) tuples.")
+        times, paths, values = zip(*events) if events else ((), (), ())
+
+        times = asarray(times, dtype=float64)
+        if (times != floor(times)).any():
+            raise ValueError("Event times must be whole numbers.")
+        if (times < 0).any():
+            raise ValueError("Event times must not be negative.")
+
+        # look up every parameter only once
+        params = dict(iter_params(self.ui))
+        names = sorted(set(paths))
+        for path in names:
+            if type(params.get(path)) is not Param:
+                raise ValueError("{} is not a parameter.".format(path))
+        index = dict((path, k) for k, path in enumerate(names))
+        indices = array([index[path] for path in paths], dtype=intc)
+
+        # limit and quantise the values like Param.quantize()
+        values = asarray(values, dtype=float64)
+        for k, path in enumerate(names):
+            p = params[path]
+            lo, hi, step = float(p.min), float(p.max), float(p.step)
+            mask = indices == k
+            v = values[mask]
+            q = lo + rint((v - lo)/step)*step if step else v
+            values[mask] = where(v >= hi, hi, where(v <= lo, lo, q))
+
+        keep = times < duration
+        order = argsort(times[keep], kind="stable")
+
+        return (times[keep][order].astype(intc), indices[keep][order],
+                values[keep][order].astype(self.__dtype),
+                [params[path]._zone for path in names])
+
+    def __render_segments(self, count, inputs, outputs, schedule):
+
+        # render a schedule (see __schedule()) by computing the segments
+        # between event times with __compute()
+        in_rates, out_rates = self.__in_rates, self.__out_rates
+        times, indices, values, zones = schedule
+        times, indices, values = times.tolist(), indices.tolist(), \
+            values.tolist()
+
+        def segment(channels, rates, a, b):
+            if isinstance(channels, ndarray):
+                r = rates[0] if rates else 1
+                return channels[:, a*r:b*r]
+            return [c[a*r:b*r] for c, r in zip(channels, rates)]
+
+        start = 0
+        k = 0
+        num_events = len(times)
+        while True:
+            # apply all events up to and including the current time
+            while k < num_events and times[k] <= start:
+                zones[indices[k]][0] = values[k]
+                k += 1
+
+            stop = times[k] if k < num_events else count
+            if stop > start or start == 0:
+                self.__compute(
+                    stop - start,
+                    segment(inputs, in_rates, start, stop),
+                    segment(outputs, out_rates, start, stop),
+                    reset_stats=start == 0
+                )
+
+            start = stop
+            if start >= count:
+                break
+
+    def __render_events(self, count, inputs, outputs, schedule):
+
+        # like __render_segments(), but in C, for unstaged single-rate
+        # channels
+        ffi = self.__ffi
+        input_p, output_p = self.__input_p, self.__output_p
+
+        for i, x in enumerate(inputs):
+            input_p[i] = ffi.cast('FAUSTFLOAT *', x.ctypes.data)
+        for i, x in enumerate(outputs):
+            output_p[i] = ffi.cast('FAUSTFLOAT *', x.ctypes.data)
+
+        times, indices, values, zones = schedule
+        zones = array([int(ffi.cast("uintptr_t", z)) for z in zones],
+                      dtype=uintp)[indices]
+
+        if self.__stats is not None:
+            self.__stats.reset()
+
+        self.__underflows += self.__C.faustpy_render_score(
+            self.__dsp, count, input_p, output_p, len(inputs), self.num_out,
+            self.block_size or 0, len(times),
+            ffi.cast("int *", times.ctypes.data),
+            ffi.cast("FAUSTFLOAT **", zones.ctypes.data),
+            ffi.cast("FAUSTFLOAT *", values.ctypes.data), self.__out_rates_p, self.__flags, self.__num_threads,
+            *self.__helper_args(count)
+        )
+
+    # TODO: Check whether compute2() is worth keeping, because with the
+    # bundled DSP the run-time is about 83 us for 2x64 samples versus about 90
+    # us for compute(), so only about 7 us difference.  The benchmark suite
+    # (python -m FAUSTPy.benchmark) compares both across block sizes.
     def compute2(self, audio):
         """
         Process an ndarray with the FAUST DSP, like compute(), but without any
@@ -189,8 +1092,17 @@ class PythonDSP(object):
             self.__input_p[i] = self.__ffi.cast('FAUSTFLOAT *',
                                                 audio[i].ctypes.data)
 
-        # call the DSP
-        self.__C.computemydsp(self.__dsp, count, self.__input_p,
-                              self.__output_p)
+        # call the DSP (through faustpy_compute() if the number of threads is
+        # set)
+        if self.__num_threads:
+            self.__C.faustpy_compute(
+                self.__dsp, count, self.__input_p, self.__output_p, num_out,
+                self.__out_rates_p, 0, self.__num_threads, self.__ffi.NULL,
+                self.__ffi.NULL, self.__ffi.NULL, self.__ffi.NULL,
+                self.__ffi.NULL
+            )
+        else:
+            self.__C.computemydsp(self.__dsp, count, self.__input_p,
+                                  self.__output_p)
 
         return output
@@ -77,12 +77,17 @@ class Param(object):
         return self._zone[0]
 
     def __zone_setter(self, x):
+        self._zone[0] = self.quantize(x)
+
+    def quantize(self, x):
+        """Return x limited to [min, max] and rounded to the step size."""
+
         if x >= self.max:
-            self._zone[0] = self.max
+            return self.max
         elif x <= self.min:
-            self._zone[0] = self.min
+            return self.min
         else:
-            self._zone[0] = self.min + round((x-self.min)/self.step)*self.step
+            return self.min + round((x-self.min)/self.step)*self.step
 
     zone = property(fget=__zone_getter, fset=__zone_setter,
                     doc="Pointer to the value of the parameter.")
@@ -92,6 +97,53 @@ class Param(object):
         self.zone = value
 
 
+class Display(object):
+    """A passive UI widget object.
+
+    This object represents a FAUST UI output (a bargraph or a display), i.e., a
+    value that is written by the DSP during compute().  Its zone can be read
+    like that of a Param object, but not written to.
+    """
+
+    def __init__(self, label, zone, min, max, param_type, **kwargs):
+        """Initialise a Display object.
+
+        Parameters:
+        -----------
+
+        label : str
+            The full label as specified in the FAUST DSP file.
+        zone : cffi.CData
+            Points to the FAUSTFLOAT object inside the DSP C object.
+        min : float
+            The minimum value of the output.
+        max : float
+            The maximum value of the output.
+        param_type : str
+            The widget type (e.g., HorizontalBargraph)
+
+        Any additional keyword arguments (e.g., the precision of a NumDisplay
+        or the names of a TextDisplay) are stored as attributes.
+        """
+
+        # NOTE: _zone is a CData holding a float*
+        self.label = label
+        self._zone = zone
+        self.min = min
+        self.max = max
+        self.type = param_type
+        self.metadata = {}
+        self.__dict__.update(kwargs)
+        self.__doc__ = "min={0}, max={1} (read-only)".format(min, max)
+
+    zone = property(fget=lambda x: x._zone[0],
+                    doc="The current value of the output.")
+
+    def __set__(self, obj, value):
+
+        raise AttributeError("{0} is read-only".format(self.label))
+
+
 class Box(object):
     def __init__(self, label, layout):
         self.label = label
@@ -106,7 +158,32 @@ class Box(object):
             object.__setattr__(self, name, value)
 
 
-# TODO: implement the *Display() and *Bargraph() methods
+def iter_params(box, prefix=""):
+    """Recursively iterate over the Param and Display objects of a Box.
+
+    Parameters:
+    -----------
+
+    box : Box-like
+        The (root) box to walk, e.g., the "ui" attribute of a PythonDSP.
+    prefix : str (optional)
+        A prefix to prepend to every path.
+
+    Returns:
+    --------
+
+    A generator of (path, obj) tuples, where path is the dot-separated
+    attribute path relative to box (e.g., "b_reverb.p_decay").
+    """
+
+    for name, obj in list(vars(box).items()):
+        if type(obj) in (Param, Display):
+            yield prefix+name, obj
+        elif isinstance(obj, Box):
+            for item in iter_params(obj, prefix+name+"."):
+                yield item
+
+
 class PythonUI(object):
     """
     Maps the UI elements of a FAUST DSP to attributes of another object,
@@ -127,6 +204,8 @@ class PythonUI(object):
 
     Box and Param attributes are prefixed with "b_" and "p_", respectively, in
     order to differentiate them from each other and from regular attributes.
+    Passive widgets (bargraphs and displays) are stored as read-only Display
+    attributes, which are also prefixed with "p_".
 
     Boxes and parameters without a label are given a default name of "anon<N>",
     where N is an integer (e.g., "p_anon1" for a label-less parameter).
@@ -135,6 +214,7 @@ class PythonUI(object):
     ---------
 
     FAUSTPy.Param - wraps the UI input parameters.
+    FAUSTPy.Display - wraps the UI output parameters.
     """
 
     def __init__(self, ffi, obj=None):
@@ -325,9 +405,7 @@ class PythonUI(object):
         # to the correct parameters
         for p in self.__boxes[-1].__dict__.values():
 
-            # TODO: add the Display class (or whatever it will be called) to
-            # this list once *Display and *Bargraph are implemented
-            if type(p) not in (Param,):
+            if type(p) not in (Param, Display):
                 continue
 
             # iterate over the meta-data that has accumulated in the current
@@ -346,16 +424,18 @@ class PythonUI(object):
     # stuff to do with inputs
     ##########################
 
-    def add_input(self, label, zone, init, min, max, step, param_type):
+    def __param_label(self, label):
 
         if label:
-            sane_label = str_to_identifier(label)
-        else:
-            # if the label is empty, create a default label
-            self.__num_anon_params[-1] += 1
-            sane_label = "anon" + str(self.__num_anon_params[-1])
+            return "p_" + str_to_identifier(label)
+
+        # if the label is empty, create a default label
+        self.__num_anon_params[-1] += 1
+        return "p_anon" + str(self.__num_anon_params[-1])
+
+    def add_input(self, label, zone, init, min, max, step, param_type):
 
-        setattr(self.__boxes[-1], "p_"+sane_label,
+        setattr(self.__boxes[-1], self.__param_label(label),
                 Param(label, zone, init, min, max, step, param_type))
 
     def addHorizontalSlider(self, label, zone, init, min, max, step):
@@ -382,14 +462,40 @@ class PythonUI(object):
 
         self.add_input(label, zone, 0, 0, 1, 1, "CheckButton")
 
+    ##########################
+    # stuff to do with outputs
+    ##########################
+
+    def add_output(self, label, zone, min, max, param_type, **kwargs):
+
+        # use object.__setattr__() so that Box.__setattr__() does not try to
+        # call Display.__set__() if the label already exists
+        display = Display(label, zone, min, max, param_type, **kwargs)
+        object.__setattr__(self.__boxes[-1], self.__param_label(label),
+                           display)
+
     def addNumDisplay(self, label, zone, p):
-        pass
+
+        self.add_output(label, zone, float("-inf"), float("inf"),
+                        "NumDisplay", precision=p)
 
     def addTextDisplay(self, label, zone, names, min, max):
-        pass
+
+        # the names array contains one entry per integer value in [min, max]
+        # and may be terminated early by a NULL pointer
+        text = []
+        if names != self.__ffi.NULL:
+            for i in range(int(max - min) + 1):
+                if names[i] == self.__ffi.NULL:
+                    break
+                text.append(self.__ffi.string(names[i]))
+
+        self.add_output(label, zone, min, max, "TextDisplay", names=text)
 
     def addHorizontalBargraph(self, label, zone, min, max):
-        pass
+
+        self.add_output(label, zone, min, max, "HorizontalBargraph")
 
     def addVerticalBargraph(self, label, zone, min, max):
-        pass
+
+        self.add_output(label, zone, min, max, "VerticalBargraph")
@@ -0,0 +1,377 @@
+"""
+A real-time engine that processes audio with a FAUST DSP block by block.
+
+The Engine drives a PythonDSP at a fixed block size from a Driver, which
+provides the audio input and output and the clock that the periods are
+scheduled on.  For every block, the engine waits for the start of the period,
+reads the input, computes the DSP and writes the output, and records how late
+the period started (jitter), how long the block took and how much of the
+period was left over (headroom).  A block that is not finished before the end
+of its period is a deadline miss (xrun).
+
+Two drivers are included, which makes it possible to check latency budgets
+without sound hardware:
+
+- NullDriver produces silence and discards the output, and
+- FileDriver reads and writes raw interleaved frames from and to files.
+
+By default, both use a simulated clock that jumps to the next period instead
+of sleeping, so that a test runs as fast as possible while the compute times
+are still measured in real time.
+"""
+
+import time
+from collections import deque
+from timeit import default_timer
+from numpy import zeros, frombuffer, percentile, array
+from . python_dsp import PythonDSP
+
+
+class Driver(object):
+    """The base class of all drivers.
+
+    A driver provides the clock of the engine and the audio I/O.  Subclasses
+    implement
+
+        read(inputs)
+
+    which fills the input buffer with the next block and returns the number
+    of valid frames (which is only smaller than the block size for the last
+    block, or 0 if there is no more input), and
+
+        write(outputs, count)
+
+    which passes the first count frames of the output buffer to the device,
+    and override open() and close() if they need to allocate resources.
+
+    With a real-time clock, wait() sleeps until the start of the next period.
+    With a simulated clock, wait() advances the clock to the start of the next
+    period instead, but the time that passes between calls to wait() is
+    measured with the real clock.
+    """
+
+    def __init__(self, fs, realtime=False):
+        """Initialise a Driver object.
+
+        Parameters:
+        -----------
+
+        fs : int
+            The sampling rate of the audio device.
+        realtime : bool (optional)
+            Whether to use a real-time (rather than a simulated) clock.
+        """
+
+        self.fs = fs
+        self.realtime = realtime
+        self.__skew = 0.0
+
+    def open(self, num_in, num_out, block_size, dtype):
+        """Prepare for processing blocks of the given format."""
+
+        self.num_in = num_in
+        self.num_out = num_out
+        self.block_size = block_size
+        self.dtype = dtype
+
+    def close(self):
+        """Release the resources allocated by open()."""
+
+        pass
+
+    def clock(self):
+        """Return the current time in seconds."""
+
+        return default_timer() + self.__skew
+
+    def wait(self, deadline):
+        """Wait until the clock reaches deadline."""
+
+        delay = deadline - self.clock()
+        if delay > 0:
+            if self.realtime:
+                time.sleep(delay)
+            else:
+                self.__skew += delay
+
+
+class NullDriver(Driver):
+    """A driver that produces silence and discards the output."""
+
+    def __init__(self, fs, num_blocks=None, realtime=False):
+        """Initialise a NullDriver object.
+
+        Parameters:
+        -----------
+
+        fs : int
+            The sampling rate.
+        num_blocks : int (optional)
+            The number of blocks after which the input ends.  Defaults to
+            never.
+        realtime : bool (optional)
+            Whether to use a real-time (rather than a simulated) clock.
+        """
+
+        super(NullDriver, self).__init__(fs, realtime)
+        self.num_blocks = num_blocks
+        self.blocks_read = 0
+
+    def read(self, inputs):
+
+        if self.num_blocks is not None and \
+                self.blocks_read >= self.num_blocks:
+            return 0
+
+        self.blocks_read += 1
+        return self.block_size
+
+    def write(self, outputs, count):
+
+        pass
+
+
+class FileDriver(Driver):
+    """A driver that reads and writes raw interleaved frames.
+
+    The samples in the files are of the dtype of the DSP.  A DSP without
+    inputs needs no input file, in which case num_blocks limits the length of
+    the output.
+    """
+
+    def __init__(self, fs, infile=None, outfile=None, num_blocks=None,
+                 realtime=False):
+        """Initialise a FileDriver object.
+
+        Parameters:
+        -----------
+
+        fs : int
+            The sampling rate.
+        infile : file-like object (optional)
+            The binary file to read the input from.
+        outfile : file-like object (optional)
+            The binary file to write the output to.  If omitted, the output
+            is discarded.
+        num_blocks : int (optional)
+            The maximum number of blocks to process.
+        realtime : bool (optional)
+            Whether to use a real-time (rather than a simulated) clock.
+        """
+
+        super(FileDriver, self).__init__(fs, realtime)
+        self.infile = infile
+        self.outfile = outfile
+        self.num_blocks = num_blocks
+        self.blocks_read = 0
+
+    def read(self, inputs):
+
+        if self.num_blocks is not None and \
+                self.blocks_read >= self.num_blocks:
+            return 0
+        self.blocks_read += 1
+
+        if self.num_in == 0:
+            return self.block_size
+
+        if self.infile is None:
+            raise ValueError("The DSP has inputs, so an input file is "
+                             "required.")
+
+        frame_size = self.num_in*inputs.itemsize
+        data = self.infile.read(self.block_size*frame_size)
+        count = len(data)//frame_size
+
+        frames = frombuffer(data[:count*frame_size], dtype=self.dtype)
+        inputs[:, :count] = frames.reshape((count, self.num_in)).T
+        inputs[:, count:] = 0
+
+        return count
+
+    def write(self, outputs, count):
+
+        if self.outfile is not None:
+            self.outfile.write(outputs[:, :count].T.tobytes())
+
+
+class SchedulerStats(object):
+    """Per-block timing statistics of an Engine.
+
+    All times are in seconds.  For every block, jitter is the time between the
+    scheduled and the actual start of its period, compute_time the time it
+    took to read, compute and write the block, and headroom the time that was
+    left until the end of its period (negative for deadline misses).
+
+    The jitter, compute_time and headroom attributes only hold the values of
+    the most recent blocks (up to history), so that an engine can run
+    indefinitely.  The totals, means and extremes of summary() cover all
+    blocks, while the percentiles are computed over the recent ones.
+    """
+
+    def __init__(self, period, history=10000):
+
+        self.period = period
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        """Clear all statistics."""
+
+        self.jitter = deque(maxlen=self.history)
+        self.compute_time = deque(maxlen=self.history)
+        self.headroom = deque(maxlen=self.history)
+        self.blocks = 0
+        self.xruns = 0
+        self.__jitter_sum = 0.0
+        self.__jitter_max = 0.0
+        self.__compute_sum = 0.0
+        self.__compute_max = 0.0
+        self.__headroom_min = float("inf")
+
+    def add(self, jitter, compute_time, headroom):
+        """Add the timing of a block."""
+
+        self.jitter.append(jitter)
+        self.compute_time.append(compute_time)
+        self.headroom.append(headroom)
+
+        self.blocks += 1
+        if headroom < 0:
+            self.xruns += 1
+        self.__jitter_sum += jitter
+        self.__jitter_max = max(self.__jitter_max, jitter)
+        self.__compute_sum += compute_time
+        self.__compute_max = max(self.__compute_max, compute_time)
+        self.__headroom_min = min(self.__headroom_min, headroom)
+
+    def summary(self):
+        """
+        Summarise the statistics.
+
+        Returns:
+        --------
+
+        summary : dict
+            The number of blocks and xruns, the mean, 99th percentile and
+            maximum of the jitter and compute time, and the minimum headroom
+            (also as a fraction of the period).
+        """
+
+        if not self.blocks:
+            return {"blocks": 0, "xruns": 0}
+
+        min_headroom = self.__headroom_min
+
+        return {
+            "blocks": self.blocks,
+            "xruns": self.xruns,
+            "period": self.period,
+            "jitter_mean": self.__jitter_sum/self.blocks,
+            "jitter_p99": float(percentile(array(self.jitter), 99)),
+            "jitter_max": self.__jitter_max,
+            "compute_mean": self.__compute_sum/self.blocks,
+            "compute_p99": float(percentile(array(self.compute_time), 99)),
+            "compute_max": self.__compute_max,
+            "headroom_min": min_headroom,
+            "headroom_min_fraction": min_headroom/self.period,
+        }
+
+
+class Engine(object):
+    """Process audio in real time with a FAUST DSP.
+
+    The engine alternates between two sets of input and output buffers, so a
+    driver may keep using the output of the previous block (e.g., while the
+    hardware plays it) while the next one is computed.
+    """
+
+    def __init__(self, dsp, driver, block_size=256, history=10000):
+        """Initialise an Engine object.
+
+        Parameters:
+        -----------
+
+        dsp : PythonDSP / FAUST
+            The DSP to drive.
+        driver : Driver
+            The driver that provides the clock and the audio I/O.
+        block_size : int (optional)
+            The number of frames per block.
+        history : int (optional)
+            The number of recent blocks whose timings are kept for the
+            percentiles (see SchedulerStats).
+        """
+
+        if block_size <= 0:
+            raise ValueError("The block size must be positive.")
+
+        if not isinstance(dsp, PythonDSP):
+            # a FAUST object
+            dsp = dsp.dsp
+
+        if len(set(dsp.input_rates + dsp.output_rates)) > 1:
+            raise ValueError("Multirate DSPs are not supported.")
+
+        self.dsp = dsp
+        self.driver = driver
+        self.block_size = block_size
+        self.period = block_size/float(driver.fs)
+        self.stats = SchedulerStats(self.period, history)
+
+        self.__inputs = [zeros((dsp.num_in, block_size), dtype=dsp.dtype)
+                         for i in range(2)]
+        self.__outputs = [zeros((dsp.num_out, block_size), dtype=dsp.dtype)
+                          for i in range(2)]
+
+    def run(self, num_blocks=None):
+        """
+        Process blocks until the input ends or num_blocks were processed.
+
+        Parameters:
+        -----------
+
+        num_blocks : int (optional)
+            The maximum number of blocks to process.
+
+        Returns:
+        --------
+
+        stats : SchedulerStats
+            The statistics of all blocks processed so far.
+        """
+
+        dsp, driver, stats = self.dsp, self.driver, self.stats
+        period = self.period
+        clock = driver.clock
+
+        driver.open(dsp.num_in, dsp.num_out, self.block_size, dsp.dtype)
+        try:
+            start = clock()
+            k = 0
+            while num_blocks is None or k < num_blocks:
+                deadline = start + k*period
+                driver.wait(deadline)
+
+                t0 = clock()
+                inputs = self.__inputs[k & 1]
+                outputs = self.__outputs[k & 1]
+
+                count = driver.read(inputs)
+                if count <= 0:
+                    break
+
+                if dsp.num_in > 0:
+                    dsp.compute(inputs[:, :count], out=outputs[:, :count])
+                else:
+                    dsp.compute(count, out=outputs[:, :count])
+                driver.write(outputs, count)
+                t1 = clock()
+
+                stats.add(t0 - deadline, t1 - t0, deadline + period - t1)
+
+                k += 1
+        finally:
+            driver.close()
+
+        return stats
@@ -0,0 +1,562 @@
+"""
+A server that processes audio with FAUST DSPs for other local processes.
+
+The server compiles its DSPs once at start-up and listens on a Unix or TCP
+socket.  Each DSP has an InstancePool of warm PythonDSP instances: a
+connection checks out one instance per DSP when it first uses it and returns
+it (which resets it) when it closes, so the DSP state and parameters are
+continuous within a connection, while new connections do not pay for
+creating an instance.  If all instances of a DSP are in use, a connection
+waits at most acquire_timeout seconds for one before its request fails with
+an error, and requests for more than max_frames frames are rejected (see
+DSPServer).
+
+Start it with
+
+    python -m FAUSTPy serve --unix /tmp/faust.sock dsp1.dsp dsp2.dsp
+
+(see --help for all options), and use the Client class to talk to it.
+
+The protocol is binary and little-endian.  A request starts with a header
+
+    type (uint8), dsp id (uint16), number of parameter updates (uint16),
+    number of frames (uint32)
+
+followed by the parameter updates as (parameter index (uint16), value
+(float64)) pairs and then the interleaved input frames in the dtype of the
+DSP.  The parameter index refers to the list of parameter paths returned by a
+DESCRIBE request.  The reply starts with a header
+
+    status (uint8), payload length in bytes (uint32)
+
+followed by the payload: the interleaved output frames for a PROCESS request,
+a JSON document for DESCRIBE and STATS requests, and an error message if the
+status is not OK.  The DESCRIBE reply lists the name, channels, dtype and
+parameters of each DSP and the maximum number of frames per request, which
+lets clients reject larger requests before sending them.
+"""
+
+import argparse
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+from collections import deque
+from timeit import default_timer
+from numpy import dtype, ndarray, frombuffer, percentile
+from . import wrapper
+from . wrapper import FAUST, FAUSTFLOATS
+from . python_ui import iter_params, Param
+from . pool import InstancePool
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+# request types
+PROCESS = 0
+DESCRIBE = 1
+STATS = 2
+
+# reply status codes
+OK = 0
+ERROR = 1
+
+REQUEST = struct.Struct("<BHHI")
+PARAM = struct.Struct("<Hd")
+REPLY = struct.Struct("<BI")
+
+
+def _recv_into(sock, view):
+
+    # fill the whole view, return False if the peer closed the connection
+    pos = 0
+    while pos < len(view):
+        n = sock.recv_into(view[pos:])
+        if n == 0:
+            return False
+        pos += n
+    return True
+
+
+def _skip(sock, size):
+
+    # discard size bytes, e.g., the frames of a request that failed
+    scratch = memoryview(bytearray(min(size, 65536)))
+    while size > 0:
+        n = min(size, len(scratch))
+        if not _recv_into(sock, scratch[:n]):
+            raise EOFError("Connection closed.")
+        size -= n
+
+
+def _recv(sock, size):
+
+    buf = bytearray(size)
+    if not _recv_into(sock, memoryview(buf)):
+        raise EOFError("Connection closed.")
+    return bytes(buf)
+
+
+class ServerStats(object):
+    """Throughput and latency statistics of a DSPServer.
+
+    The latency of a request is the time from receiving its header to sending
+    the reply.  Percentiles are computed over the most recent requests.  The
+    summary also includes the usage of the instance pool of each DSP.
+    """
+
+    def __init__(self, dsps=(), history=10000):
+
+        self.dsps = dsps
+        self.__lock = threading.Lock()
+        self.__latencies = deque(maxlen=history)
+        self.start = default_timer()
+        self.requests = 0
+        self.frames = 0
+        self.errors = 0
+
+    def add(self, latency, frames):
+
+        with self.__lock:
+            self.requests += 1
+            self.frames += frames
+            self.__latencies.append(latency)
+
+    def add_error(self):
+
+        with self.__lock:
+            self.errors += 1
+
+    def summary(self):
+        """Return the statistics as a dict."""
+
+        with self.__lock:
+            latencies = list(self.__latencies)
+            uptime = default_timer() - self.start
+            summary = {
+                "uptime": uptime,
+                "requests": self.requests,
+                "errors": self.errors,
+                "frames": self.frames,
+                "frames_per_second": self.frames/uptime,
+                "requests_per_second": self.requests/uptime,
+            }
+
+        if latencies:
+            summary["latency_mean"] = sum(latencies)/len(latencies)
+            summary["latency_p50"] = float(percentile(latencies, 50))
+            summary["latency_p99"] = float(percentile(latencies, 99))
+            summary["latency_max"] = max(latencies)
+
+        summary["pools"] = [{
+            "name": d.name,
+            "size": d.pool.size(),
+            "available": d.pool.available(),
+            "hit_rate": d.pool.stats.hit_rate,
+            "waits": d.pool.stats.waits,
+            "wait_time": d.pool.stats.wait_time,
+        } for d in self.dsps]
+
+        return summary
+
+
+class ServedDSP(object):
+    """A compiled DSP and its pool of warm instances."""
+
+    def __init__(self, name, faust, num_instances):
+
+        self.name = name
+        self.faust = faust
+        self.pool = InstancePool(faust, num_instances)
+
+        dsp = faust.dsp
+        self.num_in = dsp.num_in
+        self.num_out = dsp.num_out
+        self.dtype = dtype(dsp.dtype)
+        self.params = [path for path, p in iter_params(dsp.ui)
+                       if type(p) is Param]
+
+        if len(set(dsp.input_rates + dsp.output_rates)) > 1:
+            raise ValueError("Multirate DSPs cannot be served.")
+
+    def describe(self):
+
+        return {
+            "name": self.name,
+            "num_in": self.num_in,
+            "num_out": self.num_out,
+            "dtype": self.dtype.str,
+            "params": self.params,
+        }
+
+
+class Connection(object):
+    """The instances and buffers of one client connection."""
+
+    def __init__(self, served, dsp):
+
+        self.dsp = dsp
+        self.params = dict(iter_params(self.dsp.ui))
+        self.inbuf = ndarray((0, served.num_in), dtype=served.dtype)
+        self.outbuf = ndarray((0, served.num_out), dtype=served.dtype)
+
+    def buffers(self, count):
+
+        # grow the buffers geometrically, so that they are rarely reallocated
+        if self.inbuf.shape[0] < count:
+            size = max(count, 2*self.inbuf.shape[0])
+            self.inbuf = ndarray((size, self.inbuf.shape[1]),
+                                 dtype=self.inbuf.dtype)
+            self.outbuf = ndarray((size, self.outbuf.shape[1]),
+                                  dtype=self.outbuf.dtype)
+        return self.inbuf[:count], self.outbuf[:count]
+
+
+class RequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+
+        server = self.server
+        sock = self.request
+        header = bytearray(REQUEST.size)
+        header_view = memoryview(header)
+        connections = {}
+
+        if sock.family != getattr(socket, "AF_UNIX", None):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        try:
+            while _recv_into(sock, header_view):
+                t0 = default_timer()
+                kind, dsp_id, num_params, count = REQUEST.unpack(header)
+
+                try:
+                    if kind == PROCESS:
+                        count = self.process(connections, dsp_id, num_params,
+                                             count)
+                    elif kind == DESCRIBE:
+                        self.reply(OK, json.dumps(
+                            [dict(d.describe(), max_frames=server.max_frames)
+                             for d in server.dsps]
+                        ).encode())
+                    elif kind == STATS:
+                        self.reply(OK, json.dumps(
+                            server.stats.summary()
+                        ).encode())
+                    else:
+                        raise ValueError("Invalid request type.")
+                except ValueError as e:
+                    server.stats.add_error()
+                    self.reply(ERROR, str(e).encode())
+                    continue
+
+                if kind == PROCESS:
+                    server.stats.add(default_timer() - t0, count)
+        except (EOFError, socket.error):
+            pass
+        finally:
+            # return the instances to their pools
+            for dsp_id, conn in connections.items():
+                server.dsps[dsp_id].pool.release(conn.dsp)
+
+    def reply(self, status, payload):
+
+        self.request.sendall(REPLY.pack(status, len(payload)) + payload)
+
+    def process(self, connections, dsp_id, num_params, count):
+
+        server = self.server
+        sock = self.request
+
+        params = _recv(sock, num_params*PARAM.size)
+
+        if dsp_id >= len(server.dsps):
+            # the frames cannot be skipped without knowing the DSP, so the
+            # connection cannot be recovered
+            server.stats.add_error()
+            self.reply(ERROR, b"Invalid DSP id.")
+            raise EOFError("Invalid DSP id.")
+
+        if count > server.max_frames:
+            # neither buffer nor skip that many frames
+            server.stats.add_error()
+            self.reply(ERROR, "Too many frames (at most {}).".format(
+                server.max_frames).encode())
+            raise EOFError("Too many frames.")
+
+        served = server.dsps[dsp_id]
+        conn = connections.get(dsp_id)
+        if conn is None:
+            try:
+                dsp = served.pool.acquire(timeout=server.acquire_timeout)
+            except RuntimeError:
+                # skip the frames, so that the client can try again later
+                _skip(sock, count*served.num_in*served.dtype.itemsize)
+                raise ValueError("No instance of the DSP is available.")
+            conn = connections[dsp_id] = Connection(served, dsp)
+
+        # receive the frames directly into the (byte view of the) buffer
+        inputs, outputs = conn.buffers(count)
+        if not _recv_into(sock, memoryview(inputs.reshape(-1).view("B"))):
+            raise EOFError("Connection closed.")
+
+        for i in range(num_params):
+            index, value = PARAM.unpack_from(params, i*PARAM.size)
+            if index >= len(served.params):
+                raise ValueError("Invalid parameter index.")
+            conn.params[served.params[index]].zone = value
+
+        if served.num_in > 0:
+            conn.dsp.compute(inputs.T, out=outputs.T)
+        else:
+            conn.dsp.compute(count, out=outputs.T)
+
+        sock.sendall(REPLY.pack(OK, outputs.nbytes))
+        sock.sendall(memoryview(outputs.reshape(-1).view("B")))
+
+        return count
+
+
+class DSPServer(object):
+    """Serve FAUST DSPs on a Unix or TCP socket."""
+
+    def __init__(self, dsps, address, num_instances=4, max_frames=1 << 20,
+                 acquire_timeout=1.0):
+        """Initialise a DSPServer object.
+
+        Parameters:
+        -----------
+
+        dsps : list of (str, FAUST) tuples
+            The names and compiled DSPs to serve.  The position in this list
+            is the DSP id used in requests.
+        address : str / (str, int)
+            The path of a Unix socket, or a (host, port) tuple for TCP.
+        num_instances : int (optional)
+            The number of warm instances per DSP, which is also the maximum
+            number of connections that use a DSP at the same time.
+        max_frames : int (optional)
+            The maximum number of frames per request.  Larger requests are
+            answered with an error and the connection is closed.
+        acquire_timeout : float (optional)
+            The maximum time in seconds a connection waits for a free
+            instance of a DSP before its request fails with an error.
+        """
+
+        if num_instances <= 0:
+            raise ValueError("The number of instances must be positive.")
+        if max_frames <= 0:
+            raise ValueError("The maximum number of frames must be positive.")
+
+        self.dsps = [ServedDSP(name, faust, num_instances)
+                     for name, faust in dsps]
+        self.stats = ServerStats(self.dsps)
+
+        if isinstance(address, tuple):
+            base = socketserver.TCPServer
+        else:
+            base = socketserver.UnixStreamServer
+
+        class Server(socketserver.ThreadingMixIn, base):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = Server(address, RequestHandler)
+        self.server.dsps = self.dsps
+        self.server.stats = self.stats
+        self.server.max_frames = max_frames
+        self.server.acquire_timeout = acquire_timeout
+        self.address = self.server.server_address
+
+    def serve_forever(self):
+        """Handle requests until shutdown() is called."""
+
+        self.server.serve_forever()
+
+    def shutdown(self):
+        """Stop serve_forever() and close the socket."""
+
+        self.server.shutdown()
+        self.server.server_close()
+        if not isinstance(self.address, tuple) and \
+                os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class Client(object):
+    """A client for a DSPServer."""
+
+    def __init__(self, address):
+        """Connect to the DSPServer at address (see DSPServer)."""
+
+        if isinstance(address, tuple):
+            self.sock = socket.create_connection(address)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(address)
+
+        self.dsps = self.__request(DESCRIBE, 0, b"", 0, b"", json_reply=True)
+
+    def close(self):
+
+        self.sock.close()
+
+    def __request(self, kind, dsp_id, params, count, frames,
+                  json_reply=False):
+
+        self.sock.sendall(REQUEST.pack(kind, dsp_id, len(params)//PARAM.size,
+                                       count) + params)
+        if frames:
+            self.sock.sendall(frames)
+
+        status, length = REPLY.unpack(_recv(self.sock, REPLY.size))
+        payload = _recv(self.sock, length)
+        if status != OK:
+            raise ValueError(payload.decode())
+
+        return json.loads(payload.decode()) if json_reply else payload
+
+    def stats(self):
+        """Return the statistics of the server."""
+
+        return self.__request(STATS, 0, b"", 0, b"", json_reply=True)
+
+    def process(self, dsp_id, frames, params={}):
+        """
+        Process audio on the server.
+
+        Parameters:
+        -----------
+
+        dsp_id : int
+            The position of the DSP in the list of DSPs of the server.
+        frames : numpy.ndarray / int
+            The input as an array of shape (samples, channels), or the number
+            of frames to produce if the DSP has no inputs.
+        params : dict (optional)
+            Parameter updates that are applied before processing, mapping
+            parameter paths (see iter_params()) to values.
+
+        Returns:
+        --------
+
+        out : numpy.ndarray
+            The output of shape (samples, channels).
+        """
+
+        desc = self.dsps[dsp_id]
+        dt = dtype(desc["dtype"])
+        max_frames = desc["max_frames"]
+
+        updates = b"".join(PARAM.pack(desc["params"].index(path), value)
+                           for path, value in params.items())
+
+        if desc["num_in"] > 0:
+            frames = frames.astype(dt, copy=False).reshape(
+                (-1, desc["num_in"]))
+            count = frames.shape[0]
+            data = frames.tobytes()
+        else:
+            count, data = frames, b""
+
+        # the server would close the connection without reading the frames
+        if count > max_frames:
+            raise ValueError(
+                "Too many frames (at most {}).".format(max_frames))
+
+        out = self.__request(PROCESS, dsp_id, updates, count, data)
+        return frombuffer(out, dtype=dt).reshape((count, desc["num_out"]))
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="python -m FAUSTPy serve",
+        description="Serve FAUST DSPs on a local socket."
+    )
+    parser.add_argument('dsps', nargs="+",
+                        help="The FAUST DSP files; their position is their "
+                             "DSP id.")
+    parser.add_argument('-u', '--unix',
+                        dest="unix",
+                        help="The path of the Unix socket to listen on.")
+    parser.add_argument('--host',
+                        dest="host",
+                        default="127.0.0.1",
+                        help="The host to listen on for TCP.")
+    parser.add_argument('--port',
+                        dest="port",
+                        default=9000,
+                        type=int,
+                        help="The TCP port to listen on.")
+    parser.add_argument('-n', '--instances',
+                        dest="instances",
+                        default=4,
+                        type=int,
+                        help="The number of warm instances per DSP.")
+    parser.add_argument('-m', '--max-frames',
+                        dest="max_frames",
+                        default=1 << 20,
+                        type=int,
+                        help="The maximum number of frames per request.")
+    parser.add_argument('-t', '--timeout',
+                        dest="timeout",
+                        default=1.0,
+                        type=float,
+                        help="The maximum time to wait for a free instance.")
+    parser.add_argument('-f', '--faustfloat',
+                        dest="faustfloat",
+                        default="float",
+                        choices=sorted(FAUSTFLOATS),
+                        help="The value of FAUSTFLOAT.")
+    parser.add_argument('-p', '--path',
+                        dest="faust_path",
+                        default="",
+                        help="The path to the FAUST compiler.")
+    parser.add_argument('-s', '--fs',
+                        dest="fs",
+                        default=48000,
+                        type=int,
+                        help="The sampling frequency")
+    parser.add_argument('-r', '--report',
+                        dest="report",
+                        default=10.0,
+                        type=float,
+                        help="Print statistics every this many seconds "
+                             "(0 to disable).")
+    args = parser.parse_args(argv)
+
+    wrapper.FAUST_PATH = args.faust_path
+
+    dsps = [(os.path.basename(f), FAUST(f, args.fs, args.faustfloat))
+            for f in args.dsps]
+    address = args.unix or (args.host, args.port)
+    server = DSPServer(dsps, address, args.instances, args.max_frames,
+                       args.timeout)
+
+    def report():
+        stop = threading.Event()
+        while not stop.wait(args.report):
+            sys.stderr.write(json.dumps(server.stats.summary()) + "\n")
+
+    if args.report > 0:
+        reporter = threading.Thread(target=report)
+        reporter.daemon = True
+        reporter.start()
+
+    sys.stderr.write("Serving {} DSPs on {}\n".format(len(dsps),
+                                                     server.address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stderr.write(json.dumps(server.stats.summary()) + "\n")
+        server.shutdown()
+
+    return 0
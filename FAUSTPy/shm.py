@@ -0,0 +1,296 @@
+"""
+Shared-memory ring buffers for passing audio between processes.
+
+A SharedRingBuffer is a fixed number of slots of (num_channels, block_size)
+samples in a multiprocessing.shared_memory block.  The slots are exposed as
+NumPy arrays, so a producer can write into a slot and a consumer can read
+from it in place -- in particular, PythonDSP.compute() can read its input
+from one ring buffer and write its output into the slot of another one (see
+process()), without copying or pickling the audio.
+
+Each ring buffer has exactly one producer and one consumer process.  The
+read and write counters live in the shared memory block as well, and a
+process waiting for a slot polls them with a short, increasing sleep.  Since
+the geometry is stored in the block, another process attaches to a ring
+buffer by name (a SharedRingBuffer can also be pickled, e.g., to pass it to a
+multiprocessing.Process).
+
+Note that this module requires Python 3.8 or newer, which is why it is not
+imported by the FAUSTPy package itself.
+"""
+
+import os
+import time
+from multiprocessing import shared_memory, resource_tracker
+from timeit import default_timer
+from numpy import dtype as as_dtype, ndarray, int64
+from . python_dsp import PythonDSP
+
+# the header fields (int64 each)
+_MAGIC, _SLOTS, _CHANNELS, _BLOCK, _DTYPE, _WRITTEN, _READ, _EOF = range(8)
+_HEADER = 8
+_MAGIC_VALUE = 0x46505952   # "FPYR"
+
+# the alignment of the sample data in bytes
+_ALIGN = 64
+
+
+def _attach(name):
+
+    # Before Python 3.13, attaching to a shared memory block registers it with
+    # the resource tracker of the attaching process, which unlinks it when
+    # that process exits -- only the creator should ever unlink it.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedRingBuffer(object):
+    """A single-producer, single-consumer ring buffer of audio blocks in
+    shared memory."""
+
+    def __init__(self, num_slots, num_channels, block_size, dtype,
+                 name=None):
+        """Create a SharedRingBuffer object.
+
+        Parameters:
+        -----------
+
+        num_slots : int
+            The number of blocks the ring buffer holds.
+        num_channels : int
+            The number of channels of each block.
+        block_size : int
+            The maximum number of samples per channel of each block.
+        dtype : numpy.dtype
+            The dtype of the samples, usually PythonDSP.dtype.
+        name : str (optional)
+            The name of the shared memory block.  Defaults to a random name.
+        """
+
+        if num_slots <= 0 or num_channels < 0 or block_size <= 0:
+            raise ValueError("Invalid ring buffer geometry.")
+
+        dtype = as_dtype(dtype)
+        size = self.__data_offset(num_slots) + \
+            num_slots*num_channels*block_size*dtype.itemsize
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.__setup(shm, owner=True)
+
+        header = self.__header
+        header[:] = 0
+        header[_SLOTS] = num_slots
+        header[_CHANNELS] = num_channels
+        header[_BLOCK] = block_size
+        header[_DTYPE] = ord(dtype.char)
+        header[_MAGIC] = _MAGIC_VALUE
+
+        self.__map_slots()
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to an existing ring buffer by name."""
+
+        self = cls.__new__(cls)
+        self.__setup(_attach(name), owner=False)
+        if self.__header[_MAGIC] != _MAGIC_VALUE:
+            self.close()
+            raise ValueError("{} is not a ring buffer.".format(name))
+        self.__map_slots()
+        return self
+
+    @staticmethod
+    def __data_offset(num_slots):
+
+        offset = (_HEADER + num_slots)*8
+        return (offset + _ALIGN - 1)//_ALIGN*_ALIGN
+
+    def __setup(self, shm, owner):
+
+        self.__shm = shm
+        self.__owner = owner
+        self.__header = ndarray(_HEADER, dtype=int64, buffer=shm.buf)
+
+    def __map_slots(self):
+
+        header = self.__header
+        self.num_slots = int(header[_SLOTS])
+        self.num_channels = int(header[_CHANNELS])
+        self.block_size = int(header[_BLOCK])
+        self.dtype = as_dtype(chr(header[_DTYPE]))
+
+        # the number of valid samples of each slot
+        self.__counts = ndarray(self.num_slots, dtype=int64,
+                                buffer=self.__shm.buf, offset=_HEADER*8)
+        self.__slots = ndarray(
+            (self.num_slots, self.num_channels, self.block_size),
+            dtype=self.dtype, buffer=self.__shm.buf,
+            offset=self.__data_offset(self.num_slots)
+        )
+
+    name = property(fget=lambda x: x.__shm.name,
+                    doc="The name of the shared memory block.")
+
+    def __reduce__(self):
+
+        return (SharedRingBuffer.attach, (self.name,))
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    def close(self):
+        """Detach from the ring buffer; the creator also unlinks it."""
+
+        shm = self.__shm
+        if shm is None:
+            return
+        self.__shm = None
+
+        # the arrays must be released before the shared memory is closed
+        self.__header = self.__counts = self.__slots = None
+        shm.close()
+        if self.__owner:
+            # a process that shares our resource tracker (e.g., a child
+            # process) has unregistered the block when attaching, see
+            # _attach(), but unlink() expects it to be registered
+            if os.name == "posix":
+                resource_tracker.register(shm._name, "shared_memory")
+            shm.unlink()
+
+    def __len__(self):
+
+        header = self.__header
+        return int(header[_WRITTEN] - header[_READ])
+
+    eof = property(fget=lambda x: bool(x.__header[_EOF]),
+                   doc="Whether the producer has finished writing.")
+
+    @staticmethod
+    def __wait(ready, timeout):
+
+        # poll with an increasing sleep of up to a millisecond
+        deadline = None if timeout is None else default_timer() + timeout
+        delay = 1e-6
+        while not ready():
+            if deadline is not None and default_timer() > deadline:
+                raise RuntimeError("Timed out waiting for the ring buffer.")
+            time.sleep(delay)
+            delay = min(2*delay, 1e-3)
+
+    def write_slot(self, timeout=None):
+        """
+        Return the next free slot, waiting while the ring buffer is full.
+
+        The slot is an array of shape (num_channels, block_size) in shared
+        memory.  Call commit() after filling it.
+        """
+
+        header = self.__header
+        self.__wait(lambda: header[_WRITTEN] - header[_READ] < self.num_slots,
+                    timeout)
+        return self.__slots[header[_WRITTEN] % self.num_slots]
+
+    def commit(self, count=None):
+        """Pass the slot returned by write_slot() to the consumer.
+
+        count is the number of valid samples per channel, which defaults to
+        block_size.
+        """
+
+        header = self.__header
+        self.__counts[header[_WRITTEN] % self.num_slots] = \
+            self.block_size if count is None else count
+        header[_WRITTEN] += 1
+
+    def close_writer(self):
+        """Signal the consumer that no more slots will be written."""
+
+        self.__header[_EOF] = 1
+
+    def read_slot(self, timeout=None):
+        """
+        Return the next filled slot, waiting while the ring buffer is empty.
+
+        The slot is an array of shape (num_channels, count) in shared memory,
+        or None if the producer has called close_writer() and all slots have
+        been read.  Call release() when done with it.
+        """
+
+        header = self.__header
+        self.__wait(lambda: header[_WRITTEN] > header[_READ] or
+                    header[_EOF], timeout)
+        if header[_WRITTEN] == header[_READ]:
+            return None
+
+        i = header[_READ] % self.num_slots
+        return self.__slots[i, :, :self.__counts[i]]
+
+    def release(self):
+        """Return the slot returned by read_slot() to the producer."""
+
+        self.__header[_READ] += 1
+
+
+def process(dsp, inputs, outputs, timeout=None):
+    """
+    Process blocks from one ring buffer into another until the input ends.
+
+    The DSP reads its input directly from the slots of inputs and writes its
+    output directly into the slots of outputs.  When inputs ends, outputs is
+    closed for writing as well.
+
+    Parameters:
+    -----------
+
+    dsp : PythonDSP / FAUST
+        The DSP.  Its number of inputs and outputs must match the ring
+        buffers (and so should its dtype, since other dtypes are converted),
+        and the block size of outputs must be at least that of inputs.
+    inputs, outputs : SharedRingBuffer
+        The ring buffers to read from and write to.
+    timeout : float (optional)
+        The maximum time to wait for a slot, in seconds.
+
+    Returns:
+    --------
+
+    count : int
+        The number of processed blocks.
+    """
+
+    if not isinstance(dsp, PythonDSP):
+        # a FAUST object
+        dsp = dsp.dsp
+
+    if inputs.num_channels != dsp.num_in or \
+            outputs.num_channels != dsp.num_out:
+        raise ValueError("The ring buffers do not match the DSP.")
+    if outputs.block_size < inputs.block_size:
+        raise ValueError("The output block size is too small.")
+
+    blocks = 0
+    while True:
+        block = inputs.read_slot(timeout)
+        if block is None:
+            break
+
+        count = block.shape[1]
+        slot = outputs.write_slot(timeout)
+        dsp.compute(block, out=slot[:, :count])
+        outputs.commit(count)
+        inputs.release()
+        blocks += 1
+
+    outputs.close_writer()
+
+    return blocks
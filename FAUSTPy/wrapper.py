@@ -1,19 +1,58 @@
 import cffi
+import cffi.verifier
+import hashlib
+import logging
 import os
+from collections import namedtuple
 from subprocess import check_output
+from timeit import default_timer
 from tempfile import NamedTemporaryFile
 from string import Template
-from . import python_ui, python_meta, python_dsp
+from . import python_ui, python_meta, python_dsp, c_helpers
+from . isa import get_variants, best_variant
 
 FAUST_PATH = ""
 FAUSTFLOATS = frozenset(("float", "double", "long double"))
 
+# the FAUST composition operators used to fuse several DSPs
+FUSION_OPERATORS = {"series": ":", "parallel": ","}
+
+# the parallel code generators of FAUST and the C compiler and linker flags
+# they need; the work-stealing scheduler (-sch) is missing, since its runtime
+# is not part of the C code that FAUST generates
+PARALLEL_FLAGS = {"omp": ["-fopenmp"]}
+
+# The CFFI cannot load the same compiled module twice with different FFI
+# instances, so compiled libraries are cached per process and shared by all
+# FAUST objects with identical code.
+_LIBRARIES = {}
+
+# the timing of one stage of the construction of a FAUST object, see
+# FAUST.timings
+CompileStage = namedtuple("CompileStage", ["stage", "seconds", "info"])
+
 
 class FAUST(object):
     """Wraps a FAUST DSP using the CFFI.  The DSP file is compiled to C, which
     is then compiled and linked to the running Python interpreter by the CFFI.
     It exposes the compute() function of the DSP along with some other
     attributes (see below).
+
+    The timings attribute lists a CompileStage(stage, seconds, info) for each
+    stage of the construction, in order: "fuse" (only for lists of DSPs),
+    "faust" (the FAUST compiler), "cdef" (parsing the declarations), "verify"
+    (compiling and/or loading the C code, where info["cache"] is "memory",
+    "disk" or "miss"; preceded by "variants" if other ISA variants are
+    compiled), "autotune" (only with block_size="auto"), "init", "ui"
+    and "meta" (and "restore" for unpickled objects).
+
+    FAUST objects can be pickled, e.g., to pass them to a process pool.  The
+    pickle contains the C code generated by the FAUST compiler (so unpickling
+    does not run it again), the sampling rate and the current parameter
+    values.  Unpickling loads the compiled library from the cache of the CFFI,
+    so as long as it was compiled once on the same machine, this only takes a
+    few milliseconds.  If the pickle_state attribute is True, the complete
+    state of the DSP (e.g., its delay lines) is pickled, too.
     """
 
     def __init__(self, faust_dsp, fs,
@@ -22,6 +61,12 @@ class FAUST(object):
                  dsp_class=python_dsp.PythonDSP,
                  ui_class=python_ui.PythonUI,
                  meta_class=python_meta.PythonMeta,
+                 fusion="series",
+                 trace=None,
+                 parallel=None,
+                 num_threads=None,
+                 block_size=None,
+                 isa=None,
                  **kwargs):
         """
         Initialise a FAUST object.
@@ -29,10 +74,11 @@ class FAUST(object):
         Parameters:
         -----------
 
-        faust_dsp : string / bytes
+        faust_dsp : string / bytes / list
             This can be either the path to a FAUST DSP file (which should end
             in ".dsp") or a string of FAUST code.  Note that in Python 3 a code
-            string must be of type "bytes".
+            string must be of type "bytes".  A list of several such DSPs is
+            fused into a single FAUST program (see fusion below).
         fs : int
             The sampling rate the FAUST DSP should be initialised with.
         faust_float : string (optional)
@@ -42,6 +88,40 @@ class FAUST(object):
         faust_flags : list of strings (optional)
             A list of additional flags to pass to the FAUST compiler, which are
             appended to "-lang c" (since FAUSTPy requires the FAUST C backend).
+        fusion : string (optional)
+            How to compose a list of DSPs: "series" (the FAUST ":" operator,
+            the default) or "parallel" (the "," operator).  The fused program
+            is compiled once, which lets the FAUST compiler optimise across
+            stages and replaces N calls to compute() by one.  The parameters
+            of each stage are put in a UI group named after the DSP file (or
+            "stage<N>" for code strings), e.g., "dsp.ui.b_stage0.p_gain".
+        trace : callable / logging.Logger (optional)
+            Called with a CompileStage for every stage of the construction as
+            soon as it is finished (see the timings attribute).  If this is a
+            logging.Logger, the stages are logged at the DEBUG level instead.
+        parallel : string (optional)
+            Use one of the parallel code generators of FAUST, which split the
+            computation of wide DSPs across several threads.  Currently, this
+            can only be "omp" (OpenMP, the -omp option), for which the
+            required C compiler and linker flags are added automatically.
+            The thread affinity is left to the OpenMP runtime, which reads it
+            from the environment (e.g., OMP_PROC_BIND=close and
+            OMP_PLACES=cores) when it is loaded.
+        num_threads : int (optional)
+            The number of OpenMP threads (only for parallel="omp"), see
+            set_num_threads().
+        block_size : int / string (optional)
+            The maximum number of frames the DSP computes at a time, which
+            compute() splits its input into (see PythonDSP.block_size).  If
+            this is "auto", the fastest block size is measured once per DSP
+            and machine and cached (see FAUSTPy.autotune).
+        isa : string / list (optional)
+            Compile variants of the DSP for several instruction sets instead
+            of for the native one: the name of a variant in
+            FAUSTPy.isa.ISA_VARIANTS (e.g., "avx2" or "baseline"), a list of
+            names, or "auto" for all variants of this architecture.  All
+            variants are compiled into the cache of the CFFI, and the best
+            one that this CPU supports is loaded (see the isa attribute).
 
         And in case you want to write your own DSP/UI/Meta class (for whatever
         reason), you can override any of the following arguments:
@@ -70,7 +150,8 @@ class FAUST(object):
         The default compiler flags are "-std=c99 -march=native -O3".  The
         reasons for this are:
 
-        - compilation happens at run time, so -march=native should be safe,
+        - compilation happens at run time, so -march=native should be safe
+        (use the isa argument for code that has to run on other machines),
         - FAUST programs usually profit from -O3, especially since it activates
         auto-vectorisation, and
         - since additional flags are appended to this default, you *can*
@@ -79,10 +160,220 @@ class FAUST(object):
 
         if faust_float not in FAUSTFLOATS:
             raise ValueError("Invalid value for faust_float!")
+        if parallel is not None and parallel not in PARALLEL_FLAGS:
+            raise ValueError("Invalid value for parallel!")
+        if parallel != "omp" and num_threads is not None:
+            raise ValueError("The number of threads can only be set for "
+                             "OpenMP code.")
+        if num_threads is not None and num_threads <= 0:
+            raise ValueError("The number of threads must be positive.")
+        if block_size is not None and block_size != "auto" and \
+                block_size <= 0:
+            raise ValueError("The block size must be positive or \"auto\".")
+        isa_variants = get_variants(isa) if isa is not None else None
+
+        # the timings of the construction stages, see __stage()
+        self.timings = []
+        self.__tracing = True
+        if isinstance(trace, logging.Logger):
+            logger = trace
+
+            def trace(s):
+                logger.debug("FAUST stage %s took %.6f s %s", s.stage,
+                             s.seconds, s.info)
+        self.__trace = trace
 
         self.FAUST_PATH = FAUST_PATH
         self.FAUST_FLAGS = ["-lang", "c"] + faust_flags
         self.is_inline = False
+        self.pickle_state = False
+        self.parallel = parallel
+
+        if parallel is not None:
+            self.FAUST_FLAGS.append("-" + parallel)
+            flags = PARALLEL_FLAGS[parallel]
+            kwargs["extra_compile_args"] = \
+                kwargs.get("extra_compile_args", []) + flags
+            kwargs["extra_link_args"] = \
+                kwargs.get("extra_link_args", []) + flags
+
+        # needed to recreate the library when unpickling, see __getstate__()
+        self.__faust_float = faust_float
+        self.__kwargs = dict(kwargs)
+        self.__num_threads = num_threads
+        self.__isa_variants = isa_variants
+
+        # labels of temporary files that are replaced in the C code, see
+        # __gen_ffi()
+        self.__renames = []
+
+        stage_files = []
+        if isinstance(faust_dsp, (list, tuple)):
+            t0 = default_timer()
+            faust_dsp, stage_files = self.__fuse(faust_dsp, fusion)
+            self.__stage("fuse", t0, stages=len(stage_files))
+
+        try:
+            self.__init_ffi(faust_dsp, faust_float, **kwargs)
+        finally:
+            for f in stage_files:
+                f.close()
+
+        self.__fs = fs
+        self.__classes = (dsp_class, ui_class, meta_class)
+
+        if block_size == "auto":
+            from . autotune import tune_block_size
+
+            # the instances created while tuning are not recorded
+            t0 = default_timer()
+            self.__tracing = False
+            block_size = tune_block_size(self)
+            self.__tracing = True
+            self.__stage("autotune", t0, block_size=block_size)
+        self.block_size = block_size
+
+        # initialise the DSP object
+        self.__dsp = self.new_dsp()
+
+        # add shortcuts to the compute* functions
+        self.compute = self.__dsp.compute
+        self.compute2 = self.__dsp.compute2
+
+        self.__tracing = False
+
+    def __getstate__(self):
+
+        dsp = self.__dsp
+        ui = getattr(dsp, "ui", None)
+        params = {}
+        if ui is not None:
+            params = dict((path, p._zone[0])
+                          for path, p in python_ui.iter_params(ui)
+                          if type(p) is python_ui.Param)
+        state = None
+        if self.pickle_state:
+            state = bytes(self.__ffi.buffer(dsp.dsp))
+
+        return {
+            "c_code": self.__c_code,
+            "faust_float": self.__faust_float,
+            "faust_path": self.FAUST_PATH,
+            "faust_flags": self.FAUST_FLAGS,
+            "is_inline": self.is_inline,
+            "parallel": self.parallel,
+            "num_threads": self.__num_threads,
+            "block_size": self.block_size,
+            "isa_variants": self.__isa_variants,
+            "kwargs": self.__kwargs,
+            "fs": self.__fs,
+            "classes": self.__classes,
+            "params": params,
+            "state": state,
+        }
+
+    def __setstate__(self, d):
+
+        self.timings = []
+        self.__tracing = True
+        self.__trace = None
+
+        self.FAUST_PATH = d["faust_path"]
+        self.FAUST_FLAGS = d["faust_flags"]
+        self.is_inline = False
+        self.pickle_state = d["state"] is not None
+        self.parallel = d["parallel"]
+
+        self.__faust_float = d["faust_float"]
+        self.__kwargs = d["kwargs"]
+        self.__isa_variants = d["isa_variants"]
+        self.__renames = []
+
+        # the C code has already been generated (and its labels replaced), so
+        # only load the library
+        self.__ffi, self.__C = self.__gen_ffi(
+            d["c_code"], self.__faust_float, None, **self.__kwargs
+        )
+        self.is_inline = d["is_inline"]
+
+        self.__num_threads = d["num_threads"]
+
+        self.__fs = d["fs"]
+        self.__classes = d["classes"]
+        self.block_size = d["block_size"]
+        self.__dsp = self.new_dsp()
+        self.compute = self.__dsp.compute
+        self.compute2 = self.__dsp.compute2
+
+        t0 = default_timer()
+        ui = getattr(self.__dsp, "ui", None)
+        if ui is not None:
+            for path, p in python_ui.iter_params(ui):
+                if path in d["params"]:
+                    p._zone[0] = d["params"][path]
+
+        if d["state"] is not None:
+            buf = self.__ffi.buffer(self.__dsp.dsp)
+            if len(buf) != len(d["state"]):
+                raise ValueError("The pickled DSP state has the wrong size.")
+            buf[:] = d["state"]
+        self.__stage("restore", t0)
+
+        self.__tracing = False
+
+    def __stage(self, stage, t0, **info):
+
+        # record the time since t0 as the duration of a construction stage;
+        # instances created later by new_dsp() are not recorded
+        if not self.__tracing:
+            return
+
+        s = CompileStage(stage, default_timer() - t0, info)
+        self.timings.append(s)
+        if self.__trace is not None:
+            self.__trace(s)
+
+    def __fuse(self, sources, fusion):
+
+        if fusion not in FUSION_OPERATORS:
+            raise ValueError("Invalid value for fusion!")
+
+        # Compose the DSPs with FAUST's component() function, putting each
+        # into its own group so that its parameters get their own namespace.
+        # Code strings are written to temporary files that must stay around
+        # until FAUST has compiled the fused program.
+        files = []
+        stages = []
+        names = set()
+        for i, src in enumerate(sources):
+            if type(src) is bytes and not src.endswith(b".dsp"):
+                f = NamedTemporaryFile(suffix=".dsp")
+                f.write(src)
+                f.flush()
+                files.append(f)
+
+                path = f.name
+                name = "stage{}".format(i)
+                label = os.path.basename(path).rpartition('.')[0]
+                self.__renames.append((label, "123stage{}".format(i)))
+            else:
+                if type(src) is bytes:
+                    src = src.decode()
+                path = os.path.abspath(src)
+                name = os.path.basename(path).rpartition('.')[0]
+
+            if name in names:
+                name = "{}{}".format(name, i)
+            names.add(name)
+
+            stages.append('vgroup("{}", component("{}"))'.format(name, path))
+
+        op = " {} ".format(FUSION_OPERATORS[fusion])
+        code = "process = {};\n".format(op.join(stages))
+
+        return code.encode(), files
+
+    def __init_ffi(self, faust_dsp, faust_float, **kwargs):
 
         # compile the FAUST DSP to C and compile it with the CFFI
         with NamedTemporaryFile(suffix=".dsp") as dsp_file:
@@ -112,26 +403,88 @@ class FAUST(object):
                 c_code, faust_float, faust_dsp, **kwargs
             )
 
-        # initialise the DSP object
-        self.__dsp = dsp_class(self.__C, self.__ffi, fs)
+    # expose some internal attributes as properties
+    dsp = property(fget=lambda x: x.__dsp,
+                   doc="The internal PythonDSP object.")
+
+    ffi = property(fget=lambda x: x.__ffi,
+                   doc="The CFFI instance that declares the DSP API.")
+
+    C = property(fget=lambda x: x.__C,
+                 doc="The FFILibrary that represents the compiled code.")
+
+    def __hash_code(self):
+
+        key = "{}\0{}\0{}".format(self.__c_code,
+                                   sorted(self.__kwargs.items()), self.isa)
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    hash = property(fget=__hash_code,
+                    doc="A hash of the C code and compiler options, which "
+                        "identifies the compiled DSP.")
+
+    num_threads = property(
+        fget=lambda x: x.__num_threads,
+        doc="The number of threads of an OpenMP DSP, or None for the default "
+            "of the OpenMP runtime (e.g., from OMP_NUM_THREADS)."
+    )
+
+    def set_num_threads(self, num_threads):
+        """
+        Set the number of threads of an OpenMP DSP (see parallel).
+
+        This applies to the dsp attribute and to the instances created
+        afterwards with new_dsp() (see PythonDSP.num_threads), regardless of
+        the thread that calls compute().
+        """
+
+        self.__dsp.num_threads = num_threads
+        self.__num_threads = num_threads
+
+    def new_dsp(self, fs=None):
+        """
+        Create a new, independent instance of the compiled DSP.
+
+        The instance shares the compiled library with this FAUST object, so
+        this is much cheaper than creating another FAUST object.
+
+        Parameters:
+        -----------
+
+        fs : int (optional)
+            The sampling rate of the new instance.  Defaults to the sampling
+            rate this FAUST object was created with.
+
+        Returns:
+        --------
+
+        dsp : PythonDSP
+            The new DSP object, including its UI and meta-data.
+        """
+
+        dsp_class, ui_class, meta_class = self.__classes
+
+        t0 = default_timer()
+        dsp = dsp_class(self.__C, self.__ffi, fs or self.__fs)
+        dsp.block_size = getattr(self, "block_size", None)
+        dsp.num_threads = self.__num_threads
+        self.__stage("init", t0)
 
         # set up the UI
         if ui_class:
-            UI = ui_class(self.__ffi, self.__dsp)
-            self.__C.buildUserInterfacemydsp(self.__dsp.dsp, UI.ui)
+            t0 = default_timer()
+            UI = ui_class(self.__ffi, dsp)
+            self.__C.buildUserInterfacemydsp(dsp.dsp, UI.ui)
+            self.__stage("ui", t0)
 
         # get the meta-data of the DSP
         if meta_class:
-            Meta = meta_class(self.__ffi, self.__dsp)
+            t0 = default_timer()
+            Meta = meta_class(self.__ffi, dsp)
             self.__C.metadatamydsp(Meta.meta)
+            self.__stage("meta", t0)
 
-        # add shortcuts to the compute* functions
-        self.compute = self.__dsp.compute
-        self.compute2 = self.__dsp.compute2
-
-    # expose some internal attributes as properties
-    dsp = property(fget=lambda x: x.__dsp,
-                   doc="The internal PythonDSP object.")
+        return dsp
 
     def __compile_faust(self, dsp_fname, faust_float):
 
@@ -149,7 +502,11 @@ class FAUST(object):
 
         faust_args = self.FAUST_FLAGS + [dsp_fname]
 
-        return check_output([faust_cmd] + faust_args).decode()
+        t0 = default_timer()
+        c_code = check_output([faust_cmd] + faust_args).decode()
+        self.__stage("faust", t0, command=[faust_cmd] + faust_args)
+
+        return c_code
 
     def __gen_ffi(self, c_code, faust_float, dsp_fname, **kwargs):
 
@@ -165,9 +522,32 @@ class FAUST(object):
             fname = os.path.basename(dsp_fname).rpartition('.')[0]
             c_code = c_code.replace(fname, "123first_box")
 
-        c_flags = ["-std=c99", "-march=native", "-O3"]
-        kwargs["extra_compile_args"] = c_flags + \
-            kwargs.get("extra_compile_args", [])
+        # the same goes for the temporary files of fused code strings
+        for fname, label in self.__renames:
+            c_code = c_code.replace(fname, label)
+
+        self.__c_code = c_code
+
+        # compile for the native instruction set, or for the best ISA variant
+        # the CPU supports (the others are only compiled, see below)
+        if self.__isa_variants is None:
+            self.isa = None
+            march = ["-march=native"]
+            other_variants = []
+        else:
+            best = best_variant(self.__isa_variants)
+            if best is None:
+                raise ValueError("The CPU supports none of the ISA variants!")
+            self.isa = best.name
+            march = best.flags
+            other_variants = [v for v in self.__isa_variants if v is not best]
+
+        user_flags = kwargs.get("extra_compile_args", [])
+
+        def compile_args(march):
+            return ["-std=c99"] + march + ["-O3"] + user_flags
+
+        kwargs["extra_compile_args"] = compile_args(march)
 
         # declare various types and functions
         #
@@ -218,12 +598,9 @@ void instanceInitmydsp(mydsp* dsp, int samplingFreq);
 void initmydsp(mydsp* dsp, int samplingFreq);
 void buildUserInterfacemydsp(mydsp* dsp, UIGlue* interface);
 void computemydsp(mydsp* dsp, int count, FAUSTFLOAT** inputs, FAUSTFLOAT** outputs);
-        """
-        ffi.cdef(cdefs)
+        """ + c_helpers.CDEFS
 
-        # compile the code
-        C = ffi.verify(
-            Template("""
+        source = Template("""
 #define FAUSTFLOAT ${FAUSTFLOAT}
 
 // helper function definitions
@@ -260,8 +637,49 @@ typedef struct {
 } UIGlue;
 
 ${FAUSTC}
-            """).substitute(FAUSTFLOAT=faust_float, FAUSTC=c_code),
-            **kwargs
-        )
+
+${HELPERS}
+        """).substitute(FAUSTFLOAT=faust_float, FAUSTC=c_code,
+                        HELPERS=c_helpers.SOURCE)
+
+        key = (cdefs, source, repr(sorted(kwargs.items())))
+        if key in _LIBRARIES:
+            self.__stage("verify", default_timer(), cache="memory")
+            return _LIBRARIES[key]
+
+        t0 = default_timer()
+        ffi.cdef(cdefs)
+        self.__stage("cdef", t0)
+
+        # Find out whether the CFFI has already compiled this module, in
+        # which case ffi.verify() only loads it.  This mirrors the defaults
+        # of ffi.verify().
+        verify_kwargs = dict(kwargs)
+        tmpdir = verify_kwargs.pop("tmpdir", None) or \
+            os.environ.get("CFFI_TMPDIR") or \
+            os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "__pycache__")
+        module = cffi.verifier.Verifier(ffi, source, tmpdir,
+                                        **verify_kwargs).modulefilename
+        cache = "disk" if os.path.isfile(module) else "miss"
+
+        # compile the other ISA variants into the cache without loading them
+        t0 = default_timer()
+        built = []
+        for v in other_variants:
+            verify_kwargs["extra_compile_args"] = compile_args(v.flags)
+            verifier = cffi.verifier.Verifier(ffi, source, tmpdir,
+                                              **verify_kwargs)
+            if not os.path.isfile(verifier.modulefilename):
+                verifier.compile_module()
+                built.append(v.name)
+        if other_variants:
+            self.__stage("variants", t0, built=built)
+
+        # compile the code
+        t0 = default_timer()
+        C = ffi.verify(source, **kwargs)
+        self.__stage("verify", t0, cache=cache, module=module, isa=self.isa)
+        _LIBRARIES[key] = ffi, C
 
         return ffi, C
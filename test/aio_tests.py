@@ -0,0 +1,106 @@
+import os
+import asyncio
+import unittest
+import cffi
+import numpy as np
+from FAUSTPy import FAUST
+from FAUSTPy.aio import AsyncDSP
+
+#################################
+# test AsyncDSP
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+async def chunks(data, sizes):
+
+    pos = 0
+    for size in sizes:
+        yield data[pos:pos+size]
+        pos += size
+        await asyncio.sleep(0)
+    yield data[pos:]
+
+
+async def collect(stream):
+
+    return b"".join([out async for out in stream])
+
+
+class test_asyncdsp(unittest.TestCase):
+
+    def setUp(self):
+
+        self.faust = FAUST("dattorro_notch_cut_regalia.dsp", 48000)
+        self.dtype = self.faust.dsp.dtype
+
+        self.audio = np.random.randn(2, 5000).astype(self.dtype)
+        self.ref = self.faust.new_dsp().compute(self.audio)
+
+    def test_stream_chunks(self):
+        "Test processing chunks of arbitrary size."
+
+        data = self.audio.T.tobytes()
+        sizes = np.random.randint(1, 3000, 20)
+
+        adsp = AsyncDSP(self.faust, block_size=256, max_queued=2)
+        out = asyncio.run(collect(adsp.stream(chunks(data, sizes))))
+
+        out = np.frombuffer(out, dtype=self.dtype).reshape((-1, 2)).T
+        self.assertEqual(out.shape, self.ref.shape)
+        self.assertTrue(np.allclose(out, self.ref))
+
+    def test_stream_reader(self):
+        "Test processing the data of a StreamReader."
+
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(self.audio.T.tobytes())
+            reader.feed_eof()
+            return await collect(AsyncDSP(self.faust).stream(reader))
+
+        out = np.frombuffer(asyncio.run(run()), dtype=self.dtype)
+        self.assertTrue(np.allclose(out.reshape((-1, 2)).T, self.ref))
+
+    def test_incomplete_frame(self):
+        "Test that a stream must end with a complete frame."
+
+        data = self.audio.T.tobytes()[:-1]
+        adsp = AsyncDSP(self.faust, block_size=256)
+        self.assertRaises(ValueError, asyncio.run,
+                          collect(adsp.stream(chunks(data, []))))
+
+    def test_early_exit(self):
+        "Test that the tasks finish if the consumer stops early."
+
+        data = self.audio.T.tobytes()
+        adsp = AsyncDSP(self.faust, block_size=64, max_queued=1)
+
+        async def run():
+            stream = adsp.stream(chunks(data, [1000]*20))
+            blocks = 0
+            async for out in stream:
+                blocks += 1
+                # a slow consumer, so that the queues fill up
+                await asyncio.sleep(0.01)
+                if blocks == 2:
+                    break
+            await stream.aclose()
+
+            return [t for t in asyncio.all_tasks()
+                    if t is not asyncio.current_task()]
+
+        self.assertEqual(asyncio.run(run()), [])
+
+    def test_bad_args(self):
+        "Test creating AsyncDSP objects with bad arguments."
+
+        self.assertRaises(ValueError, AsyncDSP, self.faust, 0)
+        self.assertRaises(ValueError, AsyncDSP, self.faust, 64, 0)
+        self.assertRaises(ValueError, AsyncDSP,
+                          FAUST("test_synth.dsp", 48000))
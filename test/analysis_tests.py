@@ -0,0 +1,64 @@
+import os
+import unittest
+import cffi
+import numpy as np
+from FAUSTPy import FAUST
+from FAUSTPy.analysis import impulse_responses, frequency_responses
+
+#################################
+# test the analysis functions
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+class test_analysis(unittest.TestCase):
+
+    def setUp(self):
+
+        # a one-pole lowpass, whose impulse response is g*(1-g)^n
+        self.dsp = FAUST(b"""
+        g = hslider("g", 0.5, 0, 1, 0.01);
+        process = *(g) : + ~ *(1-g);
+        """, 48000)
+
+    def test_impulse_responses(self):
+        "Test computing impulse responses for several settings."
+
+        settings = [{"p_g": 0.5}, {"p_g": 0.25}, {}]
+        irs = impulse_responses(self.dsp, settings, block_size=64,
+                                threshold=1e-3)
+        self.assertEqual(len(irs), 3)
+
+        for g, ir in zip([0.5, 0.25, 0.5], irs):
+            n = ir.shape[1]
+            ref = g*(1-g)**np.arange(n)
+            self.assertTrue(np.allclose(ir[0], ref))
+
+            # the responses are truncated once they have decayed
+            self.assertEqual(n % 64, 0)
+            self.assertLess(n, 48000)
+            self.assertLessEqual(abs(ir[0, -64:]).max(), 1e-3*g)
+
+        # the original instance is untouched
+        self.assertEqual(self.dsp.dsp.ui.p_g.zone, 0.5)
+
+        self.assertRaises(ValueError, impulse_responses, self.dsp,
+                          [{"p_foo": 1}])
+
+    def test_frequency_responses(self):
+        "Test computing frequency responses for several settings."
+
+        freqs, H = frequency_responses(self.dsp, [{"p_g": 1}, {"p_g": 0.5}],
+                                       n_fft=256)
+        self.assertEqual(freqs.shape, (129,))
+        self.assertEqual(H.shape, (2, 1, 129))
+        self.assertEqual(freqs[-1], 24000)
+
+        # g=1 passes the impulse unchanged, g=0.5 has unity gain at DC
+        self.assertTrue(np.allclose(H[0], 1))
+        self.assertTrue(np.allclose(H[1, 0, 0], 1, atol=1e-3))
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+import cffi
+import numpy as np
+from FAUSTPy import FAUST, autotune
+
+#################################
+# test the block size tuning
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+class test_autotune(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.tmpdir, "cache", "tune.json")
+        self.faust = FAUST("dattorro_notch_cut_regalia.dsp", 48000)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmpdir)
+
+    def test_block_size(self):
+        "Test that splitting the input does not change the output."
+
+        dsp = self.faust.dsp
+        audio = np.random.randn(2, 1000).astype(dsp.dtype)
+        ref = self.faust.new_dsp().compute(audio)
+
+        dsp.block_size = 64
+        self.assertTrue(np.all(dsp.compute(audio) == ref))
+
+    def test_tune(self):
+        "Test tuning and caching the block size."
+
+        times = autotune.measure_block_sizes(self.faust, [16, 64],
+                                             min_time=0.001)
+        self.assertEqual(sorted(times), [16, 64])
+
+        block_size = autotune.tune_block_size(
+            self.faust, [16, 64], min_time=0.001, cache_file=self.cache_file
+        )
+        self.assertIn(block_size, [16, 64])
+
+        cache = autotune.load_cache(self.cache_file)
+        self.assertEqual(cache[autotune.machine_id()][self.faust.hash],
+                         block_size)
+
+        # the second time around, the cached value is used
+        cache[autotune.machine_id()][self.faust.hash] = 123
+        autotune.save_cache(cache, self.cache_file)
+        self.assertEqual(autotune.tune_block_size(
+            self.faust, [16, 64], cache_file=self.cache_file
+        ), 123)
+
+        self.assertRaises(ValueError, autotune.measure_block_sizes,
+                          self.faust, [])
+
+    def test_auto(self):
+        "Test FAUST objects with block_size=\"auto\"."
+
+        cache_file = autotune.CACHE_FILE
+        autotune.CACHE_FILE = self.cache_file
+        try:
+            cache = {autotune.machine_id(): {self.faust.hash: 128}}
+            autotune.save_cache(cache)
+
+            faust = FAUST("dattorro_notch_cut_regalia.dsp", 48000,
+                          block_size="auto")
+        finally:
+            autotune.CACHE_FILE = cache_file
+
+        self.assertEqual(faust.block_size, 128)
+        self.assertEqual(faust.dsp.block_size, 128)
+        self.assertEqual(faust.new_dsp().block_size, 128)
+        self.assertIn("autotune", [s.stage for s in faust.timings])
+
+        self.assertRaises(ValueError, FAUST, "dattorro_notch_cut_regalia.dsp",
+                          48000, block_size=0)
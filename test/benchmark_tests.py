@@ -0,0 +1,39 @@
+import os
+import unittest
+import cffi
+from FAUSTPy import benchmark
+
+#################################
+# test the benchmark suite
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+class test_benchmark(unittest.TestCase):
+
+    def test_run(self):
+        "Test running a small benchmark."
+
+        results = benchmark.run(dsps=["test_synth.dsp"],
+                                faust_floats=["float"], copies=[1],
+                                block_sizes=[16, 64], min_time=0.001)
+
+        self.assertEqual(results["fs"], 48000)
+        self.assertEqual(len(results["results"]), 1)
+
+        result = results["results"][0]
+        self.assertEqual(result["dsp"], "test_synth.dsp")
+        self.assertEqual(result["num_in"], 0)
+        self.assertEqual([c["block_size"] for c in result["compute"]],
+                         [16, 64])
+        self.assertTrue(all(c["compute_ns"] > 0 for c in result["compute"]))
+
+    def test_bad_args(self):
+        "Test running the benchmark with bad arguments."
+
+        self.assertRaises(ValueError, benchmark.run, parallel=["sch"])
@@ -3,7 +3,7 @@ import unittest
 import cffi
 import numpy as np
 from . helpers import init_ffi
-from FAUSTPy import PythonDSP
+from FAUSTPy import PythonDSP, c_helpers
 
 #################################
 # test PythonDSP
@@ -121,11 +121,32 @@ class test_faustdsp(unittest.TestCase):
     def test_compute_bad_dtype(self):
         "Test the compute() method with inputs of incorrect dtype."
 
-        for dtype in ("float64", "float128"):
+        for dtype in ("int16", "int32", "complex64"):
             audio = np.zeros((self.dsp.num_in, 48e3), dtype=dtype)
             audio[:, 0] = 1
             self.assertRaises(ValueError, self.dsp.compute, audio)
 
+    def test_compute_other_dtype(self):
+        "Test the compute() method with inputs of a different float dtype."
+
+        audio = np.zeros((self.dsp.num_in, 10000), dtype=self.dsp.dtype)
+        audio[:, 0] = 1
+        ref = self.dsp.compute(audio)
+
+        # use a small staging buffer to force several blocks
+        for dtype in ("float64", "float128"):
+            dsp = PythonDSP(self.C1, self.ffi1, 48000)
+            dsp.staging_size = 1024
+            out = dsp.compute(audio.astype(dtype))
+            self.assertEqual(out.dtype, self.dsp.dtype)
+            self.assertTrue(np.all(out == ref))
+
+            dsp = PythonDSP(self.C1, self.ffi1, 48000)
+            dsp.staging_size = 1024
+            out = dsp.compute(audio.astype(dtype), out_dtype=dtype)
+            self.assertEqual(out.dtype, dtype)
+            self.assertTrue(np.all(out == ref))
+
     def test_compute_synth(self):
         "Test the compute() for synthesizer effects."
 
@@ -148,3 +169,338 @@ class test_faustdsp(unittest.TestCase):
         """
 
         self.assertRaises(ValueError, self.synth.compute, -1)
+
+    def test_compute_stats(self):
+        "Test the collection of output statistics in compute()."
+
+        self.assertIsNone(self.dsp.stats)
+        self.dsp.collect_stats()
+
+        audio = np.zeros((self.dsp.num_in, 4800), dtype=self.dsp.dtype)
+        audio[:, 0] = 1
+        out = self.dsp.compute(audio)
+
+        stats = self.dsp.stats
+        self.assertTrue(np.all(stats.count == 4800))
+        self.assertTrue(np.allclose(stats.peak, np.abs(out).max(axis=1)))
+        self.assertTrue(np.allclose(stats.rms,
+                                    np.sqrt(np.mean(out**2, axis=1))))
+        self.assertTrue(np.allclose(stats.dc, out.mean(axis=1)))
+        self.assertTrue(np.all(stats.nonfinite == 0))
+
+        # statistics are reset at every call
+        out = self.dsp.compute(audio[:, :0])
+        self.assertTrue(np.all(stats.count == 0))
+
+        self.dsp.collect_stats(False)
+        self.assertIsNone(self.dsp.stats)
+
+    def test_compute_denormals(self):
+        "Test the flush-to-zero mode and denormal detection of compute()."
+
+        self.assertFalse(self.dsp.flush_denormals)
+        self.assertFalse(self.dsp.detect_denormals)
+
+        self.dsp.flush_denormals = True
+        self.dsp.detect_denormals = True
+
+        # the impulse response of the DSP decays into the subnormal range
+        audio = np.zeros((self.dsp.num_in, 48000), dtype=self.dsp.dtype)
+        audio[:, 0] = 1
+        out = self.dsp.compute(audio)
+
+        tiny = np.finfo(self.dsp.dtype).tiny
+        self.assertFalse(np.any((out != 0) & (np.abs(out) < tiny)))
+        self.assertGreaterEqual(self.dsp.denormal_blocks, 1)
+
+        self.dsp.denormal_blocks = 0
+        self.assertEqual(self.dsp.denormal_blocks, 0)
+
+        self.dsp.flush_denormals = False
+        self.assertFalse(self.dsp.flush_denormals)
+        self.assertTrue(self.dsp.detect_denormals)
+
+        # the detection does not clear the sticky flag of the caller
+        ffi = cffi.FFI()
+        ffi.cdef("""
+#define FE_UNDERFLOW ...
+int feclearexcept(int excepts);
+int feraiseexcept(int excepts);
+int fetestexcept(int excepts);
+        """)
+        fenv = ffi.verify("#include <fenv.h>", libraries=["m"])
+
+        fenv.feraiseexcept(fenv.FE_UNDERFLOW)
+        self.dsp.compute(np.zeros_like(audio))
+        self.assertTrue(fenv.fetestexcept(fenv.FE_UNDERFLOW))
+        fenv.feclearexcept(fenv.FE_UNDERFLOW)
+
+    def test_detect_denormals(self):
+        "Test the denormal detection with all values of FAUSTFLOAT."
+
+        # x87 arithmetic ("long double") cannot flush denormals to zero
+        for faust_float, flush in [("float", True), ("double", True),
+                                   ("long double", False)]:
+            ffi, C = init_ffi(faust_float=faust_float)
+            dsp = PythonDSP(C, ffi, 48000)
+            dsp.flush_denormals = flush
+            dsp.detect_denormals = True
+
+            # normal numbers whose products with coefficients below 1 are
+            # subnormal (and mostly inexact)
+            tiny = np.finfo(dsp.dtype).tiny
+            audio = tiny*np.random.uniform(1, 2, (dsp.num_in, 4800))
+            out = dsp.compute(audio.astype(dsp.dtype))
+
+            self.assertGreaterEqual(dsp.denormal_blocks, 1, faust_float)
+            if flush:
+                self.assertFalse(np.any((out != 0) & (np.abs(out) < tiny)))
+
+    def test_compute_profile(self):
+        "Test the profiling counters of compute()."
+
+        self.assertIsNone(self.dsp.profile)
+        self.dsp.enable_profiling()
+        profile = self.dsp.profile
+
+        audio = np.zeros((self.dsp.num_in, 4800), dtype=self.dsp.dtype)
+        self.dsp.compute(audio)
+        self.dsp.compute(audio)
+
+        self.assertEqual(profile.calls, 2)
+        self.assertEqual(profile.samples, 9600)
+        self.assertGreater(profile.dsp_time, 0)
+        self.assertGreaterEqual(profile.total_time, profile.dsp_time)
+        self.assertGreaterEqual(profile.max_total_time, profile.max_dsp_time)
+        self.assertGreater(profile.overhead, 0)
+        self.assertAlmostEqual(profile.realtime_factor,
+                               0.2/profile.total_time)
+
+        profile.reset()
+        self.assertEqual(profile.calls, 0)
+        self.assertEqual(profile.samples, 0)
+        self.assertEqual(profile.dsp_time, 0)
+
+        self.dsp.enable_profiling(False)
+        self.assertIsNone(self.dsp.profile)
+        self.dsp.compute(audio)
+        self.assertEqual(profile.calls, 0)
+
+    def test_compute_strided(self):
+        "Test the compute() method with non-contiguous channels."
+
+        audio = np.zeros((self.dsp.num_in, 10000), dtype=self.dsp.dtype)
+        audio[:, 0] = 1
+        ref = self.dsp.compute(audio)
+
+        dsp = PythonDSP(self.C1, self.ffi1, 48000)
+        dsp.staging_size = 1024
+        out = dsp.compute(np.asfortranarray(audio))
+        self.assertTrue(np.all(out == ref))
+
+    def test_compute_interleaved(self):
+        "Test the compute_interleaved() method."
+
+        audio = np.zeros((self.dsp.num_in, 10000), dtype=self.dsp.dtype)
+        audio[:, 0] = 1
+        ref = self.dsp.compute(audio)
+
+        dsp = PythonDSP(self.C1, self.ffi1, 48000)
+        dsp.staging_size = 1024
+        out = dsp.compute_interleaved(np.ascontiguousarray(audio.T))
+        self.assertEqual(out.shape, (10000, dsp.num_out))
+        self.assertTrue(out.flags.c_contiguous)
+        self.assertTrue(np.all(out == ref.T))
+
+        count = 128
+        out = self.synth.compute_interleaved(count)
+        self.assertEqual(out.shape, (count, self.synth.num_out))
+
+    def test_compute_channel_list(self):
+        "Test the compute() method with lists of separate channels."
+
+        audio = np.zeros((self.dsp.num_in, 1000), dtype=self.dsp.dtype)
+        audio[:, 0] = 1
+        ref = self.dsp.compute(audio)
+
+        # inputs given as separate arrays and bytes objects
+        dsp = PythonDSP(self.C1, self.ffi1, 48000)
+        channels = [audio[0].copy()] + [c.tobytes() for c in audio[1:]]
+        out = dsp.compute(channels)
+        self.assertTrue(np.all(out == ref))
+
+        # outputs written to separate buffers
+        dsp = PythonDSP(self.C1, self.ffi1, 48000)
+        outputs = [np.empty(1000, dtype=dsp.dtype) for i in range(dsp.num_out)]
+        ret = dsp.compute(list(audio), out=outputs)
+        self.assertIs(ret, outputs)
+        self.assertTrue(np.all(np.array(outputs) == ref))
+
+        # bad inputs and outputs
+        self.assertRaises(ValueError, dsp.compute, [audio[0]])
+        self.assertRaises(ValueError, dsp.compute,
+                          [audio[0], audio[1, :500]])
+        self.assertRaises(ValueError, dsp.compute, audio,
+                          out=[c.tobytes() for c in ref])
+        self.assertRaises(ValueError, dsp.compute, audio,
+                          out=[np.empty(500, dtype=dsp.dtype)]*dsp.num_out)
+
+    def test_rates(self):
+        "Test the input_rates and output_rates attributes."
+
+        self.assertEqual(self.dsp.input_rates, (1,)*self.dsp.num_in)
+        self.assertEqual(self.dsp.output_rates, (1,)*self.dsp.num_out)
+        self.assertEqual(self.synth.input_rates, ())
+        self.assertEqual(self.synth.output_rates, (1,)*self.synth.num_out)
+
+
+# a hand-written multirate DSP: output 0 copies the input, output 1 holds
+# every input sample twice (i.e., it has rate 2)
+MULTIRATE_CDEFS = """
+typedef float FAUSTFLOAT;
+typedef struct {...;} mydsp;
+mydsp *newmydsp();
+void deletemydsp(mydsp*);
+int getSampleRatemydsp(mydsp* dsp);
+int getNumInputsmydsp(mydsp* dsp);
+int getNumOutputsmydsp(mydsp* dsp);
+int getInputRatemydsp(mydsp* dsp, int channel);
+int getOutputRatemydsp(mydsp* dsp, int channel);
+void initmydsp(mydsp* dsp, int samplingFreq);
+void computemydsp(mydsp* dsp, int count, FAUSTFLOAT** inputs, FAUSTFLOAT** outputs);
+"""
+
+MULTIRATE_SOURCE = """
+#include <stdlib.h>
+#define FAUSTFLOAT float
+typedef struct { int fs; } mydsp;
+mydsp *newmydsp() { return (mydsp*)calloc(1, sizeof(mydsp)); }
+void deletemydsp(mydsp* dsp) { free(dsp); }
+int getSampleRatemydsp(mydsp* dsp) { return dsp->fs; }
+int getNumInputsmydsp(mydsp* dsp) { return 1; }
+int getNumOutputsmydsp(mydsp* dsp) { return 2; }
+int getInputRatemydsp(mydsp* dsp, int channel) { return 1; }
+int getOutputRatemydsp(mydsp* dsp, int channel) { return channel + 1; }
+void initmydsp(mydsp* dsp, int samplingFreq) { dsp->fs = samplingFreq; }
+void computemydsp(mydsp* dsp, int count, FAUSTFLOAT** inputs,
+                  FAUSTFLOAT** outputs)
+{
+    int i;
+    for (i = 0; i < count; i++) {
+        outputs[0][i] = inputs[0][i];
+        outputs[1][2*i] = outputs[1][2*i + 1] = inputs[0][i];
+    }
+}
+"""
+
+
+class test_faustdsp_multirate(unittest.TestCase):
+
+    def setUp(self):
+
+        ffi = cffi.FFI()
+        ffi.cdef(MULTIRATE_CDEFS)
+        C = ffi.verify(MULTIRATE_SOURCE)
+        self.dsp = PythonDSP(C, ffi, 48000)
+
+    def test_compute_staged_out(self):
+        "Test computing a multirate DSP into a staged 2-D output array."
+
+        audio = np.random.randn(1, 100).astype(np.float32)
+        ref = [audio[0], np.repeat(audio[0], 2)]
+
+        self.assertEqual(self.dsp.output_rates, (1, 2))
+
+        # float64 channels are staged, and channel 0 is longer than needed
+        out = np.zeros((2, 200))
+        self.dsp.compute(audio, out=out)
+        self.assertTrue(np.all(out[0, :100] == ref[0]))
+        self.assertTrue(np.all(out[1] == ref[1]))
+
+        # also in several blocks
+        self.dsp.staging_size = 16
+        out = np.zeros((2, 200))
+        self.dsp.compute(audio, out=out)
+        self.assertTrue(np.all(out[1] == ref[1]))
+
+
+OPENMP_CDEFS = """
+typedef float FAUSTFLOAT;
+typedef struct {...;} mydsp;
+mydsp *newmydsp();
+void deletemydsp(mydsp*);
+int getSampleRatemydsp(mydsp* dsp);
+int getNumInputsmydsp(mydsp* dsp);
+int getNumOutputsmydsp(mydsp* dsp);
+int getInputRatemydsp(mydsp* dsp, int channel);
+int getOutputRatemydsp(mydsp* dsp, int channel);
+void initmydsp(mydsp* dsp, int samplingFreq);
+void computemydsp(mydsp* dsp, int count, FAUSTFLOAT** inputs, FAUSTFLOAT** outputs);
+int max_threads(void);
+"""
+
+# a synthesizer whose output is the number of threads of a parallel region
+OPENMP_SOURCE = """
+#include <stdlib.h>
+#include <omp.h>
+#define FAUSTFLOAT float
+typedef struct { int fs; } mydsp;
+mydsp *newmydsp() { return (mydsp*)calloc(1, sizeof(mydsp)); }
+void deletemydsp(mydsp* dsp) { free(dsp); }
+int getSampleRatemydsp(mydsp* dsp) { return dsp->fs; }
+int getNumInputsmydsp(mydsp* dsp) { return 0; }
+int getNumOutputsmydsp(mydsp* dsp) { return 1; }
+int getInputRatemydsp(mydsp* dsp, int channel) { return 1; }
+int getOutputRatemydsp(mydsp* dsp, int channel) { return 1; }
+void initmydsp(mydsp* dsp, int samplingFreq) { dsp->fs = samplingFreq; }
+void computemydsp(mydsp* dsp, int count, FAUSTFLOAT** inputs,
+                  FAUSTFLOAT** outputs)
+{
+    int i, n = 0;
+#pragma omp parallel
+    {
+#pragma omp single
+        n = omp_get_num_threads();
+    }
+    for (i = 0; i < count; i++) {
+        outputs[0][i] = n;
+    }
+}
+int max_threads(void) { return omp_get_max_threads(); }
+"""
+
+
+class test_faustdsp_openmp(unittest.TestCase):
+
+    def setUp(self):
+
+        ffi = cffi.FFI()
+        ffi.cdef(OPENMP_CDEFS + c_helpers.CDEFS)
+        self.C = ffi.verify(OPENMP_SOURCE + c_helpers.SOURCE,
+                            extra_compile_args=["-fopenmp"],
+                            extra_link_args=["-fopenmp"])
+        self.dsp = PythonDSP(self.C, ffi, 48000)
+
+    def test_num_threads(self):
+        "Test that the number of threads applies to every calling thread."
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.assertIsNone(self.dsp.num_threads)
+        max_threads = self.C.max_threads()
+
+        self.dsp.num_threads = 3
+        self.assertTrue(np.all(self.dsp.compute(4) == 3))
+        audio = np.zeros((0, 4), dtype=np.float32)
+        self.assertTrue(np.all(self.dsp.compute2(audio) == 3))
+
+        with ThreadPoolExecutor(1) as executor:
+            out = executor.submit(self.dsp.compute, 4).result()
+        self.assertTrue(np.all(out == 3))
+
+        # the setting of the calling thread is not changed
+        self.assertEqual(self.C.max_threads(), max_threads)
+
+        self.dsp.num_threads = None
+        self.assertTrue(np.all(self.dsp.compute(4) == max_threads))
+        self.assertRaises(ValueError, setattr, self.dsp, "num_threads", 0)
@@ -0,0 +1,90 @@
+import os
+import unittest
+import cffi
+import numpy as np
+from FAUSTPy import FAUST, Graph, Series, Parallel, Split, Merge
+
+#################################
+# test Graph
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+class test_graph(unittest.TestCase):
+
+    def setUp(self):
+
+        self.mono = [FAUST(b"process = *(0.5);", 48000) for i in range(4)]
+        self.stereo = [FAUST("dattorro_notch_cut_regalia.dsp", 48000)
+                       for i in range(3)]
+
+        self.audio = np.zeros((2, 1000), dtype=self.mono[0].dsp.dtype)
+        self.audio[:, 0] = 1
+        self.audio[:, 500] = -1
+
+    def test_series(self):
+        "Test connecting DSPs in series."
+
+        ref = self.audio
+        for dsp in self.stereo:
+            ref = dsp.compute(ref)
+
+        # use fresh instances, since the DSPs have state
+        stereo = [FAUST("dattorro_notch_cut_regalia.dsp", 48000)
+                  for i in range(3)]
+
+        graph = Graph(Series(*stereo), block_size=64)
+        self.assertEqual(graph.num_in, 2)
+        self.assertEqual(graph.num_out, 2)
+
+        out = graph.compute(self.audio)
+        self.assertTrue(np.allclose(out, ref))
+
+        # the intermediate buffers of a chain are reused
+        self.assertEqual(len(graph.pool.buffers), 4)
+
+    def test_parallel(self):
+        "Test putting DSPs in parallel."
+
+        graph = Graph(Parallel(self.mono[0], self.mono[1]))
+        self.assertEqual(graph.num_in, 2)
+        self.assertEqual(graph.num_out, 2)
+
+        out = graph.compute(self.audio)
+        self.assertTrue(np.all(out == self.audio*0.5))
+
+    def test_split(self):
+        "Test splitting the output of a DSP."
+
+        graph = Graph(Split(self.mono[0],
+                            Parallel(self.mono[1], self.mono[2])))
+        self.assertEqual(graph.num_in, 1)
+        self.assertEqual(graph.num_out, 2)
+
+        out = graph.compute(self.audio[:1])
+        self.assertTrue(np.all(out == self.audio*0.25))
+
+    def test_merge(self):
+        "Test merging the outputs of a DSP."
+
+        graph = Graph(Merge(Parallel(self.mono[0], self.mono[1]),
+                            self.mono[2]))
+        self.assertEqual(graph.num_in, 2)
+        self.assertEqual(graph.num_out, 1)
+
+        out = graph.compute(self.audio)
+        self.assertTrue(np.all(out == self.audio[:1]*0.5))
+
+    def test_bad_connections(self):
+        "Test connecting DSPs with incompatible numbers of channels."
+
+        self.assertRaises(ValueError, Series, self.mono[0], self.stereo[0])
+        self.assertRaises(ValueError, Split, self.stereo[0],
+                          Parallel(*self.mono[:3]))
+        self.assertRaises(ValueError, Merge,
+                          Parallel(*self.mono[:3]), self.stereo[0])
@@ -2,6 +2,7 @@ import cffi
 from tempfile import NamedTemporaryFile
 from string import Template
 from subprocess import check_call
+from FAUSTPy import c_helpers
 
 
 class empty(object):
@@ -57,7 +58,7 @@ void instanceInitmydsp(mydsp* dsp, int samplingFreq);
 void initmydsp(mydsp* dsp, int samplingFreq);
 void buildUserInterfacemydsp(mydsp* dsp, UIGlue* interface);
 void computemydsp(mydsp* dsp, int count, FAUSTFLOAT** inputs, FAUSTFLOAT** outputs);
-    """
+    """ + c_helpers.CDEFS
     ffi.cdef(cdefs)
 
     with NamedTemporaryFile(suffix=".c") as f:
@@ -112,9 +113,12 @@ typedef struct {
 } UIGlue;
 
 ${FAUSTC}
+
+${HELPERS}
             """).substitute(
                 FAUSTFLOAT=faust_float,
-                FAUSTC=f.read().decode()
+                FAUSTC=f.read().decode(),
+                HELPERS=c_helpers.SOURCE
             ),
             extra_compile_args=["-std=c99", "-march=native", "-O3"],
         )
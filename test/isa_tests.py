@@ -0,0 +1,75 @@
+import os
+import unittest
+import cffi
+import numpy as np
+from FAUSTPy import FAUST, isa
+
+#################################
+# test the ISA variants
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+class test_isa(unittest.TestCase):
+
+    def test_variants(self):
+        "Test selecting ISA variants."
+
+        variants = isa.ISA_VARIANTS["x86_64"]
+        self.assertEqual(isa.get_variants("auto", "x86_64"), variants)
+        self.assertEqual(
+            [v.name for v in isa.get_variants(["baseline", "avx2"],
+                                              "x86_64")],
+            ["avx2", "baseline"]
+        )
+        self.assertRaises(ValueError, isa.get_variants, "foo", "x86_64")
+        self.assertRaises(ValueError, isa.get_variants, "auto", "foo")
+
+        avx2 = frozenset(("avx", "avx2", "bmi1", "bmi2", "f16c", "fma",
+                          "abm", "movbe", "xsave", "cx16", "lahf_lm",
+                          "popcnt", "pni", "sse4_1", "sse4_2", "ssse3"))
+        self.assertEqual(isa.best_variant(variants, avx2).name, "avx2")
+        self.assertEqual(isa.best_variant(variants, frozenset()).name,
+                         "baseline")
+        self.assertIsNone(isa.best_variant(variants[:1], avx2))
+
+        # without any one of the required features, the next lower level is
+        # chosen
+        for feature in ("bmi2", "abm", "movbe"):
+            self.assertEqual(
+                isa.best_variant(variants, avx2 - {feature}).name, "sse4"
+            )
+        for feature in ("cx16", "lahf_lm", "pni"):
+            self.assertEqual(
+                isa.best_variant(variants, avx2 - {feature}).name,
+                "baseline"
+            )
+
+    @unittest.skipUnless(isa.machine() == "x86_64", "needs x86-64")
+    def test_faust(self):
+        "Test compiling several ISA variants."
+
+        ref = FAUST("dattorro_notch_cut_regalia.dsp", 48000)
+        self.assertIsNone(ref.isa)
+
+        dsp = FAUST("dattorro_notch_cut_regalia.dsp", 48000,
+                    isa=["sse4", "baseline"])
+        best = isa.best_variant(isa.get_variants(["sse4", "baseline"]))
+        self.assertEqual(dsp.isa, best.name)
+        self.assertIn("variants", [s.stage for s in dsp.timings])
+        self.assertNotEqual(dsp.hash, ref.hash)
+
+        audio = np.random.randn(2, 256).astype(dsp.dsp.dtype)
+        self.assertTrue(np.allclose(dsp.compute(audio),
+                                    ref.new_dsp().compute(audio)))
+
+        # the other variant is already compiled (or even loaded)
+        dsp = FAUST("dattorro_notch_cut_regalia.dsp", 48000, isa="baseline")
+        stages = dict((s.stage, s.info) for s in dsp.timings)
+        self.assertIn(stages["verify"]["cache"], ("disk", "memory"))
+        self.assertEqual(dsp.isa, "baseline")
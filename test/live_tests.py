@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import cffi
+import numpy as np
+from FAUSTPy.live import LiveDSP
+
+#################################
+# test LiveDSP
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+class test_livedsp(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.dsp_file = os.path.join(self.tmpdir, "live.dsp")
+        shutil.copy("dattorro_notch_cut_regalia.dsp", self.dsp_file)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmpdir)
+
+    def touch(self):
+
+        with open(self.dsp_file, "a") as f:
+            f.write("// changed\n")
+
+    def test_reload(self):
+        "Test swapping in a new version with parameter carry-over."
+
+        live = LiveDSP(self.dsp_file, 48000, crossfade=48)
+        live.dsp.ui.p_Gain = 0.75
+
+        # a copy of the old version
+        ref_old = live.faust.new_dsp()
+        ref_old.ui.p_Gain = 0.75
+
+        audio = np.random.randn(2, 32).astype(live.dsp.dtype)
+        live.compute(audio)
+        ref_old.compute(audio)
+        old = live.dsp
+
+        self.assertTrue(live.reload())
+        self.assertIsNone(live.error)
+        self.assertIs(live.dsp, old)
+
+        # swapped at the next block, crossfading from the old version
+        out = live.compute(audio), live.compute(audio)
+        ref_old = ref_old.compute(audio), ref_old.compute(audio)
+
+        self.assertEqual(live.version, 1)
+        self.assertIsNot(live.dsp, old)
+        self.assertEqual(live.dsp.ui.p_Gain.zone, np.float32(0.75))
+
+        ref_new = live.faust.new_dsp()
+        ref_new.ui.p_Gain = 0.75
+        ref_new = ref_new.compute(audio), ref_new.compute(audio)
+
+        ramp = np.minimum(np.arange(1, 65)/48.0, 1)
+        ref = np.hstack(ref_old) + ramp*(np.hstack(ref_new) -
+                                          np.hstack(ref_old))
+        self.assertTrue(np.allclose(np.hstack(out), ref, atol=1e-6))
+
+    def test_watch(self):
+        "Test recompiling in the background when the file changes."
+
+        with LiveDSP(self.dsp_file, 48000, poll_interval=0.01) as live:
+            # make sure that the modification time changes
+            time.sleep(0.05)
+            self.touch()
+
+            audio = np.zeros((2, 16), dtype=live.dsp.dtype)
+            deadline = time.time() + 30
+            while live.version == 0 and time.time() < deadline:
+                live.compute(audio)
+                time.sleep(0.01)
+
+        self.assertEqual(live.version, 1)
+
+    def test_error(self):
+        "Test that a failed compilation keeps the current version."
+
+        live = LiveDSP(self.dsp_file, 48000)
+        dsp = live.dsp
+
+        os.remove(self.dsp_file)
+        self.assertFalse(live.reload())
+        self.assertIsNotNone(live.error)
+
+        live.compute(np.zeros((2, 16), dtype=dsp.dtype))
+        self.assertIs(live.dsp, dsp)
+        self.assertEqual(live.version, 0)
+
+    def test_init_wrong_args(self):
+        "Test initialisation with bad arguments."
+
+        self.assertRaises(ValueError, LiveDSP, self.dsp_file, 48000,
+                          crossfade=-1)
+        self.assertRaises(ValueError, LiveDSP, self.dsp_file, 48000,
+                          poll_interval=0)
@@ -0,0 +1,87 @@
+import os
+import unittest
+import cffi
+import numpy as np
+from FAUSTPy import FAUST
+from FAUSTPy.poly import VoicePool, midi_to_freq
+
+#################################
+# test VoicePool
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+class test_voicepool(unittest.TestCase):
+
+    def setUp(self):
+
+        # the output of a voice is gate*gain*freq/440
+        self.synth = FAUST(b"""
+        freq = hslider("freq", 440, 20, 2000, 0.001);
+        gain = hslider("gain", 0.5, 0, 1, 0.01);
+        gate = button("gate");
+        process = gate * gain * freq/440;
+        """, 48000)
+
+        self.pool = VoicePool(self.synth, 2)
+
+    def test_note_on_off(self):
+        "Test starting and releasing notes."
+
+        self.assertEqual(self.pool.num_active, 0)
+        out = self.pool.compute(16)
+        self.assertTrue(np.all(out == 0))
+
+        self.pool.note_on(69, 0.5)
+        self.pool.note_on(81, 0.25)
+        self.assertEqual(self.pool.num_active, 2)
+
+        out = self.pool.compute(16)
+        self.assertTrue(np.allclose(out, 0.5 + 0.25*2))
+
+        self.pool.note_off(69)
+        out = self.pool.compute(16)
+        self.assertTrue(np.allclose(out, 0.25*2))
+
+        # the released voice is silent, so it is no longer computed
+        self.assertEqual(self.pool.num_active, 1)
+
+        self.pool.all_notes_off()
+        out = self.pool.compute(16)
+        self.assertTrue(np.all(out == 0))
+        self.assertEqual(self.pool.num_active, 0)
+
+    def test_voice_stealing(self):
+        "Test that the oldest voice is stolen and retriggered."
+
+        v1 = self.pool.note_on(69, 1.0)
+        v2 = self.pool.note_on(81, 1.0)
+        self.pool.compute(16)
+
+        v3 = self.pool.note_on(57, 1.0)
+        self.assertEqual(v3, v1)
+
+        out = self.pool.compute(16)
+
+        # the stolen voice has its gate closed for one sample
+        self.assertTrue(np.allclose(out[0, 0], 2.0))
+        self.assertTrue(np.allclose(out[0, 1:], 2.0 + 0.5))
+
+    def test_bad_args(self):
+        "Test creating voice pools with bad arguments."
+
+        self.assertRaises(ValueError, VoicePool, self.synth, 0)
+        self.assertRaises(ValueError, VoicePool,
+                          FAUST(b"process = *(0.5);", 48000), 2)
+
+    def test_midi_to_freq(self):
+        "Test the conversion of MIDI note numbers to frequencies."
+
+        self.assertEqual(midi_to_freq(69), 440.0)
+        self.assertEqual(midi_to_freq(81), 880.0)
+        self.assertEqual(midi_to_freq(57), 220.0)
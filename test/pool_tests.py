@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+import unittest
+import cffi
+import numpy as np
+from FAUSTPy import FAUST
+from FAUSTPy.pool import InstancePool
+
+#################################
+# test InstancePool
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+class test_instancepool(unittest.TestCase):
+
+    def setUp(self):
+
+        self.faust = FAUST("dattorro_notch_cut_regalia.dsp", 48000)
+        self.pool = InstancePool(self.faust, size=2, max_size=3)
+
+        self.audio = np.zeros((2, 256), dtype=self.faust.dsp.dtype)
+        self.audio[:, 0] = 1
+
+    def test_checkout(self):
+        "Test checking out and returning instances."
+
+        self.assertEqual(self.pool.size(), 2)
+        self.assertEqual(self.pool.available(), 2)
+
+        with self.pool.checkout() as dsp:
+            self.assertEqual(self.pool.available(), 1)
+            ref = dsp.compute(self.audio)
+
+        self.assertEqual(self.pool.available(), 2)
+        self.assertEqual(self.pool.stats.hits, 1)
+        self.assertEqual(self.pool.stats.misses, 0)
+
+        # other sampling rates get their own instances
+        with self.pool.checkout(fs=44100) as dsp:
+            self.assertEqual(dsp.fs, 44100)
+        self.assertEqual(self.pool.size(44100), 1)
+        self.assertEqual(self.pool.stats.misses, 1)
+        self.assertEqual(self.pool.stats.hit_rate, 0.5)
+
+    def test_reset(self):
+        "Test that returned instances are reset."
+
+        with self.pool.checkout() as dsp:
+            ref = dsp.compute(self.audio)
+            dsp.ui.p_Q = dsp.ui.p_Q.max
+            self.assertNotEqual(dsp.ui.p_Q.zone, dsp.ui.p_Q.default)
+            used = dsp
+
+        # the most recently returned instance is reused first
+        dsp = self.pool.acquire()
+        self.assertIs(dsp, used)
+
+        self.assertEqual(dsp.ui.p_Q.zone, dsp.ui.p_Q.default)
+        self.assertTrue(np.all(dsp.compute(self.audio) == ref))
+
+    def test_reset_options(self):
+        "Test that the options of returned instances are restored."
+
+        with self.pool.checkout() as dsp:
+            dsp.collect_stats()
+            dsp.enable_profiling()
+            dsp.flush_denormals = True
+            dsp.detect_denormals = True
+            dsp.record_displays(10)
+            dsp.staging_size = 16
+            dsp.block_size = 32
+            dsp.compute(self.audio)
+            used = dsp
+
+        dsp = self.pool.acquire()
+        self.assertIs(dsp, used)
+
+        self.assertIsNone(dsp.stats)
+        self.assertIsNone(dsp.profile)
+        self.assertFalse(dsp.flush_denormals)
+        self.assertFalse(dsp.detect_denormals)
+        self.assertEqual(dsp.denormal_blocks, 0)
+        self.assertIsNone(dsp.display_history)
+        self.assertEqual(dsp.staging_size, self.faust.new_dsp().staging_size)
+        self.assertEqual(dsp.block_size, self.faust.new_dsp().block_size)
+
+    def test_wait(self):
+        "Test waiting for an instance."
+
+        dsps = [self.pool.acquire() for i in range(3)]
+        self.assertEqual(self.pool.size(), 3)
+        self.assertRaises(RuntimeError, self.pool.acquire, timeout=0.01)
+
+        def release():
+            time.sleep(0.05)
+            self.pool.release(dsps[0])
+
+        t = threading.Thread(target=release)
+        t.start()
+        dsp = self.pool.acquire(timeout=5)
+        t.join()
+
+        self.assertIs(dsp, dsps[0])
+        self.assertEqual(self.pool.stats.waits, 1)
+        self.assertGreater(self.pool.stats.max_wait_time, 0)
+
+    def test_bad_args(self):
+        "Test creating pools with bad sizes."
+
+        self.assertRaises(ValueError, InstancePool, self.faust, 0)
+        self.assertRaises(ValueError, InstancePool, self.faust, 2, 1)
@@ -0,0 +1,106 @@
+import os
+import io
+import time
+import unittest
+import cffi
+import numpy as np
+from FAUSTPy import FAUST
+from FAUSTPy.realtime import Engine, NullDriver, FileDriver
+
+#################################
+# test the real-time engine
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+class SlowDriver(NullDriver):
+    """A NullDriver that takes two periods to write each block."""
+
+    def write(self, outputs, count):
+
+        time.sleep(2*self.block_size/float(self.fs))
+
+
+class test_engine(unittest.TestCase):
+
+    def setUp(self):
+
+        self.dsp = FAUST(b"process = *(0.5), *(0.25);", 48000)
+
+    def test_null_driver(self):
+        "Test running the engine with a simulated clock."
+
+        driver = NullDriver(48000, num_blocks=100)
+        engine = Engine(self.dsp, driver, block_size=256)
+
+        t0 = time.time()
+        stats = engine.run()
+        self.assertLess(time.time() - t0, 100*256/48000.0)
+
+        self.assertEqual(stats.blocks, 100)
+        self.assertEqual(stats.xruns, 0)
+        self.assertTrue(all(h > 0 for h in stats.headroom))
+
+        summary = stats.summary()
+        self.assertEqual(summary["blocks"], 100)
+        self.assertEqual(summary["xruns"], 0)
+        self.assertGreater(summary["headroom_min_fraction"], 0)
+
+    def test_xruns(self):
+        "Test the detection of deadline misses."
+
+        engine = Engine(self.dsp, SlowDriver(48000), block_size=64)
+        stats = engine.run(5)
+
+        self.assertEqual(stats.blocks, 5)
+        self.assertEqual(stats.xruns, 5)
+        self.assertTrue(all(h < 0 for h in stats.headroom))
+
+        # every late block delays the start of the next period
+        self.assertTrue(all(j > 0 for j in list(stats.jitter)[1:]))
+
+    def test_file_driver(self):
+        "Test processing raw frames from and to files."
+
+        dtype = self.dsp.dsp.dtype
+        audio = np.random.randn(1000, 2).astype(dtype)
+        infile = io.BytesIO(audio.tobytes())
+        outfile = io.BytesIO()
+
+        engine = Engine(self.dsp, FileDriver(48000, infile, outfile),
+                        block_size=256)
+        stats = engine.run()
+        self.assertEqual(stats.blocks, 4)
+
+        out = np.frombuffer(outfile.getvalue(), dtype=dtype).reshape(-1, 2)
+        self.assertEqual(out.shape, (1000, 2))
+        self.assertTrue(np.all(out == audio*[0.5, 0.25]))
+
+    def test_history(self):
+        "Test that only the timings of the most recent blocks are kept."
+
+        engine = Engine(self.dsp, NullDriver(48000, num_blocks=50),
+                        block_size=64, history=10)
+        stats = engine.run()
+
+        self.assertEqual(stats.blocks, 50)
+        self.assertEqual(len(stats.jitter), 10)
+        self.assertEqual(len(stats.compute_time), 10)
+        self.assertEqual(len(stats.headroom), 10)
+
+        # the extremes cover all blocks
+        summary = stats.summary()
+        self.assertEqual(summary["blocks"], 50)
+        self.assertLessEqual(summary["headroom_min"], min(stats.headroom))
+        self.assertGreaterEqual(summary["compute_max"],
+                                max(stats.compute_time))
+
+    def test_bad_args(self):
+        "Test creating an engine with bad arguments."
+
+        self.assertRaises(ValueError, Engine, self.dsp, NullDriver(48000), 0)
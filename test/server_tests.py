@@ -0,0 +1,131 @@
+import os
+import tempfile
+import threading
+import unittest
+import cffi
+import numpy as np
+from FAUSTPy import FAUST
+from FAUSTPy import server
+from FAUSTPy.server import DSPServer, Client
+
+#################################
+# test DSPServer
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+class test_server(unittest.TestCase):
+
+    def setUp(self):
+
+        self.effect = FAUST(b'process = *(hslider("gain", 1, 0, 1, 0.1));',
+                            48000)
+        self.synth = FAUST("test_synth.dsp", 48000)
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.address = address = os.path.join(self.tmpdir, "faust.sock")
+        self.server = DSPServer([("effect", self.effect),
+                                 ("synth", self.synth)], address,
+                                num_instances=2, max_frames=4096,
+                                acquire_timeout=0.1)
+
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+        self.client = Client(address)
+
+    def tearDown(self):
+
+        self.client.close()
+        self.server.shutdown()
+        self.thread.join()
+        os.rmdir(self.tmpdir)
+
+    def test_describe(self):
+        "Test the description of the served DSPs."
+
+        effect, synth = self.client.dsps
+        self.assertEqual(effect["name"], "effect")
+        self.assertEqual(effect["num_in"], 1)
+        self.assertEqual(effect["num_out"], 1)
+        self.assertEqual(effect["params"], ["p_gain"])
+        self.assertEqual(synth["num_in"], 0)
+
+    def test_process(self):
+        "Test processing audio on the server."
+
+        dtype = self.effect.dsp.dtype
+        audio = np.random.randn(1000, 1).astype(dtype)
+
+        out = self.client.process(0, audio)
+        self.assertTrue(np.all(out == audio))
+
+        # parameter updates persist for the connection
+        out = self.client.process(0, audio, {"p_gain": 0.5})
+        self.assertTrue(np.all(out == audio*0.5))
+        out = self.client.process(0, audio[:10])
+        self.assertTrue(np.all(out == audio[:10]*0.5))
+
+        ref = self.synth.new_dsp().compute(64)
+        out = self.client.process(1, 64)
+        self.assertTrue(np.allclose(out.T, ref))
+
+        stats = self.client.stats()
+        self.assertEqual(stats["requests"], 4)
+        self.assertEqual(stats["frames"], 2074)
+        self.assertIn("latency_p99", stats)
+
+    def test_errors(self):
+        "Test that invalid requests are reported."
+
+        self.assertRaises(ValueError, self.client.process, 0,
+                          np.zeros((10, 1)), {"p_foo": 1})
+        self.assertRaises(ValueError, DSPServer, [], "foo.sock", 0)
+
+    def test_busy(self):
+        "Test that connections get an error if no instance is free."
+
+        clients = [Client(self.address) for i in range(2)]
+        try:
+            self.client.process(1, 64)
+            clients[0].process(1, 64)
+
+            # both instances are in use
+            self.assertRaises(ValueError, clients[1].process, 1, 64)
+
+            # the connection is still usable once an instance is free
+            clients[0].close()
+            self.assertEqual(clients[1].process(1, 64).shape, (64, 2))
+        finally:
+            for c in clients:
+                c.close()
+
+    def test_max_frames(self):
+        "Test that too large requests are rejected."
+
+        self.assertEqual(self.client.dsps[0]["max_frames"], 4096)
+        self.assertEqual(self.client.process(1, 4096).shape, (4096, 2))
+        self.assertRaises(ValueError, self.client.process, 1, 2**32 - 1)
+
+        # the server rejects them, too
+        client = Client(self.address)
+        try:
+            client.sock.sendall(server.REQUEST.pack(server.PROCESS, 1, 0,
+                                                    2**32 - 1))
+            status, length = server.REPLY.unpack(
+                server._recv(client.sock, server.REPLY.size))
+            self.assertEqual(status, server.ERROR)
+        finally:
+            client.close()
+
+        # requests with input are rejected before they are sent
+        num_in = self.client.dsps[0]["num_in"]
+        self.assertRaises(ValueError, self.client.process, 0,
+                          np.zeros((5000, num_in)))
+        self.assertEqual(self.client.process(1, 64).shape, (64, 2))
+        self.assertRaises(ValueError, DSPServer, [], "foo.sock", 1, 0)
@@ -0,0 +1,155 @@
+import os
+import multiprocessing
+import pickle
+import subprocess
+import sys
+import unittest
+import cffi
+import numpy as np
+from FAUSTPy import FAUST
+from FAUSTPy.shm import SharedRingBuffer, process
+
+#################################
+# test SharedRingBuffer
+#################################
+
+
+def tearDownModule():
+    cffi.verifier.cleanup_tmpdir(
+        tmpdir=os.sep.join([os.path.dirname(__file__), "__pycache__"])
+    )
+
+
+def negate(inputs, outputs):
+
+    # runs in a child process
+    while True:
+        block = inputs.read_slot(timeout=10)
+        if block is None:
+            break
+        slot = outputs.write_slot(timeout=10)
+        np.negative(block, out=slot[:, :block.shape[1]])
+        outputs.commit(block.shape[1])
+        inputs.release()
+    outputs.close_writer()
+    inputs.close()
+    outputs.close()
+
+
+class test_ringbuffer(unittest.TestCase):
+
+    def test_write_read(self):
+        "Test writing and reading slots."
+
+        with SharedRingBuffer(2, 2, 16, np.float32) as rb:
+            self.assertEqual(len(rb), 0)
+
+            rb.write_slot()[:] = 1
+            rb.commit()
+            rb.write_slot()[:, :8] = 2
+            rb.commit(8)
+            self.assertEqual(len(rb), 2)
+
+            # the ring buffer is full
+            self.assertRaises(RuntimeError, rb.write_slot, 0.01)
+
+            other = SharedRingBuffer.attach(rb.name)
+            self.assertEqual(other.dtype, np.float32)
+            self.assertEqual(other.block_size, 16)
+
+            block = other.read_slot()
+            self.assertEqual(block.shape, (2, 16))
+            self.assertTrue(np.all(block == 1))
+            other.release()
+
+            block = other.read_slot()
+            self.assertEqual(block.shape, (2, 8))
+            self.assertTrue(np.all(block == 2))
+            other.release()
+
+            self.assertRaises(RuntimeError, other.read_slot, 0.01)
+            rb.close_writer()
+            self.assertIsNone(other.read_slot())
+            other.close()
+
+    def test_processes(self):
+        "Test passing blocks to another process and back."
+
+        ctx = multiprocessing.get_context("spawn")
+        with SharedRingBuffer(4, 2, 64, np.float64) as a, \
+                SharedRingBuffer(4, 2, 64, np.float64) as b:
+            worker = ctx.Process(target=negate, args=(a, b))
+            worker.start()
+
+            audio = np.random.randn(2, 1000)
+            out = []
+            for pos in range(0, 1000, 64):
+                block = audio[:, pos:pos+64]
+                a.write_slot(timeout=10)[:, :block.shape[1]] = block
+                a.commit(block.shape[1])
+                out.append(b.read_slot(timeout=10).copy())
+                b.release()
+            a.close_writer()
+            self.assertIsNone(b.read_slot(timeout=10))
+
+            worker.join()
+            self.assertTrue(np.all(np.hstack(out) == -audio))
+
+    def test_attach_other_process(self):
+        "Test that a process that attached does not unlink the buffer."
+
+        # a separate interpreter, which has its own resource tracker
+        code = "from FAUSTPy.shm import SharedRingBuffer as R; " \
+            "R.attach({!r}).close()"
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        with SharedRingBuffer(2, 1, 4, np.float32) as rb:
+            proc = subprocess.Popen(
+                [sys.executable, "-c", code.format(rb.name)], cwd=root,
+                stderr=subprocess.PIPE
+            )
+            err = proc.communicate()[1].decode()
+            self.assertEqual(proc.returncode, 0, err)
+            self.assertNotIn("leaked", err)
+
+            # the buffer still exists
+            SharedRingBuffer.attach(rb.name).close()
+
+        rb.close()
+
+    def test_pickle(self):
+        "Test that pickled ring buffers attach to the same memory."
+
+        with SharedRingBuffer(2, 1, 4, np.float32) as rb:
+            other = pickle.loads(pickle.dumps(rb))
+            rb.write_slot()[:] = 3
+            rb.commit()
+            self.assertTrue(np.all(other.read_slot() == 3))
+            other.close()
+
+    def test_process_dsp(self):
+        "Test computing a DSP from one ring buffer into another."
+
+        faust = FAUST("dattorro_notch_cut_regalia.dsp", 48000)
+        dtype = faust.dsp.dtype
+        audio = np.random.randn(2, 300).astype(dtype)
+        ref = faust.new_dsp().compute(audio)
+
+        with SharedRingBuffer(8, 2, 64, dtype) as a, \
+                SharedRingBuffer(8, 2, 64, dtype) as b:
+            for pos in range(0, 300, 64):
+                block = audio[:, pos:pos+64]
+                a.write_slot()[:, :block.shape[1]] = block
+                a.commit(block.shape[1])
+            a.close_writer()
+
+            self.assertEqual(process(faust, a, b), 5)
+
+            out = []
+            block = b.read_slot()
+            while block is not None:
+                out.append(block.copy())
+                b.release()
+                block = b.read_slot()
+
+        self.assertTrue(np.allclose(np.hstack(out), ref))
@@ -276,3 +276,78 @@ class test_faustui(unittest.TestCase):
 
         self.obj.p_button.zone = 1
         self.assertEqual(self.obj.p_button.zone, param[0])
+
+    def test_addHorizontalBargraph(self):
+        "Test the addHorizontalBargraph C callback."
+
+        c_ui = self.ui.ui
+
+        param = self.ffi.new("FAUSTFLOAT*", 0.5)
+        c_ui.addHorizontalBargraph(c_ui.uiInterface, b"bargraph", param, 0.0,
+                                   1.0)
+        self.assertTrue(hasattr(self.obj, "p_bargraph"))
+        self.assertEqual(self.obj.p_bargraph.label, b"bargraph")
+        self.assertEqual(self.obj.p_bargraph.zone, 0.5)
+        self.assertEqual(self.obj.p_bargraph.min, 0.0)
+        self.assertEqual(self.obj.p_bargraph.max, 1.0)
+        self.assertEqual(self.obj.p_bargraph.metadata, {})
+        self.assertEqual(self.obj.p_bargraph.type, "HorizontalBargraph")
+
+        # the DSP writes to the zone, so changes must be visible
+        param[0] = 0.25
+        self.assertEqual(self.obj.p_bargraph.zone, 0.25)
+
+    def test_addVerticalBargraph(self):
+        "Test the addVerticalBargraph C callback."
+
+        c_ui = self.ui.ui
+
+        param = self.ffi.new("FAUSTFLOAT*", 0.5)
+        c_ui.addVerticalBargraph(c_ui.uiInterface, b"bargraph", param, 0.0,
+                                 1.0)
+        self.assertTrue(hasattr(self.obj, "p_bargraph"))
+        self.assertEqual(self.obj.p_bargraph.label, b"bargraph")
+        self.assertEqual(self.obj.p_bargraph.zone, 0.5)
+        self.assertEqual(self.obj.p_bargraph.type, "VerticalBargraph")
+
+    def test_addNumDisplay(self):
+        "Test the addNumDisplay C callback."
+
+        c_ui = self.ui.ui
+
+        param = self.ffi.new("FAUSTFLOAT*", 2.0)
+        c_ui.addNumDisplay(c_ui.uiInterface, b"display", param, 3)
+        self.assertTrue(hasattr(self.obj, "p_display"))
+        self.assertEqual(self.obj.p_display.zone, 2.0)
+        self.assertEqual(self.obj.p_display.precision, 3)
+        self.assertEqual(self.obj.p_display.type, "NumDisplay")
+
+    def test_addTextDisplay(self):
+        "Test the addTextDisplay C callback."
+
+        c_ui = self.ui.ui
+
+        param = self.ffi.new("FAUSTFLOAT*", 1.0)
+        c_names = [self.ffi.new("char[]", n) for n in (b"off", b"on")]
+        names = self.ffi.new("char*[]", c_names + [self.ffi.NULL])
+        c_ui.addTextDisplay(c_ui.uiInterface, b"display", param, names, 0.0,
+                            1.0)
+        self.assertTrue(hasattr(self.obj, "p_display"))
+        self.assertEqual(self.obj.p_display.zone, 1.0)
+        self.assertEqual(self.obj.p_display.names, [b"off", b"on"])
+        self.assertEqual(self.obj.p_display.type, "TextDisplay")
+
+    def test_display_read_only(self):
+        "Test that passive widgets cannot be written to."
+
+        c_ui = self.ui.ui
+
+        param = self.ffi.new("FAUSTFLOAT*", 0.5)
+        c_ui.openVerticalBox(c_ui.uiInterface, b"box")
+        c_ui.addHorizontalBargraph(c_ui.uiInterface, b"bargraph", param, 0.0,
+                                   1.0)
+        c_ui.closeBox(c_ui.uiInterface)
+
+        with self.assertRaises(AttributeError):
+            self.obj.b_box.p_bargraph = 1.0
+        self.assertEqual(param[0], 0.5)
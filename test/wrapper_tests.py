@@ -25,6 +25,18 @@ class test_faustwrapper_init(unittest.TestCase):
         FAUST("dattorro_notch_cut_regalia.dsp", 48000, "double")
         FAUST("dattorro_notch_cut_regalia.dsp", 48000, "long double")
 
+    def test_init_positional(self):
+        """Test passing the DSP/UI/Meta classes as positional arguments."""
+
+        from FAUSTPy import PythonDSP
+
+        class MyDSP(PythonDSP):
+            pass
+
+        dsp = FAUST("dattorro_notch_cut_regalia.dsp", 48000, "float", [],
+                    MyDSP)
+        self.assertIs(type(dsp.dsp), MyDSP)
+
     def test_init_inline_code(self):
         """Test initialisation of FAUST objects with inline FAUST code."""
 
@@ -33,6 +45,27 @@ class test_faustwrapper_init(unittest.TestCase):
         dsp = FAUST(b"process=*(0.5);", 48000, "double")
         dsp = FAUST(b"process=*(0.5);", 48000, "long double")
 
+    def test_init_timings(self):
+        """Test the timing of the construction stages."""
+
+        stages = []
+        dsp = FAUST(b"process=*(0.25);", 48000, trace=stages.append)
+        self.assertEqual(stages, dsp.timings)
+        self.assertEqual([s.stage for s in stages],
+                         ["faust", "cdef", "verify", "init", "ui", "meta"])
+        self.assertTrue(all(s.seconds >= 0 for s in stages))
+        self.assertIn(stages[2].info["cache"], ("disk", "miss"))
+
+        # the second time around the library is cached in memory
+        dsp = FAUST(b"process=*(0.25);", 48000)
+        self.assertEqual([s.stage for s in dsp.timings],
+                         ["faust", "verify", "init", "ui", "meta"])
+        self.assertEqual(dsp.timings[1].info["cache"], "memory")
+
+        # new instances are not recorded
+        dsp.new_dsp()
+        self.assertEqual(len(dsp.timings), 5)
+
     def test_init_wrong_args(self):
         """Test initialisation of FAUST objects with bad arguments."""
 
@@ -79,3 +112,164 @@ class test_faustwrapper(unittest.TestCase):
         out = self.dsp2.compute(audio)
 
         self.assertEqual(out[0, 0], audio[0, 0]*0.5)
+
+    def test_record_displays(self):
+        """Test recording of passive widgets during compute()."""
+
+        dsp_code = b'process = _ <: attach(_, abs : hbargraph("level", 0, 1));'
+        dsp = FAUST(dsp_code, 48000)
+        dsp.dsp.record_displays(4, block_size=16)
+
+        audio = np.zeros((1, 100), dtype=dsp.dsp.dtype)
+        audio[0, 15::16] = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
+        dsp.compute(audio)
+
+        history = dsp.dsp.display_history
+        self.assertEqual(history.paths, ["p_level"])
+        self.assertEqual(len(history), 4)
+        self.assertTrue(np.all(history.positions == [64, 80, 96, 100]))
+        self.assertTrue(np.allclose(history.values[:, 0],
+                                    [0.4, 0.5, 0.6, 0.0]))
+
+    def test_fusion(self):
+        """Test fusing several DSPs into one FAUST program."""
+
+        stages = [b'process = *(0.5);',
+                  b'process = *(hslider("gain", 0.5, 0, 1, 0.1));']
+
+        dsp = FAUST(stages, 48000)
+        self.assertEqual(dsp.dsp.num_in, 1)
+        self.assertEqual(dsp.dsp.num_out, 1)
+        self.assertTrue(hasattr(dsp.dsp.ui.b_stage1, "p_gain"))
+
+        audio = np.ones((1, 16), dtype=dsp.dsp.dtype)
+        out = dsp.compute(audio)
+        self.assertTrue(np.all(out == 0.25))
+
+        dsp.dsp.ui.b_stage1.p_gain = 1.0
+        out = dsp.compute(audio)
+        self.assertTrue(np.all(out == 0.5))
+
+        dsp = FAUST(stages, 48000, fusion="parallel")
+        self.assertEqual(dsp.dsp.num_in, 2)
+        self.assertEqual(dsp.dsp.num_out, 2)
+
+        self.assertRaises(ValueError, FAUST, stages, 48000, fusion="foo")
+
+    def test_render_score(self):
+        """Test rendering with timestamped parameter events."""
+
+        dsp = FAUST(b'process = *(hslider("gain", 0, 0, 1, 0.25));', 48000)
+        audio = np.ones((1, 16), dtype=dsp.dsp.dtype)
+
+        events = [(8, "p_gain", 2.0), (4, "p_gain", 0.3), (12, "p_gain", 0),
+                  (100, "p_gain", 1)]
+        out = dsp.dsp.render_score(events, 16, audio)
+
+        # the values are limited and quantised, and later events are ignored
+        ref = np.repeat([0, 0.25, 1, 0], 4)
+        self.assertTrue(np.all(out[0] == ref))
+
+        self.assertRaises(ValueError, dsp.dsp.render_score,
+                          [(0, "p_foo", 1)], 16, audio)
+        self.assertRaises(ValueError, dsp.dsp.render_score,
+                          [(-1, "p_gain", 1)], 16, audio)
+        self.assertRaises(ValueError, dsp.dsp.render_score, [], 16)
+
+    def test_render_score_paths(self):
+        """Test that rendering a score in C matches rendering in Python."""
+
+        dsp = self.dsp1.new_dsp()
+        gain = dsp.ui.p_Gain
+        audio = np.random.randn(2, 1000).astype(dsp.dtype)
+
+        times = np.random.randint(0, 1000, 200)
+        values = np.random.uniform(gain.min, gain.max, 200)
+        events = [(t, "p_Gain", v) for t, v in zip(times, values)]
+        events.append((500.0, "p_Gain", gain.max))
+
+        # compute the segments between the events by hand
+        ref = self.dsp1.new_dsp()
+        ref_out = np.zeros((2, 1000), dtype=dsp.dtype)
+        schedule = sorted(enumerate(events), key=lambda e: (e[1][0], e[0]))
+        bounds = sorted(set([0, 1000] + [int(t) for t, p, v in events]))
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            for i, (t, p, v) in schedule:
+                if t == a:
+                    ref.ui.p_Gain = v
+            ref_out[:, a:b] = ref.compute(audio[:, a:b])
+
+        # unstaged channels are rendered in C, float64 ones in Python
+        dsp.collect_stats()
+        out = dsp.render_score(events, 1000, audio)
+        self.assertTrue(np.allclose(out, ref_out))
+        self.assertTrue(np.all(dsp.stats.count == 1000))
+
+        dsp.reset()
+        dsp.block_size = 64
+        out = dsp.render_score(events, 1000, audio, out_dtype=np.float64)
+        self.assertTrue(np.allclose(out, ref_out))
+
+        dsp.reset()
+        out = dsp.render_score(events, 1000, audio)
+        self.assertTrue(np.allclose(out, ref_out))
+
+        self.assertRaises(ValueError, dsp.render_score,
+                          [(1.5, "p_Gain", 1)], 16, audio)
+
+    def test_pickle(self):
+        """Test pickling FAUST objects."""
+
+        import pickle
+
+        dsp = self.dsp1
+        dsp.dsp.ui.p_Gain = 0.75
+        audio = np.random.randn(2, 256).astype(dsp.dsp.dtype)
+
+        # the parameters are restored, but not the state
+        ref = dsp.new_dsp()
+        ref.ui.p_Gain = 0.75
+        copy = pickle.loads(pickle.dumps(dsp))
+        self.assertEqual(copy.dsp.ui.p_Gain.zone, 0.75)
+        self.assertTrue(np.all(copy.compute(audio) == ref.compute(audio)))
+
+        # unpickling neither runs FAUST nor compiles anything
+        self.assertEqual([s.stage for s in copy.timings],
+                         ["verify", "init", "ui", "meta", "restore"])
+        self.assertEqual(copy.timings[0].info["cache"], "memory")
+
+        # with pickle_state, the DSP continues where it left off
+        dsp.compute(audio)
+        dsp.pickle_state = True
+        copy = pickle.loads(pickle.dumps(dsp))
+        self.assertTrue(copy.pickle_state)
+        self.assertTrue(np.all(copy.compute(audio) == dsp.compute(audio)))
+
+    def test_parallel(self):
+        """Test OpenMP code and thread control."""
+
+        self.assertIsNone(self.dsp1.num_threads)
+        self.assertRaises(ValueError, self.dsp1.set_num_threads, 2)
+
+        environ = dict(os.environ)
+        dsp = FAUST("dattorro_notch_cut_regalia.dsp", 48000, parallel="omp",
+                    num_threads=2)
+        self.assertEqual(dict(os.environ), environ)
+        self.assertIn("-omp", dsp.FAUST_FLAGS)
+        self.assertEqual(dsp.num_threads, 2)
+        self.assertEqual(dsp.new_dsp().num_threads, 2)
+        dsp.set_num_threads(3)
+        self.assertEqual(dsp.num_threads, 3)
+        self.assertEqual(dsp.dsp.num_threads, 3)
+        self.assertRaises(ValueError, dsp.set_num_threads, 0)
+
+        audio = np.random.randn(2, 256).astype(dsp.dsp.dtype)
+        ref = self.dsp1.new_dsp()
+        self.assertTrue(np.allclose(dsp.compute(audio), ref.compute(audio)))
+
+        self.assertRaises(ValueError, FAUST, "dattorro_notch_cut_regalia.dsp",
+                          48000, parallel="foo")
+        self.assertRaises(ValueError, FAUST, "dattorro_notch_cut_regalia.dsp",
+                          48000, num_threads=2)
+        self.assertRaises(ValueError, FAUST, "dattorro_notch_cut_regalia.dsp",
+                          48000, parallel="sch")